@@ -1,16 +1,23 @@
 import requests
-from bs4 import BeautifulSoup
 import json
 import csv
 import time
 import random
 import sys
 import os
-from datetime import datetime, timezone
+import argparse
+from datetime import datetime, timedelta, timezone
 from supabase import create_client, Client
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from db_muveletek import upsert_darabolva, linkek_frissitese, hianyzok_inaktivalasa, sorok_lapozva, linkek_lapozva, tartalom_hash
+from link_tukor import szinkronizalt_tukor
+from helysegnevtar import helysegnevtar
+from utemezo import utemezo_letrehozasa, retry_after_masodperc
+from http_gyorsitotar import HttpGyorsitotar
+from vmp_kinyero import talalati_sorok, reszletes_adatok
+from futasi_naplo import FutasiNaplo
 
 # ---------------------------------------------------------
 # Konfigurációk (ENV változókból)
@@ -28,16 +35,55 @@ TABLE_NAME = os.environ["TABLE_NAME"]
 
 LOGIN_URL = os.environ["LOGIN_URL"]
 
+# Ennyi rekord megy fel egy upsert kérésben
+UPSERT_CHUNK_SIZE = int(os.getenv("UPSERT_CHUNK_SIZE", "200"))
+
 # ---------------------------------------------------------
 # Keresési paraméterek
 # ---------------------------------------------------------
-if len(sys.argv) >= 2:
-    LOCATION = sys.argv[1]
-else:
-    print("Hiba: nincs megadva városnév.")
-    sys.exit(1)
-
-DISTANCE = sys.argv[2] if len(sys.argv) > 2 else "50"
+DEFAULT_DISTANCE = "50"
+
+# Egy folyamatban több város fut, ezért egy beragadt kérés nem állíthatja meg az egészet
+REQUEST_TIMEOUT = 60
+
+# Kérés ütemezés: "aimd" (válaszidő / 429 / 5xx / Retry-After alapján) vagy "fix" (régi 25-35 mp)
+UTEMEZO = utemezo_letrehozasa(
+    os.getenv("VMP_UTEMEZO", "aimd"),
+    padlo=float(os.getenv("VMP_MIN_DELAY", "3")),
+    plafon=float(os.getenv("VMP_MAX_DELAY", "120")),
+)
+VMP_PROBAK = 3
+
+# Lemezes HTTP gyorsítótár (ETag / Last-Modified újraellenőrzés, különben TTL); VMP_HTTP_CACHE=off kikapcsolja
+VMP_HTTP_CACHE = os.getenv("VMP_HTTP_CACHE", os.path.join(os.getcwd(), "vmp_http_cache.sqlite3"))
+VMP_HTTP_CACHE_MB = float(os.getenv("VMP_HTTP_CACHE_MB", "200"))
+HTTP_CACHE = HttpGyorsitotar(VMP_HTTP_CACHE, VMP_HTTP_CACHE_MB) if VMP_HTTP_CACHE != "off" else None
+# A találati lista gyorsan változik: mindig újraellenőrizzük; a részletes oldal egy napig friss
+TALALATI_OLDAL_TTL = 0
+RESZLETES_OLDAL_TTL = int(os.getenv("VMP_RESZLETES_TTL", str(24 * 3600)))
+
+# Változás detektálás: városonként legfeljebb ennyi ismert állás részletes oldalát töltjük újra
+VALTOZAS_UJRALETOLTES_MAX = int(os.getenv("VMP_VALTOZAS_MAX", "50"))
+# A lista hash csak a találati lista 4 mezőjét látja (a fizetés, elérhetőség stb. változását nem),
+# ezért városonként ennyi további ismert állást is újraellenőrzünk, a legrégebben ellenőrzöttektől
+# (forgó mintavétel: idővel minden ismert állás sorra kerül)
+VALTOZAS_MINTA_MAX = int(os.getenv("VMP_VALTOZAS_MINTA", "20"))
+
+# Inkrementális lapozás: megállunk, ha ennyi egymást követő találati oldalon csak a keresésnél
+# már ismert link van. Ilyenkor nincs inaktiválás, ezért keresésenként ennyi óránként teljes bejárás kell.
+VMP_INKREMENTALIS = os.getenv("VMP_INKREMENTALIS", "0") == "1"
+KORAI_MEGALLAS_OLDALAK = int(os.getenv("VMP_KORAI_MEGALLAS_OLDALAK", "2"))
+TELJES_LAPOZAS_ORAK = float(os.getenv("VMP_TELJES_LAPOZAS_ORAK", "24"))
+# A találati oldalak URL-jéhez fűzött rendezési paraméter: legújabb hirdetés elöl, így az ismert
+# állások a lista végére kerülnek. A keresesi_link (create_search_url) nem tartalmazza, mert az a
+# DB-ben tárolt keresés kulcsa. Ha a találati oldal nem hivatkozik vissza a paraméterre (a VMP nem
+# ismeri, pl. átnevezték), a sorrend relevancia szerinti, ezért akkor teljes lapozás jön.
+VMP_RENDEZES = os.getenv("VMP_RENDEZES", "&rendezes=datum")
+VMP_RENDEZES_PARAMETER = VMP_RENDEZES.lstrip("&").split("=")[0]
+
+# Városonkénti időkeret (mp, a régi `timeout 5800` megfelelője): ha egy keresés ennél tovább tart,
+# a következő városra lépünk, így egy beragadt lapozás nem éli fel a többi város idejét
+VAROS_IDOKERET_MP = float(os.getenv("VMP_VAROS_IDOKERET_MP", "5800"))
 
 # ---------------------------------------------------------
 # User-Agent lista
@@ -86,19 +132,21 @@ def db_allasok_lekerese(supabase, keresesi_link):
     if not supabase:
         return {}
     try:
-        result = supabase.table(TABLE_NAME).select("link, id").eq("keresesi_link", keresesi_link).eq("active", True).execute()
-        return {allas["link"]: allas["id"] for allas in result.data}
+        sorok = sorok_lapozva(supabase, TABLE_NAME, "link, id", {"keresesi_link": keresesi_link, "active": True})
+        return {allas["link"]: allas["id"] for allas in sorok}
     except Exception as e:
         print(f"❌ DB állások lekérése hiba: {e}")
         return {}
 
 def osszes_aktiv_link_lekerese(supabase):
-    """Visszaadja az ÖSSZES aktív állás linkjét az EGÉSZ adatbázisból"""
+    """Visszaadja az ÖSSZES aktív állás linkjét az EGÉSZ adatbázisból (a helyi link tükörből, ha elérhető)"""
     if not supabase:
         return set()
     try:
-        result = supabase.table(TABLE_NAME).select("link").eq("active", True).execute()
-        return {allas["link"] for allas in result.data}
+        tukor = szinkronizalt_tukor(supabase, TABLE_NAME)
+        if tukor:
+            return tukor.linkek(active=True)
+        return linkek_lapozva(supabase, TABLE_NAME, {"active": True})
     except Exception as e:
         print(f"❌ Összes aktív link lekérése hiba: {e}")
         return set()
@@ -108,18 +156,13 @@ def inaktivalt_allasok(supabase, keresesi_link, scrapped_linkek):
         return 0
     try:
         db_linkek = db_allasok_lekerese(supabase, keresesi_link)
-        inaktivalando_linkek = [link for link in db_linkek.keys() if link not in scrapped_linkek]
         
         most = datetime.now(timezone.utc).isoformat()
         
-        if inaktivalando_linkek:
-            for link in inaktivalando_linkek:
-                supabase.table(TABLE_NAME).update({
-                    "active": False,
-                    "utoljara_frissitve": most
-                }).eq("link", link).execute()
-            print(f"✅ {len(inaktivalando_linkek)} állás inaktiválva")
-            return len(inaktivalando_linkek)
+        inaktivalando_szam, inaktivalt = hianyzok_inaktivalasa(supabase, TABLE_NAME, db_linkek.keys(), scrapped_linkek, most)
+        if inaktivalando_szam:
+            print(f"✅ {inaktivalt}/{inaktivalando_szam} állás inaktiválva")
+            return inaktivalt
         else:
             print("✅ Nincs inaktiválandó állás")
             return 0
@@ -130,9 +173,10 @@ def inaktivalt_allasok(supabase, keresesi_link, scrapped_linkek):
 # ---------------------------------------------------------
 # Állás konvertálása
 # ---------------------------------------------------------
-def allas_adatok_konvertalasa(allas):
+def allas_adatok_konvertalasa(allas, nevtar=None):
+    """A scrape-elt állás -> DB sor; a `nevtar` (helységnévtár) adja a helyseg_nev / szel_fok / hossz_fok mezőket"""
     most = datetime.now(timezone.utc).isoformat()
-    return {
+    sor = {
         "munka_neve": allas.get("Munka neve"),
         "munka_tipusa": allas.get("Munka típusa"),
         "hely": allas.get("Hely"),
@@ -160,8 +204,18 @@ def allas_adatok_konvertalasa(allas):
         "allas_egyeztetes_ideje": allas.get("allas_egyeztetes_ideje"),
         "active": True,
         "szarmazas": "virtuális munkaerő piac",
-        "utoljara_frissitve": most  # ÚJ MEZŐ
+        "utoljara_frissitve": most,  # ÚJ MEZŐ
+        # beszúrás / tartalmi változás (csak ilyenkor írjuk ki a teljes sort)
+        "modositva": most
     }
+    if nevtar:
+        sor.update(nevtar.mezok(sor["hely"]))
+    sor["tartalom_hash"] = tartalom_hash(sor)
+    return sor
+
+def lista_hash(allas):
+    """A találati listában is látható mezők hash-e (olcsó jel arra, hogy a hirdetés változott)"""
+    return tartalom_hash({kulcs: allas.get(kulcs) for kulcs in ("Munka neve", "Munka típusa", "Hely", "Cég")})
 
 # ---------------------------------------------------------
 # Aktív állások számának lekérése
@@ -179,14 +233,15 @@ def get_aktiv_allasok_szama(supabase, keresesi_link):
         return 0
 
 # ---------------------------------------------------------
-# Feltöltés Supabase-ba EGYENKÉNT (batch nélkül)
+# Feltöltés Supabase-ba chunk-onként (hibás chunk felezésével)
 # ---------------------------------------------------------
-def allasok_feltoltese_supabase(supabase, allasok):
+def allasok_feltoltese_supabase(supabase, allasok, chunk_size=UPSERT_CHUNK_SIZE):
     if not supabase:
         print("❌ Nincs Supabase kapcsolat!")
         return 0
 
-    adatok = [allas_adatok_konvertalasa(a) for a in allasok]
+    nevtar = helysegnevtar(supabase)
+    adatok = [allas_adatok_konvertalasa(a, nevtar) for a in allasok]
 
     # egyediség link alapján
     unique_adatok = []
@@ -201,35 +256,25 @@ def allasok_feltoltese_supabase(supabase, allasok):
         print("✅ Nincsenek új rekordok feltöltésre")
         return 0
 
-    print(f"📝 {len(unique_adatok)} egyedi rekord feltöltése egyenként...")
+    print(f"📝 {len(unique_adatok)} egyedi rekord feltöltése {chunk_size}-es csomagokban...")
     osszes_mentett = 0
     sikertelen = 0
-    
-    # Egyenként mentés
-    for i, adat in enumerate(unique_adatok):
-        try:
-            resp = supabase.table(TABLE_NAME).upsert(
-                adat,
-                on_conflict="link"
-            ).execute()
-            
-            if hasattr(resp, "data") and resp.data is not None and len(resp.data) > 0:
-                osszes_mentett += 1
-                if (i + 1) % 10 == 0:  # Minden 10. rekorднál kiírás
-                    print(f"   ✅ Mentve: {i + 1}/{len(unique_adatok)}")
-            else:
-                sikertelen += 1
+
+    for i in range(0, len(unique_adatok), chunk_size):
+        chunk = unique_adatok[i:i + chunk_size]
+        mentett, hibak = upsert_darabolva(supabase, TABLE_NAME, chunk, chunk_size=len(chunk))
+        osszes_mentett += mentett
+        sikertelen += len(hibak)
+
+        for adat, hiba in hibak:
+            if hiba is None:
                 print(f"   ⚠ Nem mentődött: {adat.get('munka_neve')} | Link: {adat.get('link')}")
-                
-        except Exception as e:
-            sikertelen += 1
-            print(f"   ❌ Hiba ({i + 1}/{len(unique_adatok)}): {e}")
-            print(f"      Munka: {adat.get('munka_neve')}")
-            print(f"      Link: {adat.get('link')}")
+            else:
+                print(f"   ❌ Hiba: {hiba}")
+                print(f"      Munka: {adat.get('munka_neve')}")
+                print(f"      Link: {adat.get('link')}")
 
-        # Rövid szünet minden 10. mentés után
-        if (i + 1) % 10 == 0:
-            time.sleep(random.uniform(1, 2))
+        print(f"   ✅ Mentve: {osszes_mentett}/{len(unique_adatok)}")
 
     print(f"\n📊 MENTÉS EREDMÉNYE:")
     print(f"   ✅ Sikeres: {osszes_mentett}")
@@ -238,6 +283,76 @@ def allasok_feltoltese_supabase(supabase, allasok):
     
     return osszes_mentett
 
+# ---------------------------------------------------------
+# Módosult állások (tartalom hash alapján)
+# ---------------------------------------------------------
+def valtozas_gyanus_allasok(tukor, allasok, ismert_linkek):
+    """
+    Elmenti az összes most látott állás lista-hash-ét, és visszaadja azokat a már
+    ismert állásokat, amelyeknél ez a korábban látotthoz képest megváltozott.
+    """
+    if not tukor or not allasok:
+        return []
+    aktualis = {allas["Link"]: lista_hash(allas) for allas in allasok if allas["Link"]}
+    korabbi = tukor.lista_hashek(aktualis)
+    tukor.lista_hashek_mentese(aktualis)
+    gyanus = [
+        allas for allas in allasok
+        if allas["Link"] in ismert_linkek and allas["Link"] in korabbi and korabbi[allas["Link"]] != aktualis[allas["Link"]]
+    ]
+    if len(gyanus) > VALTOZAS_UJRALETOLTES_MAX:
+        print(f"⚠ {len(gyanus)} változás-gyanús állásból csak {VALTOZAS_UJRALETOLTES_MAX} kerül újraellenőrzésre")
+    return gyanus[:VALTOZAS_UJRALETOLTES_MAX]
+
+def forgo_minta(tukor, allasok, ismert_linkek, kihagyott_linkek):
+    """A most látott ismert állások közül legfeljebb VALTOZAS_MINTA_MAX, a legrégebben ellenőrzöttek"""
+    if not tukor or not allasok:
+        return []
+    jeloltek = {allas["Link"]: allas for allas in allasok
+                if allas["Link"] in ismert_linkek and allas["Link"] not in kihagyott_linkek}
+    return [jeloltek[link] for link in tukor.legregebben_ellenorzott(jeloltek, VALTOZAS_MINTA_MAX)]
+
+def modosult_allasok_feltoltese(supabase, tukor, allasok):
+    """
+    Az újra letöltött állások közül csak azokat írja vissza, amelyeknek a tartalom hash-e
+    eltér a tárolttól. A keresesi_link / oldal mezőket nem írjuk felül (az eredeti keresésé marad).
+    """
+    nevtar = helysegnevtar(supabase)
+    sorok = [allas_adatok_konvertalasa(a, nevtar) for a in allasok]
+    tarolt = tukor.tartalom_hashek(s["link"] for s in sorok) if tukor else {}
+    modosult = [s for s in sorok if s["link"] and tarolt.get(s["link"]) != s["tartalom_hash"]]
+    if not modosult:
+        return 0
+    for sor in modosult:
+        sor.pop("keresesi_link", None)
+        sor.pop("oldal", None)
+    mentett, hibak = upsert_darabolva(supabase, TABLE_NAME, modosult, chunk_size=UPSERT_CHUNK_SIZE)
+    for adat, hiba in hibak:
+        print(f"   ❌ Módosult állás mentése sikertelen: {adat.get('link')} {hiba or ''}")
+    if tukor:
+        hibas_linkek = {adat.get("link") for adat, _ in hibak}
+        tukor.bejegyez([s for s in modosult if s["link"] not in hibas_linkek])
+    print(f"✏️ {mentett} módosult állás frissítve ({len(allasok)} újraellenőrzöttből)")
+    return mentett
+
+# ---------------------------------------------------------
+# Félbemaradt írások (futási napló)
+# ---------------------------------------------------------
+def fuggo_irasok_ujrajatszasa(supabase, naplo):
+    """
+    Az előző, megszakadt futás felvett, de nem nyugtázott írásainak újrajátszása.
+    Mindkét írás upsert link alapján, így a már lement sorok újraírása sem okoz duplikációt.
+    """
+    if not supabase or not naplo:
+        return
+    for iras_id, muvelet, allasok in naplo.fuggo_irasok():
+        print(f"📓 Félbemaradt írás újrajátszása: {muvelet}, {len(allasok)} állás")
+        if muvelet == "uj_allasok":
+            allasok_feltoltese_supabase(supabase, allasok)
+        elif muvelet == "modosult_allasok":
+            modosult_allasok_feltoltese(supabase, szinkronizalt_tukor(supabase, TABLE_NAME), allasok)
+        naplo.iras_alkalmazva(iras_id)
+
 # ---------------------------------------------------------
 # Meglévő állások frissítése (ha már léteztek)
 # ---------------------------------------------------------
@@ -247,20 +362,13 @@ def meglevo_allasok_frissitese(supabase, allasok_linkjei):
         return 0
     
     most = datetime.now(timezone.utc).isoformat()
-    frissitett = 0
-    
-    for link in allasok_linkjei:
-        try:
-            supabase.table(TABLE_NAME).update({
-                "utoljara_frissitve": most,
-                "active": True
-            }).eq("link", link).execute()
-            frissitett += 1
-        except Exception as e:
-            print(f"❌ Frissítés hiba ({link}): {e}")
+    frissitett = linkek_frissitese(supabase, TABLE_NAME, allasok_linkjei, {
+        "utoljara_frissitve": most,
+        "active": True
+    })
     
     if frissitett > 0:
-        print(f"🔄 {frissitett} meglévő állás frissítve")
+        print(f"🔄 {frissitett} meglévő állás frissítve ({len(allasok_linkjei)} linkből)")
     
     return frissitett
 
@@ -274,7 +382,7 @@ def login_and_search(session):
         "login_jelszo": PASSWORD,
         "login": "Belépés"
     }
-    resp = session.post(LOGIN_URL, data=login_data, headers=headers)
+    resp = session.post(LOGIN_URL, data=login_data, headers=headers, timeout=REQUEST_TIMEOUT)
     if resp.ok and "belepes" not in resp.url.lower():
         print("✅ Belépve")
         return True
@@ -282,139 +390,168 @@ def login_and_search(session):
         print("❌ Belépés sikertelen")
         return False
 
+# ---------------------------------------------------------
+# Ütemezett lekérés
+# ---------------------------------------------------------
+def vmp_get(session, url, ttl=0, probak=VMP_PROBAK):
+    """
+    GET a VMP-re a gyorsítótáron és az ütemezőn keresztül: ha a tárolt válasz
+    `ttl`-en belüli, kérés sincs; különben feltételes kérés (304 -> tárolt törzs).
+    429 / 5xx / hálózati hiba esetén (az ütemező visszalépése után) újrapróbál.
+    Végleges hálózati hibánál None.
+    """
+    if HTTP_CACHE:
+        tarolt = HTTP_CACHE.friss(url, ttl)
+        if tarolt:
+            return tarolt
+
+    for proba in range(1, probak + 1):
+        UTEMEZO.varakozas()
+        kezdes = time.monotonic()
+        headers = {"User-Agent": random.choice(USER_AGENTS)}
+        if HTTP_CACHE:
+            headers.update(HTTP_CACHE.feltetel_fejlecek(url))
+        try:
+            resp = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        except requests.RequestException as e:
+            UTEMEZO.visszajelzes(None, time.monotonic() - kezdes)
+            print(f"❌ Kérés hiba ({proba}/{probak}): {url}: {e}")
+            continue
+        UTEMEZO.visszajelzes(resp.status_code, time.monotonic() - kezdes,
+                             retry_after_masodperc(resp.headers.get("Retry-After")))
+        if (resp.status_code == 429 or resp.status_code >= 500) and proba < probak:
+            print(f"⚠ {resp.status_code} ({proba}/{probak}), újrapróbálás: {url}")
+            continue
+        if HTTP_CACHE:
+            if resp.status_code == 304:
+                return HTTP_CACHE.nem_valtozott(url) or resp
+            if resp.ok:
+                HTTP_CACHE.tarol(url, resp)
+        return resp
+    return None
+
 # ---------------------------------------------------------
 # Oldalak bejárása
 # ---------------------------------------------------------
-def get_allasok_egy_oldalrol(session, oldal_szam):
-    url = f"https://vmp.munka.hu/allas/talalatok?kulcsszo=&kategoria=&isk=&oszk=&feor=&helyseg={LOCATION}&tavolsag={DISTANCE}&munkaido=3&attelepules=&oldal={oldal_szam}&kereses=Keresés"
-    headers = {"User-Agent": random.choice(USER_AGENTS)}
-    resp = session.get(url, headers=headers)
-    if not resp.ok:
+def talalati_oldal_url(location, distance, oldal_szam):
+    return f"https://vmp.munka.hu/allas/talalatok?kulcsszo=&kategoria=&isk=&oszk=&feor=&helyseg={location}&tavolsag={distance}&munkaido=3&attelepules=&oldal={oldal_szam}&kereses=Keresés{VMP_RENDEZES}"
+
+def rendezes_ervenyes(html):
+    """A VMP ismeri-e a rendezési paramétert: a találati oldal linkjei (lapozó, rendezés) tovább viszik"""
+    return bool(VMP_RENDEZES_PARAMETER) and f"{VMP_RENDEZES_PARAMETER}=" in html
+
+def get_allasok_egy_oldalrol(session, oldal_szam, location, distance, naplo=None):
+    """(állások, van-e következő oldal, legújabb elöl rendezett-e)"""
+    url = talalati_oldal_url(location, distance, oldal_szam)
+    mentett = naplo.lekeres("oldal", url) if naplo else None
+    if mentett is not None:
+        print(f"📓 {oldal_szam}. oldal a futási naplóból")
+        return mentett["allasok"], mentett["van_kovetkezo"], mentett.get("rendezett", False)
+
+    resp = vmp_get(session, url, ttl=TALALATI_OLDAL_TTL)
+    if resp is None or not resp.ok:
         print(f"❌ Nem érhető el az oldal: {url}")
-        return [], False
+        return [], False, False
 
-    soup = BeautifulSoup(resp.text, "html.parser")
     results = []
-
-    rows = soup.select("tbody tr")
-    for row in rows:
-        tds = row.find_all("td")
-        if len(tds) >= 4:
-            allas = {
-                "Munka neve": tds[0].get_text(strip=True),
-                "Munka típusa": tds[1].get_text(strip=True),
-                "Hely": tds[2].get_text(strip=True),
-                "Cég": tds[3].get_text(strip=True),
-                "Oldal": oldal_szam,
-                "Link": "",
-                "keresesi_link": create_search_url()
-            }
-            link_elem = tds[0].find("a")
-            if link_elem and link_elem.has_attr("href"):
-                allas["Link"] = "https://vmp.munka.hu" + link_elem["href"]
-            results.append(allas)
+    for nev, tipus, hely, ceg, href in talalati_sorok(resp.text):
+        results.append({
+            "Munka neve": nev,
+            "Munka típusa": tipus,
+            "Hely": hely,
+            "Cég": ceg,
+            "Oldal": oldal_szam,
+            "Link": "https://vmp.munka.hu" + href if href is not None else "",
+            "keresesi_link": create_search_url(location, distance)
+        })
 
     van_kovetkezo = len(results) >= 40
-    return results, van_kovetkezo
+    rendezett = rendezes_ervenyes(resp.text)
+    if naplo and results:
+        naplo.rogzit("oldal", url, {"allasok": results, "van_kovetkezo": van_kovetkezo, "rendezett": rendezett})
+    return results, van_kovetkezo, rendezett
 
 # ---------------------------------------------------------
 # Részletes adatok
 # ---------------------------------------------------------
-def get_job_details(session, allas):
+def get_job_details(session, allas, naplo=None, ttl=RESZLETES_OLDAL_TTL):
+    mentett = naplo.lekeres("reszletes", allas["Link"]) if naplo else None
+    if mentett is not None:
+        allas.update(mentett)
+        return allas
     print(f"Részletes adatok után: {allas['Munka neve']}")
-    headers = {"User-Agent": random.choice(USER_AGENTS)}
-    resp = session.get(allas["Link"], headers=headers)
-    if not resp.ok:
+    resp = vmp_get(session, allas["Link"], ttl=ttl)
+    if resp is None or not resp.ok:
         print(f"❌ Nem sikerült az oldal letöltése: {allas['Link']}")
         return allas
-    soup = BeautifulSoup(resp.text, "html.parser")
-    
-    tables = soup.find_all("table", class_="standardTable")
-    
-    for table in tables:
-        tbody = table.find("tbody")
-        if tbody:
-            for row in tbody.find_all("tr"):
-                tds = row.find_all("td")
-                if len(tds) >= 2:
-                    kulcs = " ".join(tds[0].get_text(strip=True).split())
-                    ertek = tds[1].get_text(strip=True)
-                    
-                    if kulcs == "Foglalkoztató neve":
-                        allas["Foglalkoztató neve"] = ertek
-                    elif kulcs == "Képviselő neve":
-                        allas["Képviselő neve"] = ertek
-                    elif kulcs == "Képviselő elérhetőségei":
-                        email_link = row.find("a", href=True)
-                        if email_link and email_link['href'].startswith('mailto:'):
-                            allas["Képviselő elérhetőségei"] = email_link['href'].replace("mailto:", "")
-                        else:
-                            allas["Képviselő elérhetőségei"] = ertek
-                    elif kulcs == "Felajánlott havi bruttó kereset (Ft)":
-                        allas["Felajánlott havi bruttó kereset (Ft)"] = ertek
-                    elif kulcs == "Munkavégzés helye":
-                        allas["Munkavégzés helye"] = ertek
-                    elif kulcs == "Elvárt iskolai végzettség":
-                        allas["Elvárt iskolai végzettség"] = ertek
-                    elif kulcs == "Megjegyzés":
-                        allas["Megjegyzés"] = ertek
-
-    # email
-    email_tag = soup.select_one("#tabs-1 a[href^='mailto:']")
-    if email_tag:
-        allas["Email"] = email_tag["href"].replace("mailto:", "")
-
-    # tab2 extra adatok
-    tab2_div = soup.find("div", id="tabs-2")
-    if tab2_div:
-        table = tab2_div.find("table", class_="standardTable")
-        if table:
-            tbody = table.find("tbody")
-            if tbody:
-                for row in tbody.find_all("tr"):
-                    tds = row.find_all("td")
-                    if len(tds) >= 2:
-                        kulcs = " ".join(tds[0].get_text(strip=True).split())
-                        ertek = tds[1].get_text(strip=True)
-                        if kulcs == "Teljes/rész munkaidő (óra)":
-                            allas["teljes_resz_munkaido_ora"] = ertek
-                        elif kulcs == "Munkaidő kezdete (óra:perc)":
-                            allas["munkaido_kezdete"] = ertek
-                        elif kulcs == "Munkarend":
-                            allas["munkarend"] = ertek
-                        elif kulcs == "EU-s állampolgár figyelmébe ajánlja?":
-                            allas["eu_allampolgar_javaslat"] = ertek
-                        elif kulcs.startswith("Kéri-e az országon belüli áttelepülést"):
-                            allas["attelepules_kovetelmeny"] = ertek
-                        elif kulcs == "Speciális követelmények":
-                            allas["speciális_követelmények"] = ertek
-                        elif kulcs == "Speciális körülmények":
-                            allas["speciális_körülmények"] = ertek
-                        elif kulcs == "A munkakörhöz kapcsolódó juttatások":
-                            allas["a_munkakorhoz_kapcsolodo_juttatasok"] = ertek
-                        elif kulcs == "Állásegyeztetés helye":
-                            allas["allas_egyeztes_helye"] = ertek
-                        elif kulcs == "Állásegyeztetés ideje":
-                            allas["allas_egyeztetes_ideje"] = ertek
-
+    adatok = reszletes_adatok(resp.text)
+    if naplo:
+        naplo.rogzit("reszletes", allas["Link"], adatok)
+    allas.update(adatok)
     return allas
 
 # ---------------------------------------------------------
 # Segéd
 # ---------------------------------------------------------
-def create_search_url():
-    return f"https://vmp.munka.hu/allas/talalatok?kulcsszo=&kategoria=&isk=&oszk=&feor=&helyseg={LOCATION}&tavolsag={DISTANCE}&munkaido=3&attelepules=&kereses=Keresés"
+def create_search_url(location, distance):
+    return f"https://vmp.munka.hu/allas/talalatok?kulcsszo=&kategoria=&isk=&oszk=&feor=&helyseg={location}&tavolsag={distance}&munkaido=3&attelepules=&kereses=Keresés"
+
+def futasi_lista_beolvasasa(path):
+    """Futási lista fájl: soronként "város [km]"; üres sor és # megjegyzés kihagyva"""
+    varosok = []
+    with open(path, encoding="utf-8") as f:
+        for sor in f:
+            sor = sor.split("#", 1)[0].strip()
+            if not sor:
+                continue
+            reszek = sor.split()
+            varosok.append((reszek[0], reszek[1] if len(reszek) > 1 else DEFAULT_DISTANCE))
+    return varosok
+
+def varos_argumentumok(argumentumok):
+    """
+    Parancssori városok: "város" vagy "város:km" alakban.
+    A régi `allasok.py <város> <km>` hívás is működik.
+    """
+    if len(argumentumok) == 2 and argumentumok[1].isdigit():
+        return [(argumentumok[0], argumentumok[1])]
+    varosok = []
+    for arg in argumentumok:
+        location, _, distance = arg.partition(":")
+        varosok.append((location, distance or DEFAULT_DISTANCE))
+    return varosok
+
+class IdokeretTullepve(Exception):
+    """A város feldolgozása túllépte a VAROS_IDOKERET_MP időkeretet"""
+
+def idokeret_ellenorzese(hatarido, hol):
+    if hatarido is not None and time.monotonic() > hatarido:
+        raise IdokeretTullepve(f"{VAROS_IDOKERET_MP:.0f} mp időkeret túllépve ({hol})")
+
+def teljes_lapozas_kell(tukor, keresesi_link, inkrementalis):
+    """Teljes bejárás, ha nincs inkrementális mód / tükör, vagy régi az utolsó teljes lapozás"""
+    if not inkrementalis or not tukor:
+        return True
+    utolso = tukor.utolso_teljes_lapozas(keresesi_link)
+    return utolso is None or datetime.now(timezone.utc) - utolso > timedelta(hours=TELJES_LAPOZAS_ORAK)
 
 # ---------------------------------------------------------
-# Main
+# Egy város feldolgozása
 # ---------------------------------------------------------
-def main():
-    session = requests.Session()
-    if not login_and_search(session):
-        return
-
-    supabase = supabase_kapcsolat()
-    keresesi_link = create_search_url()
+def varos_feldolgozasa(session, supabase, location, distance, osszes_aktiv_link, inkrementalis=False, naplo=None,
+                       hatarido=None):
+    """
+    Egy (város, távolság) keresés teljes feldolgozása.
+    Az `osszes_aktiv_link` a futás közös DB pillanatképe; a feltöltött / inaktivált
+    linkekkel frissítjük, hogy a következő város már a mostani állapotot lássa.
+    `inkrementalis` esetén a lapozás korán megállhat (lásd KORAI_MEGALLAS_OLDALAK).
+    A `naplo`-ban rögzített oldalakat / részletes adatokat nem töltjük le újra.
+    `hatarido` (time.monotonic) után oldalanként IdokeretTullepve-t dob.
+    Visszaad egy összegző dict-et az emailhez.
+    """
+    keresesi_link = create_search_url(location, distance)
+    kezdes = datetime.now(timezone.utc)
+    print(f"\n🏙 {location} ({distance}km)")
     
     # KONTROLL: Aktív állások száma ELŐTTE
     aktiv_elotte = get_aktiv_allasok_szama(supabase, keresesi_link)
@@ -423,28 +560,46 @@ def main():
     # Lekérjük az adott keresési linkhez tartozó állásokat (inaktiváláshoz)
     db_allasok_keresesi_link = db_allasok_lekerese(supabase, keresesi_link) if supabase else {}
     
-    # Lekérjük az ÖSSZES aktív állás linkjét az EGÉSZ adatbázisból (duplikáció ellenőrzéshez)
-    osszes_aktiv_link = osszes_aktiv_link_lekerese(supabase) if supabase else set()
     print(f"📊 Teljes adatbázisban {len(osszes_aktiv_link)} aktív állás van (összes keresésből)")
 
+    tukor = szinkronizalt_tukor(supabase, TABLE_NAME) if supabase else None
+    teljes = teljes_lapozas_kell(tukor, keresesi_link, inkrementalis)
+
     allasok = []
     oldal_szam = 1
+    ismert_oldalak = 0
+    korai_megallas = False
 
     # Csak a linkeket gyűjtjük (GYORS)
-    print("\n🔍 LINKEK GYŰJTÉSE (részletes adatok nélkül)...")
+    print(f"\n🔍 LINKEK GYŰJTÉSE (részletes adatok nélkül, {'teljes' if teljes else 'inkrementális'} lapozás)...")
     while True:
+        idokeret_ellenorzese(hatarido, f"{oldal_szam}. találati oldal")
         print(f"🔍 Betöltés oldal: {oldal_szam}")
-        page_allasok, van_kovetkezo = get_allasok_egy_oldalrol(session, oldal_szam)
+        page_allasok, van_kovetkezo, rendezett = get_allasok_egy_oldalrol(session, oldal_szam, location, distance, naplo)
         if not page_allasok:
             break
         allasok.extend(page_allasok)
+        if not teljes and not rendezett:
+            print(f"⚠ A találati oldal nem hivatkozik a rendezési paraméterre ({VMP_RENDEZES or 'nincs'}), "
+                  f"a sorrend nem legújabb-elöl: teljes lapozás")
+            teljes = True
+        if not teljes:
+            if all(allas["Link"] in db_allasok_keresesi_link for allas in page_allasok):
+                ismert_oldalak += 1
+            else:
+                ismert_oldalak = 0
+            if van_kovetkezo and ismert_oldalak >= KORAI_MEGALLAS_OLDALAK:
+                print(f"⏹ {ismert_oldalak} egymást követő oldalon csak ismert állás van, lapozás vége")
+                korai_megallas = True
+                break
         if van_kovetkezo:
             oldal_szam += 1
-            time.sleep(random.uniform(25, 35))
         else:
             break
 
-    print(f"📋 Összesen {len(allasok)} állás találva")
+    print(f"📋 Összesen {len(allasok)} állás találva ({oldal_szam} oldal)")
+    if tukor and not korai_megallas:
+        tukor.teljes_lapozas_mentese(keresesi_link, kezdes)
 
     # SZÉTVÁLOGATÁS: Tényleg új vs már létező (EGÉSZ adatbázis alapján!)
     tenyleg_uj_allasok = []
@@ -469,16 +624,42 @@ def main():
     frissitett_szam = meglevo_allasok_frissitese(supabase, mar_letezo_allasok_linkjei)
     
     # Inaktiválás (csak a keresési linkhez tartozó állások közül azok, amiket most NEM találtunk)
-    inaktivalt_szam = inaktivalt_allasok(supabase, keresesi_link, scrapped_linkek)
+    # Korai megállásnál nem láttuk az összes oldalt, ezért csak a következő teljes bejárás inaktivál
+    if korai_megallas:
+        print("⏭ Inaktiválás kihagyva (nem teljes lapozás)")
+        inaktivalt_szam = 0
+    else:
+        inaktivalt_szam = inaktivalt_allasok(supabase, keresesi_link, scrapped_linkek)
+        osszes_aktiv_link.difference_update(set(db_allasok_keresesi_link) - scrapped_linkek)
+
+    # Ismert, de a találati listában megváltozott állások, és egy forgó minta a többi ismertből:
+    # részletes oldal újra (feltételes kéréssel), feltöltés csak ha a tartalom hash eltér
+    ismert_linkek = set(mar_letezo_allasok_linkjei)
+    gyanus_allasok = valtozas_gyanus_allasok(tukor, allasok, ismert_linkek)
+    minta_allasok = forgo_minta(tukor, allasok, ismert_linkek, {allas["Link"] for allas in gyanus_allasok})
+    ujraellenorzendo = gyanus_allasok + minta_allasok
+    modosult_szam = 0
+    if ujraellenorzendo:
+        print(f"\n🔎 {len(gyanus_allasok)} ismert állás változhatott, {len(minta_allasok)} forgó mintából, "
+              f"részletes adatok újraellenőrzése...")
+        for i, allas in enumerate(ujraellenorzendo):
+            idokeret_ellenorzese(hatarido, f"{i+1}/{len(ujraellenorzendo)} újraellenőrzés")
+            allas.update(get_job_details(session, allas, naplo, ttl=0))
+        iras_id = naplo.iras_felvetele("modosult_allasok", ujraellenorzendo) if naplo else None
+        modosult_szam = modosult_allasok_feltoltese(supabase, tukor, ujraellenorzendo)
+        if naplo:
+            naplo.iras_alkalmazva(iras_id)
+        if tukor:
+            tukor.ellenorzes_mentese((allas["Link"] for allas in ujraellenorzendo), datetime.now(timezone.utc))
 
     # Részletes adatok letöltése CSAK a TÉNYLEG ÚJ állásokhoz
     if tenyleg_uj_allasok:
         print(f"\n📖 RÉSZLETES ADATOK LETÖLTÉSE ({len(tenyleg_uj_allasok)} új álláshoz)...")
         for i, allas in enumerate(tenyleg_uj_allasok):
+            idokeret_ellenorzese(hatarido, f"{i+1}/{len(tenyleg_uj_allasok)} részletes oldal")
             print(f"📖 {i+1}/{len(tenyleg_uj_allasok)}: {allas['Munka neve']} - részletes adatletöltés...")
-            detail = get_job_details(session, allas)
+            detail = get_job_details(session, allas, naplo)
             allas.update(detail)
-            time.sleep(random.uniform(25, 35))
     else:
         print("\n✅ Nincs új állás, nincs mit letölteni")
 
@@ -486,7 +667,11 @@ def main():
     mentett_db = 0
     if supabase and tenyleg_uj_allasok:
         print("\n💾 Új állások feltöltése DB-be...")
+        iras_id = naplo.iras_felvetele("uj_allasok", tenyleg_uj_allasok) if naplo else None
         mentett_db = allasok_feltoltese_supabase(supabase, tenyleg_uj_allasok)
+        if naplo:
+            naplo.iras_alkalmazva(iras_id)
+        osszes_aktiv_link.update(allas["Link"] for allas in tenyleg_uj_allasok if allas["Link"])
 
     # KONTROLL: Aktív állások száma UTÁNA
     aktiv_utana = get_aktiv_allasok_szama(supabase, keresesi_link)
@@ -511,38 +696,144 @@ def main():
         print(f"   ⚠️ FIGYELEM! {abs(kulonbseg)} db eltérés van!")
         kontroll_status = f"⚠️ ELTÉRÉS: {kulonbseg} db"
 
-    email_uzenet = f"""
-VMP Álláskereső eredmény - {LOCATION} ({DISTANCE}km)
+    return {
+        "location": location,
+        "distance": distance,
+        "keresesi_link": keresesi_link,
+        "talalat": len(allasok),
+        "oldalak": oldal_szam,
+        "korai_megallas": korai_megallas,
+        "uj": len(tenyleg_uj_allasok),
+        "mar_letezo": len(mar_letezo_allasok_linkjei),
+        "frissitett": frissitett_szam,
+        "modosult": modosult_szam,
+        "inaktivalt": inaktivalt_szam,
+        "mentett": mentett_db,
+        "aktiv_elotte": aktiv_elotte,
+        "aktiv_utana": aktiv_utana,
+        "osszes_aktiv": len(osszes_aktiv_link),
+        "vart": vart_szam,
+        "kontroll_status": kontroll_status,
+    }
+
+def varos_email_szovege(e):
+    return f"""
+VMP Álláskereső eredmény - {e['location']} ({e['distance']}km)
 
 📊 ÖSSZEGZÉS:
-• Scrape találatok: {len(allasok)} db
-• Tényleg új (nincs az adatbázisban): {len(tenyleg_uj_allasok)} db
-• Már létező (megvan más keresésből): {len(mar_letezo_allasok_linkjei)} db
-• Frissítve: {frissitett_szam} db
-• Inaktivált: {inaktivalt_szam} db
-• DB-be mentve: {mentett_db} db
+• Scrape találatok: {e['talalat']} db ({e['oldalak']} oldal, {'korai megállás, inaktiválás nélkül' if e['korai_megallas'] else 'teljes lapozás'})
+• Tényleg új (nincs az adatbázisban): {e['uj']} db
+• Már létező (megvan más keresésből): {e['mar_letezo']} db
+• Frissítve: {e['frissitett']} db
+• Módosult (tartalom hash alapján újraírva): {e['modosult']} db
+• Inaktivált: {e['inaktivalt']} db
+• DB-be mentve: {e['mentett']} db
 
 📈 ADATBÁZIS KONTROLL:
-• Aktív állások ehhez a kereséshez (előtte): {aktiv_elotte} db
-• Aktív állások ehhez a kereséshez (utána): {aktiv_utana} db
-• Összes aktív állás az adatbázisban: {len(osszes_aktiv_link)} db
-• Várt végeredmény: {vart_szam} db
-• Tényleges végeredmény: {aktiv_utana} db
-• Státusz: {kontroll_status}
+• Aktív állások ehhez a kereséshez (előtte): {e['aktiv_elotte']} db
+• Aktív állások ehhez a kereséshez (utána): {e['aktiv_utana']} db
+• Összes aktív állás az adatbázisban: {e['osszes_aktiv']} db
+• Várt végeredmény: {e['vart']} db
+• Tényleges végeredmény: {e['aktiv_utana']} db
+• Státusz: {e['kontroll_status']}
 
-🔍 Keresési URL: {keresesi_link}
+🔍 Keresési URL: {e['keresesi_link']}
 
-{'🎉 Vannak tényleg új állások!' if tenyleg_uj_allasok else '📋 Nincsenek új állások (minden már bent van az adatbázisban).'}
+{'🎉 Vannak tényleg új állások!' if e['uj'] else '📋 Nincsenek új állások (minden már bent van az adatbázisban).'}
 """
-    
-    email_subject = f"VMP álláskeresés - {len(tenyleg_uj_allasok)} új állás - {LOCATION} {kontroll_status}"
+
+# ---------------------------------------------------------
+# Main
+# ---------------------------------------------------------
+def main(varosok, inkrementalis=VMP_INKREMENTALIS):
+    """
+    Egy vagy több (város, távolság) keresés egy folyamatban:
+    egy belépés, egy Supabase kliens, egy közös DB pillanatkép, egy összesítő email.
+    Megszakadt futás azonos paraméterekkel újraindítva a futási naplóból folytatódik:
+    a kész városokat kihagyja, a félbemaradt írásokat újrajátssza.
+    """
+    session = requests.Session()
+    if not login_and_search(session):
+        return
+
+    supabase = supabase_kapcsolat()
+    naplo = FutasiNaplo("allasok", {"varosok": varosok, "inkrementalis": inkrementalis})
+    # a pillanatkép előtt, hogy a már lement új állásokat ne kezeljük újként
+    fuggo_irasok_ujrajatszasa(supabase, naplo)
+
+    # Lekérjük az ÖSSZES aktív állás linkjét az EGÉSZ adatbázisból (duplikáció ellenőrzéshez) - egyszer a futásra
+    osszes_aktiv_link = osszes_aktiv_link_lekerese(supabase) if supabase else set()
+
+    eredmenyek = []
+    hibak = []
+    for location, distance in varosok:
+        keresesi_link = create_search_url(location, distance)
+        kesz = naplo.lekeres("varos", keresesi_link)
+        if kesz is not None:
+            print(f"\n📓 {location} ({distance}km) már kész a futási napló szerint, kihagyva")
+            eredmenyek.append(kesz)
+            continue
+        try:
+            eredmeny = varos_feldolgozasa(session, supabase, location, distance, osszes_aktiv_link, inkrementalis, naplo,
+                                          hatarido=time.monotonic() + VAROS_IDOKERET_MP)
+            naplo.rogzit("varos", keresesi_link, eredmeny)
+            eredmenyek.append(eredmeny)
+        except IdokeretTullepve as e:
+            # nem kész: a napló megmarad, az újrafuttatás a már letöltött oldalaktól folytatja
+            print(f"⏱ {location}: {e}, továbblépés a következő városra")
+            naplo.rogzit("felbehagyott_varos", keresesi_link, str(e))
+            hibak.append(f"{location} ({distance}km): {e}")
+        except Exception as e:
+            print(f"❌ {location} hibára futott: {e}")
+            hibak.append(f"{location} ({distance}km): {e}")
+
+    # hibás városnál a napló marad, így az újrafuttatás csak a hiányzókat dolgozza fel
+    if hibak:
+        print(f"📓 Futási napló megtartva: {naplo.path}")
+        naplo.close()
+    else:
+        naplo.lezaras()
+
+    if len(varosok) == 1 and eredmenyek:
+        e = eredmenyek[0]
+        email_uzenet = varos_email_szovege(e)
+        email_subject = f"VMP álláskeresés - {e['uj']} új állás - {e['location']} {e['kontroll_status']}"
+    else:
+        osszes_uj = sum(e["uj"] for e in eredmenyek)
+        elteresek = [e for e in eredmenyek if e["kontroll_status"] != "✅ SIKERES"]
+        sorok = [
+            f"• {e['location']} ({e['distance']}km): {e['talalat']} találat ({e['oldalak']} oldal), {e['uj']} új, "
+            f"{e['frissitett']} frissítve, {e['inaktivalt']} inaktivált, {e['mentett']} mentve - {e['kontroll_status']}"
+            for e in eredmenyek
+        ]
+        email_uzenet = (
+            f"VMP Álláskereső összesítő - {len(eredmenyek)}/{len(varosok)} keresés\n\n"
+            f"📊 VÁROSONKÉNT:\n" + "\n".join(sorok) + "\n"
+            + (f"\n❌ HIBÁRA FUTOTT:\n" + "\n".join(f"• {h}" for h in hibak) + "\n" if hibak else "")
+            + "\n".join(varos_email_szovege(e) for e in eredmenyek)
+        )
+        status = "✅ SIKERES" if not elteresek and not hibak else f"⚠️ {len(elteresek)} eltérés, {len(hibak)} hiba"
+        email_subject = f"VMP álláskeresés - {osszes_uj} új állás - {len(varosok)} keresés {status}"
     send_email(email_subject, email_uzenet)
-    
-    # Várakozás a script végén
-    wait_time = random.uniform(35, 45)
-    print(f"\n⏳ Várakozás {wait_time:.1f} másodperc a script végén...")
-    time.sleep(wait_time)
+
+    if HTTP_CACHE:
+        print(f"🗄 {HTTP_CACHE.osszegzes()}")
+        HTTP_CACHE.close()
     print("✅ Script befejezve")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="VMP álláskereső")
+    parser.add_argument("varosok", nargs="*", help='"város" vagy "város:km" (a régi "város km" alak is működik)')
+    parser.add_argument("--lista", help='futási lista fájl, soronként "város [km]"')
+    parser.add_argument("--inkrementalis", action="store_true", default=VMP_INKREMENTALIS,
+                        help="korai megállás a lapozásban (ENV: VMP_INKREMENTALIS=1)")
+    parser.add_argument("--teljes", action="store_true", help="teljes lapozás kényszerítése")
+    args = parser.parse_args()
+
+    varosok = varos_argumentumok(args.varosok)
+    if args.lista:
+        varosok += futasi_lista_beolvasasa(args.lista)
+    if not varosok:
+        print("Hiba: nincs megadva városnév.")
+        sys.exit(1)
+    main(varosok, inkrementalis=args.inkrementalis and not args.teljes)
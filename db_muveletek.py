@@ -0,0 +1,208 @@
+# db_muveletek.py
+# Közös Supabase műveletek az allasok.py és a jofogas.py számára.
+# A táblanevet mindig paraméterként kapják, így a modul importálásához nem kell ENV.
+import json
+import time
+import random
+import hashlib
+from urllib.parse import quote
+
+
+# ---------------------------------------------------------
+# Darabolt (chunk-olt) upsert, hibás sorok kiszűrésével
+# ---------------------------------------------------------
+def upsert_darabolva(supabase, table_name, rekordok, chunk_size=200, on_conflict="link"):
+    """
+    Upsert chunk-onként (egy kérés / chunk).
+    Ha egy chunk elbukik, kettévágjuk és külön próbáljuk a feleket, amíg a hibás
+    sorok egyenként ki nem derülnek.
+    Visszaad: (mentett_db, hibak), ahol hibak = [(rekord, hiba vagy None), ...];
+    None azt jelenti, hogy a kérés lement, de a sor nem jött vissza.
+    """
+    mentett = 0
+    hibak = []
+
+    def kuld(resz):
+        nonlocal mentett
+        try:
+            resp = supabase.table(table_name).upsert(resz, on_conflict=on_conflict).execute()
+        except Exception as e:
+            if len(resz) == 1:
+                hibak.append((resz[0], e))
+                return
+            kozep = len(resz) // 2
+            kuld(resz[:kozep])
+            kuld(resz[kozep:])
+            return
+
+        visszajott = {r.get(on_conflict) for r in (getattr(resp, "data", None) or [])}
+        for rekord in resz:
+            if rekord.get(on_conflict) in visszajott:
+                mentett += 1
+            else:
+                hibak.append((rekord, None))
+
+    for i in range(0, len(rekordok), chunk_size):
+        kuld(rekordok[i:i + chunk_size])
+
+    return mentett, hibak
+
+
+# ---------------------------------------------------------
+# Tömeges frissítés link lista alapján (in_ szűrő, URL-hossz szerint darabolva)
+# ---------------------------------------------------------
+# Ekkora lehet egy in_ szűrő URL-kódolt hossza; a PostgREST / proxy URL limitek alatt marad
+IN_SZURO_URL_KERET = 6000
+
+
+def link_chunkok(linkek, url_keret=IN_SZURO_URL_KERET):
+    """A linkeket olyan csomagokra bontja, amelyek in_ szűrőként beférnek az URL keretbe"""
+    chunk = []
+    hossz = 0
+    for link in linkek:
+        # idézőjelek + vessző, URL-kódolva
+        link_hossz = len(quote(link, safe="")) + 9
+        if chunk and hossz + link_hossz > url_keret:
+            yield chunk
+            chunk = []
+            hossz = 0
+        chunk.append(link)
+        hossz += link_hossz
+    if chunk:
+        yield chunk
+
+
+def ujraprobalva(muvelet, probak=3, varakozas=2.0):
+    """muvelet() futtatása, hiba esetén exponenciális várakozással újrapróbálva; az utolsó hibát továbbdobja"""
+    for proba in range(1, probak + 1):
+        try:
+            return muvelet()
+        except Exception as e:
+            if proba == probak:
+                raise
+            print(f"⚠ DB hiba ({proba}/{probak}), újrapróbálás: {e}")
+            time.sleep(varakozas * 2 ** (proba - 1) + random.random())
+
+
+def linkek_frissitese(supabase, table_name, linkek, mezok, url_keret=IN_SZURO_URL_KERET, probak=3):
+    """
+    A `mezok` értékeit állítja be az összes `linkek`-beli sorra, chunk-olt in_("link", ...) kérésekkel
+    (chunk-onként újrapróbálva). Visszaadja a ténylegesen egyező (frissült) sorok számát.
+    """
+    linkek = list(dict.fromkeys(l for l in linkek if l))
+    if not linkek:
+        return 0
+
+    egyezett = 0
+    for chunk in link_chunkok(linkek, url_keret):
+        try:
+            resp = ujraprobalva(
+                # csak a darabszám kell: a frissített sorokat nem kérjük vissza
+                lambda: supabase.table(table_name)
+                .update(mezok, count="exact", returning="minimal")
+                .in_("link", chunk)
+                .execute(),
+                probak=probak,
+            )
+            egyezett += resp.count or 0
+        except Exception as e:
+            print(f"❌ Tömeges frissítés hiba ({len(chunk)} link): {e}")
+    return egyezett
+
+
+# ---------------------------------------------------------
+# Inaktiválás: ami a DB-ben aktív, de most nem találtuk
+# ---------------------------------------------------------
+def hianyzok_inaktivalasa(supabase, table_name, db_linkek, talalt_linkek, most, url_keret=IN_SZURO_URL_KERET):
+    """
+    A különbséget (db_linkek - talalt_linkek) egyszer számolja ki, és chunk-olt,
+    újrapróbált update-ekkel active=False + utoljara_frissitve=modositva=most értékre állítja.
+    Visszaad: (inaktiválandó linkek száma, ténylegesen inaktivált sorok száma).
+    """
+    inaktivalando = sorted(set(db_linkek) - set(talalt_linkek))
+    if not inaktivalando:
+        return 0, 0
+    inaktivalt = linkek_frissitese(supabase, table_name, inaktivalando, {
+        "active": False,
+        "utoljara_frissitve": most,
+        MODOSITVA_OSZLOP: most
+    }, url_keret=url_keret)
+    return len(inaktivalando), inaktivalt
+
+
+# ---------------------------------------------------------
+# Keyset lapozás (id szerint) teljes táblás lekérdezésekhez
+# ---------------------------------------------------------
+# A PostgREST max-rows limitje alatt maradjon, különben a lapok csonkák lesznek
+LAP_MERET = 1000
+
+
+def sorok_lapozva(supabase, table_name, oszlopok, szurok=None, lap_meret=LAP_MERET, kulcs="id"):
+    """
+    Generátor: a `szurok` szerinti sorokat lapozva, `kulcs` szerint növekvő
+    sorrendben adja vissza, csak a kért oszlopokkal.
+    szurok: {oszlop: érték} (eq), vagy {oszlop: ("gte", érték)} más operátorhoz.
+    Nem függ a szerver oldali max-rows limittől: addig lapoz, amíg üres lapot nem kap.
+    """
+    mezok = [m.strip() for m in oszlopok.split(",")]
+    if kulcs not in mezok and "*" not in mezok:
+        mezok.append(kulcs)
+    select = ", ".join(mezok)
+
+    utolso = None
+    while True:
+        def lap():
+            query = supabase.table(table_name).select(select)
+            for oszlop, ertek in (szurok or {}).items():
+                if isinstance(ertek, tuple):
+                    muvelet, ertek = ertek
+                    query = getattr(query, muvelet)(oszlop, ertek)
+                else:
+                    query = query.eq(oszlop, ertek)
+            if utolso is not None:
+                query = query.gt(kulcs, utolso)
+            return query.order(kulcs).limit(lap_meret).execute()
+
+        sorok = ujraprobalva(lap).data or []
+        if not sorok:
+            return
+        yield from sorok
+        utolso = sorok[-1][kulcs]
+
+
+def linkek_lapozva(supabase, table_name, szurok=None, lap_meret=LAP_MERET):
+    """A szűrőknek megfelelő sorok linkjei halmazként (lapozva összegyűjtve)"""
+    return {sor["link"] for sor in sorok_lapozva(supabase, table_name, "link", szurok, lap_meret)}
+
+
+# ---------------------------------------------------------
+# Tartalom hash (változás detektálás)
+# ---------------------------------------------------------
+# A DB-ben: ALTER TABLE <tábla> ADD COLUMN tartalom_hash text;
+TARTALOM_HASH_OSZLOP = "tartalom_hash"
+
+# Az utolsó tartalmi változás ideje: beszúráskor, eltérő tartalom_hash-ű újraíráskor és inaktiváláskor
+# kap értéket, a "még megvan" érintéskor (utoljara_frissitve) nem; erre épül a Typesense vízjel.
+# A DB-ben: ALTER TABLE <tábla> ADD COLUMN modositva timestamptz DEFAULT now();
+#           CREATE INDEX ON <tábla> (modositva);
+MODOSITVA_OSZLOP = "modositva"
+
+# Ezek minden futásnál változnak / a keresés módjától függenek, nem a hirdetés tartalmától;
+# a helységnévtárból származtatott mezők (helyseg_nev, szel_fok, hossz_fok) sem számítanak
+VALTOZO_MEZOK = {"utoljara_frissitve", "letrehozva", "active", "oldal", "keresesi_link", TARTALOM_HASH_OSZLOP,
+                 MODOSITVA_OSZLOP, "helyseg_nev", "szel_fok", "hossz_fok"}
+
+
+def tartalom_hash(sor, kihagy=VALTOZO_MEZOK):
+    """Stabil hash a normalizált sorból (kulcs sorrend, None / "" és szóközök nem számítanak)"""
+    normalizalt = {}
+    for kulcs, ertek in sor.items():
+        if kulcs in kihagy:
+            continue
+        if isinstance(ertek, str):
+            ertek = " ".join(ertek.split())
+        if ertek is None or ertek == "":
+            continue
+        normalizalt[kulcs] = ertek
+    adat = json.dumps(normalizalt, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(adat.encode("utf-8"), digest_size=16).hexdigest()
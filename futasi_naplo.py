@@ -0,0 +1,163 @@
+# futasi_naplo.py
+# Összeomlás-biztos, csak hozzáfűző futási napló (JSONL) a hosszú scraper futásokhoz.
+# - rekord: {"t": fajta, "k": kulcs, "a": adat}; minden sor után flush + fsync
+# - fajták: tetszőleges kész eredmények (pl. találati oldal, részletes adatok, kész város),
+#   valamint függő DB írások ("iras" felvéve -> "alkalmazva")
+# - azonos paraméterekkel újraindított futás a naplóból folytat; a félbemaradt írásokat
+#   a hívó újrajátssza (upsert link alapján, így többszöri lefutás sem okoz duplikációt)
+# - sikeres futás végén a napló törlődik; a túl régi naplót nem folytatjuk (elavult adatok),
+#   de a nem alkalmazott írásait átvisszük az új naplóba
+import os
+import json
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+
+# ---------------------------------------------------------
+# Beállítások
+# ---------------------------------------------------------
+NAPLO_DIR = os.getenv("FUTASI_NAPLO_DIR", os.path.join(os.getcwd(), "futasi_naplo"))
+
+# Ennél régebbi naplóból nem folytatunk (a lementett oldalak már nem tükrözik az oldalt)
+NAPLO_MAX_KOR_ORAK = float(os.getenv("FUTASI_NAPLO_MAX_KOR_ORAK", "12"))
+
+
+class FutasiNaplo:
+    """Egy futás (script + paraméterek) naplója; a memóriában indexelve, a lemezen hozzáfűzve"""
+
+    def __init__(self, nev, parameterek, mappa=NAPLO_DIR, max_kor_orak=NAPLO_MAX_KOR_ORAK):
+        self.parameterek = json.loads(json.dumps(parameterek))
+        ujjlenyomat = hashlib.sha256(
+            json.dumps(self.parameterek, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+        os.makedirs(mappa, exist_ok=True)
+        self.path = os.path.join(mappa, f"{nev}_{ujjlenyomat}.jsonl")
+        self.max_kor = timedelta(hours=max_kor_orak)
+        self._zar = threading.Lock()
+        self._ertekek = {}
+        self._fuggo = {}
+
+        self.folytatas = self._beolvasas()
+        if not self.folytatas:
+            # a régi napló nem alkalmazott írásait (lásd _beolvasas) átvisszük az újba, hogy a hívó újrajátssza
+            atvitt = self._fuggo
+            self._ertekek, self._fuggo = {}, {}
+            self._f = open(self.path, "w", encoding="utf-8")
+            self._iras({"t": "fejlec", "a": {"parameterek": self.parameterek,
+                                             "letrehozva": datetime.now(timezone.utc).isoformat()}})
+            for iras_id, iras in atvitt.items():
+                rekord = {"t": "iras", "k": iras_id, "a": iras}
+                self._iras(rekord)
+                self._alkalmaz(rekord)
+        else:
+            self._f = open(self.path, "a", encoding="utf-8")
+            print(f"📓 Futási napló folytatása: {len(self._ertekek)} kész eredmény, "
+                  f"{len(self._fuggo)} függő írás ({self.path})")
+
+    def _beolvasas(self):
+        """A meglévő napló betöltése; False, ha nincs, más paraméterű vagy túl régi"""
+        try:
+            with open(self.path, "rb") as f:
+                sorok = f.readlines()
+        except FileNotFoundError:
+            return False
+
+        ervenyes_hossz = 0
+        rekordok = []
+        for sor in sorok:
+            # összeomláskor félbemaradt utolsó sor: onnantól eldobjuk
+            if not sor.endswith(b"\n"):
+                break
+            try:
+                rekordok.append(json.loads(sor))
+            except ValueError:
+                break
+            ervenyes_hossz += len(sor)
+
+        fejlec = rekordok[0].get("a", {}) if rekordok and rekordok[0].get("t") == "fejlec" else None
+        if not fejlec or fejlec.get("parameterek") != self.parameterek:
+            return False
+        if datetime.now(timezone.utc) - datetime.fromisoformat(fejlec["letrehozva"]) > self.max_kor:
+            # a kész eredmények elavultak, de a függő írások nem veszhetnek el
+            for rekord in rekordok[1:]:
+                if rekord.get("t") in ("iras", "alkalmazva"):
+                    self._alkalmaz(rekord)
+            print(f"📓 A futási napló régebbi, mint {self.max_kor}, elölről kezdjük")
+            if self._fuggo:
+                linkek = [
+                    sor.get("link") or sor.get("Link")
+                    for iras in self._fuggo.values() for sor in iras["sorok"] if isinstance(sor, dict)
+                ]
+                print(f"📓 {len(self._fuggo)} nem alkalmazott írás ({len(linkek)} sor) átkerül az új naplóba "
+                      f"újrajátszásra: {', '.join(map(str, linkek[:10]))}{' ...' if len(linkek) > 10 else ''}")
+            return False
+
+        if ervenyes_hossz < sum(len(sor) for sor in sorok):
+            with open(self.path, "r+b") as f:
+                f.truncate(ervenyes_hossz)
+        for rekord in rekordok[1:]:
+            self._alkalmaz(rekord)
+        return True
+
+    def _alkalmaz(self, rekord):
+        fajta = rekord.get("t")
+        if fajta == "iras":
+            self._fuggo[rekord["k"]] = rekord["a"]
+        elif fajta == "alkalmazva":
+            self._fuggo.pop(rekord["k"], None)
+        else:
+            self._ertekek[(fajta, rekord["k"])] = rekord.get("a")
+
+    def _iras(self, rekord):
+        self._f.write(json.dumps(rekord, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    # ----- kész eredmények -----
+    def rogzit(self, fajta, kulcs, adat=None):
+        """Egy kész eredmény (pl. letöltött oldal kinyert adatai) rögzítése"""
+        rekord = {"t": fajta, "k": kulcs, "a": adat}
+        with self._zar:
+            self._iras(rekord)
+            self._alkalmaz(rekord)
+
+    def lekeres(self, fajta, kulcs):
+        """A rögzített adat, vagy None, ha ez még nem készült el"""
+        with self._zar:
+            return self._ertekek.get((fajta, kulcs))
+
+    # ----- függő DB írások -----
+    def iras_felvetele(self, muvelet, sorok):
+        """Az írás felvétele a végrehajtása ELŐTT; visszaadja az azonosítóját"""
+        iras_id = uuid.uuid4().hex
+        rekord = {"t": "iras", "k": iras_id, "a": {"muvelet": muvelet, "sorok": sorok}}
+        with self._zar:
+            self._iras(rekord)
+            self._alkalmaz(rekord)
+        return iras_id
+
+    def iras_alkalmazva(self, iras_id):
+        rekord = {"t": "alkalmazva", "k": iras_id}
+        with self._zar:
+            self._iras(rekord)
+            self._alkalmaz(rekord)
+
+    def fuggo_irasok(self):
+        """[(azonosító, művelet, sorok)] a felvett, de nem alkalmazott írásokra, felvételi sorrendben"""
+        with self._zar:
+            return [(iras_id, iras["muvelet"], iras["sorok"]) for iras_id, iras in self._fuggo.items()]
+
+    # ----- lezárás -----
+    def close(self):
+        with self._zar:
+            if not self._f.closed:
+                self._f.close()
+
+    def lezaras(self):
+        """Sikeres futás vége: a napló törlése (a következő futás elölről kezd)"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,168 @@
+# helysegnevtar.py
+# Közös helységnévtár: helynév szöveg -> (kanonikus név, szélesség, hosszúság).
+# A helyseg_koordinatak táblát egyszer olvassuk be, és lemezen tároljuk egy forrás-bélyeggel
+# (sorok száma + legnagyobb id); amíg a bélyeg nem változik, nem olvassuk újra.
+# Az illesztés előre kiszámolt normalizált indexen megy (kisbetű, irányítószám, Budapest
+# kerületek / "Bp.", ékezet nélküli tartalék), így a scraperek és a szinkron ugyanazt látják.
+import os
+import re
+import json
+import unicodedata
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from db_muveletek import sorok_lapozva
+
+# ---------------------------------------------------------
+# Beállítások
+# ---------------------------------------------------------
+HELYSEGNEVTAR_PATH = os.getenv("HELYSEGNEVTAR_PATH", os.path.join(os.getcwd(), "helysegnevtar.json"))
+KOORDINATA_TABLA = "helyseg_koordinatak"
+
+# A lemezes fájl formátumának verziója (változáskor az új kód újraolvassa a táblát)
+FAJL_VERZIO = 1
+# Ennyi naponta akkor is újraolvassuk, ha a bélyeg nem változott (helyben javított koordináták)
+MAX_KOR_NAPOK = 7
+
+# A sorokba írt mezők (a helyseg_koordinatak oszlopneveivel)
+HELYSEG_MEZOK = ("helyseg_nev", "szel_fok", "hossz_fok")
+
+Hely = namedtuple("Hely", "nev lat lng")
+
+# "Budapest ...", "Bp. ...", vagy önálló kerület ("XIII. kerület", "13. ker."); más település
+# kerülete / városrésze ("Miskolc, ... kerület") nem
+_BUDAPEST_RE = re.compile(r"^(?:budapest\b|bp\b|(?:[ivxl]+|\d{1,2})\.?\s*ker(?:ület|\.))")
+_IRANYITOSZAM_RE = re.compile(r"^\d{4}\s+")
+
+
+# ---------------------------------------------------------
+# Normalizálás
+# ---------------------------------------------------------
+def hely_kulcs(nev):
+    """
+    Helynév -> összehasonlítható kulcs: kisbetű, összevont szóközök, az első vessző előtti rész,
+    irányítószám nélkül; Budapest kerületei és a "Bp." alak -> "budapest".
+    """
+    if not nev:
+        return ""
+    kulcs = " ".join(str(nev).lower().split()).split(",")[0].strip()
+    kulcs = _IRANYITOSZAM_RE.sub("", kulcs)
+    if _BUDAPEST_RE.search(kulcs):
+        return "budapest"
+    return kulcs
+
+
+def ekezet_nelkul(szoveg):
+    return "".join(c for c in unicodedata.normalize("NFKD", szoveg) if not unicodedata.combining(c))
+
+
+# ---------------------------------------------------------
+# Névtár
+# ---------------------------------------------------------
+class Helysegnevtar:
+    """Előre kiszámolt index: kulcs -> Hely, és ékezet nélküli kulcs -> Hely (ha egyértelmű)"""
+
+    def __init__(self, helyek):
+        self.index = {}
+        ekezet_nelkuli = {}
+        for nev, lat, lng in helyek:
+            kulcs = hely_kulcs(nev)
+            if not kulcs or kulcs in self.index:
+                continue
+            self.index[kulcs] = Hely(nev, lat, lng)
+            tartalek = ekezet_nelkul(kulcs)
+            # két különböző helyre mutató ékezet nélküli alak nem használható
+            ekezet_nelkuli[tartalek] = None if tartalek in ekezet_nelkuli else self.index[kulcs]
+        self.ekezet_nelkuli = {k: h for k, h in ekezet_nelkuli.items() if h}
+        self._feloldott = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def feloldas(self, szoveg):
+        """Helynév szöveg -> Hely, vagy None"""
+        if szoveg in self._feloldott:
+            return self._feloldott[szoveg]
+        kulcs = hely_kulcs(szoveg)
+        hely = self.index.get(kulcs) or self.ekezet_nelkuli.get(ekezet_nelkul(kulcs))
+        self._feloldott[szoveg] = hely
+        return hely
+
+    def mezok(self, szoveg):
+        """A sorba írandó mezők (HELYSEG_MEZOK); feloldhatatlan helynél mind None"""
+        hely = self.feloldas(szoveg)
+        if not hely:
+            return dict.fromkeys(HELYSEG_MEZOK)
+        return {"helyseg_nev": hely.nev, "szel_fok": hely.lat, "hossz_fok": hely.lng}
+
+
+# ---------------------------------------------------------
+# Betöltés (lemezes gyorsítótár + forrás-bélyeg)
+# ---------------------------------------------------------
+def forras_belyeg(supabase):
+    """A koordináta tábla olcsó verzió-bélyege: "sorok száma:legnagyobb id" """
+    resp = supabase.table(KOORDINATA_TABLA).select("id", count="exact").order("id", desc=True).limit(1).execute()
+    max_id = resp.data[0]["id"] if resp.data else 0
+    return f"{resp.count}:{max_id}"
+
+
+def helyek_beolvasasa(supabase):
+    """[(név, lat, lng)] a koordináta táblából; a hibás / nullás koordinátájú sorok kimaradnak"""
+    helyek = []
+    for k in sorok_lapozva(supabase, KOORDINATA_TABLA, "helyseg_nev, szel_fok, hossz_fok"):
+        try:
+            lat, lng = float(k["szel_fok"]), float(k["hossz_fok"])
+        except (TypeError, ValueError):
+            continue
+        if k.get("helyseg_nev") and lat and lng:
+            helyek.append((k["helyseg_nev"], lat, lng))
+    return helyek
+
+
+def _fajl_beolvasasa(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            adat = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return adat if adat.get("verzio") == FAJL_VERZIO else None
+
+
+def helysegnevtar_betoltese(supabase, path=HELYSEGNEVTAR_PATH):
+    """
+    A névtár a lemezes fájlból, ha a forrás-bélyeg egyezik és nem túl régi;
+    különben a tábla újraolvasása és a fájl frissítése.
+    """
+    tarolt = _fajl_beolvasasa(path)
+    belyeg = forras_belyeg(supabase)
+    if tarolt and tarolt.get("belyeg") == belyeg and \
+            datetime.now(timezone.utc) - datetime.fromisoformat(tarolt["letrehozva"]) < timedelta(days=MAX_KOR_NAPOK):
+        return Helysegnevtar(tarolt["helyek"])
+
+    helyek = helyek_beolvasasa(supabase)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "verzio": FAJL_VERZIO,
+            "belyeg": belyeg,
+            "letrehozva": datetime.now(timezone.utc).isoformat(),
+            "helyek": helyek,
+        }, f, ensure_ascii=False)
+    print(f"📍 Helységnévtár frissítve: {len(helyek)} hely ({path})")
+    return Helysegnevtar(helyek)
+
+
+_nevtar = {}
+
+
+def helysegnevtar(supabase):
+    """
+    A folyamaton belül egyszer betöltött névtár.
+    Hiba esetén None - ilyenkor a sorok koordináta nélkül készülnek.
+    """
+    if "nevtar" not in _nevtar:
+        try:
+            _nevtar["nevtar"] = helysegnevtar_betoltese(supabase)
+        except Exception as e:
+            print(f"⚠ Helységnévtár nem tölthető be, a sorok koordináta nélkül készülnek: {e}")
+            _nevtar["nevtar"] = None
+    return _nevtar["nevtar"]
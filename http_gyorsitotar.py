@@ -0,0 +1,120 @@
+# http_gyorsitotar.py
+# Lemezes, feltételes HTTP gyorsítótár (URL kulcs, zlib-tömörített törzs, SQLite).
+# - ha a bejegyzés a TTL-en belül van: kérés nélkül visszaadjuk
+# - különben If-None-Match / If-Modified-Since fejléccel kérdezünk; 304-nél a tárolt törzs megy vissza
+# - méretkorlát: a legrégebben használt bejegyzések törlődnek (LRU)
+import time
+import zlib
+import sqlite3
+
+
+class GyorsitotarValasz:
+    """A requests.Response azon része, amit a hívók használnak (ok, status_code, text, headers)"""
+
+    def __init__(self, url, text, headers):
+        self.url = url
+        self.text = text
+        self.headers = headers
+        self.status_code = 200
+        self.ok = True
+        self.from_cache = True
+
+
+class HttpGyorsitotar:
+    def __init__(self, path, max_meret_mb=200):
+        self.path = path
+        self.max_meret = int(max_meret_mb * 1024 * 1024)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS oldalak (
+                url TEXT PRIMARY KEY,
+                torzs BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                letoltve REAL,
+                hasznalva REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS oldalak_hasznalva ON oldalak (hasznalva)")
+        self.conn.commit()
+        self.statisztika = {"friss": 0, "304": 0, "letoltve": 0}
+
+    def _bejegyzes(self, url):
+        return self.conn.execute(
+            "SELECT torzs, etag, last_modified, letoltve FROM oldalak WHERE url = ?", (url,)
+        ).fetchone()
+
+    def _valasz(self, url, bejegyzes):
+        torzs, etag, last_modified, _ = bejegyzes
+        self.conn.execute("UPDATE oldalak SET hasznalva = ? WHERE url = ?", (time.time(), url))
+        self.conn.commit()
+        headers = {}
+        if etag:
+            headers["ETag"] = etag
+        if last_modified:
+            headers["Last-Modified"] = last_modified
+        return GyorsitotarValasz(url, zlib.decompress(torzs).decode("utf-8"), headers)
+
+    def friss(self, url, ttl):
+        """A tárolt válasz, ha `ttl` másodpercnél nem régebbi; különben None"""
+        if ttl <= 0:
+            return None
+        bejegyzes = self._bejegyzes(url)
+        if bejegyzes and time.time() - bejegyzes[3] < ttl:
+            self.statisztika["friss"] += 1
+            return self._valasz(url, bejegyzes)
+        return None
+
+    def feltetel_fejlecek(self, url):
+        """If-None-Match / If-Modified-Since a tárolt bejegyzés alapján"""
+        bejegyzes = self._bejegyzes(url)
+        if not bejegyzes:
+            return {}
+        fejlecek = {}
+        if bejegyzes[1]:
+            fejlecek["If-None-Match"] = bejegyzes[1]
+        if bejegyzes[2]:
+            fejlecek["If-Modified-Since"] = bejegyzes[2]
+        return fejlecek
+
+    def nem_valtozott(self, url):
+        """304 után: a tárolt törzs, frissített letöltési idővel"""
+        bejegyzes = self._bejegyzes(url)
+        if not bejegyzes:
+            return None
+        self.statisztika["304"] += 1
+        self.conn.execute("UPDATE oldalak SET letoltve = ? WHERE url = ?", (time.time(), url))
+        return self._valasz(url, bejegyzes)
+
+    def tarol(self, url, resp):
+        """Sikeres válasz eltárolása, majd szükség esetén LRU ürítés"""
+        self.statisztika["letoltve"] += 1
+        most = time.time()
+        # a már dekódolt szöveget tároljuk UTF-8-ban, így visszaolvasáskor nincs kódolás találgatás
+        self.conn.execute(
+            "INSERT OR REPLACE INTO oldalak (url, torzs, etag, last_modified, letoltve, hasznalva) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (url, zlib.compress(resp.text.encode("utf-8"), 6),
+             resp.headers.get("ETag"), resp.headers.get("Last-Modified"), most, most),
+        )
+        self._uritas()
+        self.conn.commit()
+
+    def _uritas(self):
+        meret = self.conn.execute("SELECT COALESCE(SUM(LENGTH(torzs)), 0) FROM oldalak").fetchone()[0]
+        if meret <= self.max_meret:
+            return
+        cel = self.max_meret * 0.9
+        for url, hossz in self.conn.execute("SELECT url, LENGTH(torzs) FROM oldalak ORDER BY hasznalva").fetchall():
+            if meret <= cel:
+                break
+            self.conn.execute("DELETE FROM oldalak WHERE url = ?", (url,))
+            meret -= hossz
+
+    def osszegzes(self):
+        s = self.statisztika
+        return f"HTTP gyorsítótár: {s['friss']} friss találat, {s['304']} nem változott (304), {s['letoltve']} teljes letöltés"
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
@@ -1,18 +1,35 @@
 # jofogas_pipeline.py
 import os
 import re
+import atexit
+import asyncio
+import queue
+import threading
 import time
 import json
+import argparse
+import multiprocessing
 import random
 import urllib3
 from curl_cffi import requests
 from bs4 import BeautifulSoup
-from datetime import datetime
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from html import unescape as html_unescape
+from html.entities import html5 as html5_entities
+from html.parser import HTMLParser
+from urllib.parse import urlparse
 from supabase import create_client
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+from db_muveletek import upsert_darabolva, linkek_frissitese, hianyzok_inaktivalasa, linkek_lapozva, tartalom_hash
+from link_tukor import szinkronizalt_tukor
+from helysegnevtar import helysegnevtar, hely_kulcs
+from oldal_tar import OldalTar, oldal_olvasasa
+from futasi_naplo import FutasiNaplo
 
 # ----- FIGYELMEZTETÉS (SSL kikapcsolás miatt) -----
 # Az oldal SSL ellenőrzésével baj van néha a gépeden — ezért letiltjuk a warningokat.
@@ -24,8 +41,12 @@ BASE_DOMAIN = "https://allas.jofogas.hu"
 
 # mappák
 BASE_DIR = os.path.join(os.getcwd(), "jofogas_data")
-SEARCH_DIR = os.path.join(BASE_DIR, "search_pages")
-JOB_DIR = os.path.join(BASE_DIR, "job_pages")
+PAGE_STORE_DIR = os.path.join(BASE_DIR, "oldalak")
+
+# oldaltár: a találati oldalak gyorsan változnak, az állásoldalak nem; méretkorlát MB-ban
+SEARCH_PAGE_TTL = int(os.getenv("JOFOGAS_KERESES_TTL_PERC", "30")) * 60
+JOB_PAGE_TTL = int(os.getenv("JOFOGAS_ALLAS_TTL_NAP", "7")) * 86400
+PAGE_STORE_MB = int(os.getenv("JOFOGAS_TAR_MB", "500"))
 
 # Supabase - legyen ENV-ben, vagy írd be ide (nem ajánlott)
 SUPABASE_URL = os.environ["SUPABASE_URL"]
@@ -47,8 +68,43 @@ USER_AGENTS = [
 # hálózati beállítások
 REQUEST_TIMEOUT = 30
 RETRY_COUNT = 3
-MIN_DELAY = 1.0
-MAX_DELAY = 3.0
+
+# párhuzamos letöltés: ennyi lekérés fut egyszerre, és hostonként legfeljebb ennyi kérés / mp
+DOWNLOAD_WORKERS = int(os.getenv("JOFOGAS_WORKERS", "4"))
+HOST_MAX_RPS = float(os.getenv("JOFOGAS_MAX_RPS", "1.0"))
+
+# találati oldal letöltő szálak (a többi letöltő szál az állásoldalakat tölti)
+SEARCH_WORKERS = int(os.getenv("JOFOGAS_SEARCH_WORKERS", "2"))
+
+# parse-olás: folyamatok száma (--workers); a parse fokozat legfeljebb ennyi elemet gyűjt egy
+# folyamatkészlet hívásba, és legfeljebb ennyi mp-et vár a csoport feltöltésére
+PARSE_WORKERS = os.cpu_count() or 1
+PARSE_GROUP_SIZE = 64
+PARSE_GROUP_WAIT_SEC = 2.0
+PARSE_QUEUE_SIZE = 200
+
+# streaming pipeline: korlátos sorok a fokozatok között (a teli sor visszafogja az előző fokozatot),
+# a DB író WRITE_BATCH_SIZE soronként, vagy legkésőbb WRITE_FLUSH_SEC mp után ír
+JOB_QUEUE_SIZE = 200
+WRITE_QUEUE_SIZE = 500
+WRITE_BATCH_SIZE = 100
+WRITE_FLUSH_SEC = float(os.getenv("JOFOGAS_FLUSH_MP", "60"))
+
+# tartalmi változás: futásonként legfeljebb ennyi meglévő jofogas2 állásoldalt töltünk le újra
+# (a legrégebben letöltöttek elöl), és csak az eltérő tartalom hash-ű sorokat írjuk vissza
+RECHECK_MAX = int(os.getenv("JOFOGAS_VALTOZAS_MAX", "200"))
+
+# inaktiválás csak akkor, ha a most talált linkek száma legalább ekkora arányú a DB-ben aktívakhoz képest
+DEACTIVATE_MIN_RATIO = float(os.getenv("JOFOGAS_INAKTIVALAS_MIN_ARANY", "0.5"))
+
+# böngésző: egy Chromium a futásra, ennyi egyszerre használható contexttel (egy context kb. 100-200 MB,
+# szálanként külön Chromium kb. 300-500 MB lenne)
+BROWSER_CONTEXTS = int(os.getenv("JOFOGAS_BROWSER_CONTEXTS", str(DOWNLOAD_WORKERS)))
+# böngésző újrahasznosítás: ennyi oldal után, vagy ekkora (MB) Chromium RSS felett új context
+BROWSER_RECYCLE_PAGES = 200
+BROWSER_MAX_RSS_MB = 1500
+# egy lekérés legfeljebb ennyi mp-ig vár a böngésző szálra (context + navigáció)
+BROWSER_FETCH_TIMEOUT = 120
 
 # ----------------- SEGÉDFÜGGVÉNYEK -----------------
 def send_email(subject, message):
@@ -78,17 +134,55 @@ def supabase_client():
         raise RuntimeError("Állítsd be a SUPABASE_URL és SUPABASE_KEY környezeti változókat (vagy a scriptben).")
     return create_client(SUPABASE_URL, SUPABASE_KEY)
 
-def safe_request(session, url, retries=RETRY_COUNT):
+class BrowserManager:
     """
-    Playwright Chromium alapú HTML lekérés
+    Hosszú életű Playwright Chromium a teljes futásra, saját szálon és eseményhurokkal (async API).
+    A letöltő szálak a fetch()-en át kérnek oldalt; a böngésző szál egy `contexts` elemű context
+    készletből (asyncio.Queue) ad mindegyiknek egyet, így egyszerre legfeljebb ennyi lekérés fut.
+    Egy contextet N oldal után, vagy ha a Chromium folyamatok RSS-e átlépi a küszöböt, újranyitunk;
+    a kiesett böngészőt a következő lekérés újraindítja.
     """
 
-    for attempt in range(1, retries + 1):
-
-        try:
-            with sync_playwright() as p:
-
-                browser = p.chromium.launch(
+    def __init__(self, contexts=BROWSER_CONTEXTS, recycle_pages=BROWSER_RECYCLE_PAGES, max_rss_mb=BROWSER_MAX_RSS_MB):
+        self.contexts = max(1, contexts)
+        self.recycle_pages = recycle_pages
+        self.max_rss_mb = max_rss_mb
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._pool = None
+        self._launch_lock = None
+        self._slots = []
+        self._pages_served = 0
+
+    # ----- a böngésző szálon -----
+    def _call(self, coro):
+        """A coroutine futtatása a böngésző szálon (első híváskor elindítja), és az eredmény megvárása"""
+        with self._lock:
+            if self._thread is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="Browser", daemon=True)
+                self._thread.start()
+            loop = self._loop
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(BROWSER_FETCH_TIMEOUT)
+
+    async def _launch(self):
+        if self._pool is None:
+            self._pool = asyncio.Queue()
+            self._launch_lock = asyncio.Lock()
+            self._slots = [{"context": None, "page": None, "browser": None, "served": 0} for _ in range(self.contexts)]
+            for slot in self._slots:
+                self._pool.put_nowait(slot)
+        # egyszerre érkező lekérések ne indítsanak két böngészőt
+        async with self._launch_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self._browser is None or not self._browser.is_connected():
+                if self._browser is not None:
+                    print("[playwright] A böngésző kiesett, újraindítás")
+                self._browser = await self._playwright.chromium.launch(
                     headless=True,
                     args=[
                         "--no-sandbox",
@@ -96,46 +190,193 @@ def safe_request(session, url, retries=RETRY_COUNT):
                     ]
                 )
 
-                context = browser.new_context(
-                    user_agent=random.choice(USER_AGENTS),
-                    locale="hu-HU",
-                    viewport={
-                        "width": 1280,
-                        "height": 900
-                    }
-                )
+    async def _new_context(self, slot):
+        await self._close_context(slot)
+        slot["context"] = await self._browser.new_context(
+            user_agent=random.choice(USER_AGENTS),
+            locale="hu-HU",
+            viewport={
+                "width": 1280,
+                "height": 900
+            }
+        )
+        slot["page"] = await slot["context"].new_page()
+        slot["browser"] = self._browser
+        slot["served"] = 0
 
-                page = context.new_page()
+    async def _close_context(self, slot):
+        if slot["context"] is not None:
+            try:
+                await slot["context"].close()
+            except Exception as e:
+                print(f"[playwright] Context zárási hiba: {e}")
+        slot["context"] = None
+        slot["page"] = None
+
+    def _needs_recycle(self, slot):
+        # nincs még context, vagy egy azóta kiesett böngészőhöz tartozik
+        if slot["context"] is None or slot["browser"] is not self._browser:
+            return True
+        if slot["served"] >= self.recycle_pages:
+            print(f"[playwright] Context újranyitása {slot['served']} oldal után")
+            return True
+        if self._pages_served and self._pages_served % 25 == 0:
+            rss = child_processes_rss_mb()
+            if rss > self.max_rss_mb:
+                print(f"[playwright] Context újranyitása, RSS: {rss:.0f} MB > {self.max_rss_mb} MB")
+                return True
+        return False
+
+    async def _fetch(self, url):
+        await self._launch()
+        slot = await self._pool.get()
+        try:
+            if self._needs_recycle(slot):
+                await self._new_context(slot)
+            slot["served"] += 1
+            self._pages_served += 1
+            page = slot["page"]
+            response = await page.goto(url, wait_until="networkidle", timeout=30000)
+            status = response.status if response else None
+            if status is None or status < 400:
+                # kis várakozás, hogy JS lefusson
+                await page.wait_for_timeout(2000)
+            return status, await page.content()
+        except Exception:
+            # hiba után a contextet eldobjuk; a böngészőt a következő _launch indítja újra, ha kiesett
+            await self._close_context(slot)
+            raise
+        finally:
+            self._pool.put_nowait(slot)
+
+    async def _close(self):
+        for slot in self._slots:
+            await self._close_context(slot)
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception as e:
+                print(f"[playwright] Böngésző zárási hiba: {e}")
+            self._browser = None
+        if self._playwright is not None:
+            try:
+                await self._playwright.stop()
+            except Exception as e:
+                print(f"[playwright] Leállítási hiba: {e}")
+            self._playwright = None
+
+    # ----- a letöltő szálaknak -----
+    def fetch(self, url):
+        """(HTTP státusz vagy None, HTML) a böngésző szálon letöltve; hiba esetén kivételt dob"""
+        return self._call(self._fetch(url))
+
+    def close(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), self._loop).result(BROWSER_FETCH_TIMEOUT)
+        except Exception as e:
+            print(f"[playwright] Leállítási hiba: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        thread.join()
+        self._loop.close()
 
-                print(f"[PLAYWRIGHT] {url}")
 
-                response = page.goto(
-                    url,
-                    wait_until="networkidle",
-                    timeout=30000
-                )
+def child_processes_rss_mb():
+    """A saját folyamatunk összes leszármazottjának (Playwright driver + Chromium) RSS-e MB-ban (Linux /proc)"""
+    try:
+        parents = {}
+        for pid in os.listdir("/proc"):
+            if not pid.isdigit():
+                continue
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    # a comm mező tartalmazhat szóközt, ezért az utolsó ')' után bontunk
+                    fields = f.read().rsplit(")", 1)[1].split()
+                parents[int(pid)] = int(fields[1])
+            except (OSError, IndexError, ValueError):
+                continue
+    except OSError:
+        return 0.0
+
+    descendants = set()
+    frontier = [os.getpid()]
+    while frontier:
+        current = frontier.pop()
+        for pid, ppid in parents.items():
+            if ppid == current and pid not in descendants:
+                descendants.add(pid)
+                frontier.append(pid)
+
+    total_kb = 0
+    for pid in descendants:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except (OSError, ValueError):
+            continue
+    return total_kb / 1024
 
-                if response:
-                    print(
-                        f"[HTTP] {response.status}"
-                    )
 
-                    if response.status >= 400:
-                        print(
-                            page.content()[:1000]
-                        )
-                        browser.close()
-                        return None
+class HostRateLimiter:
+    """
+    Hostonkénti udvariassági keret: két kérés kezdete között legalább 1/rps mp
+    (kis véletlen szórással), függetlenül attól, hány szál kér egyszerre.
+    """
 
+    def __init__(self, rps=HOST_MAX_RPS):
+        self.interval = 1.0 / rps if rps > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
 
-                # kis várakozás, hogy JS lefusson
-                page.wait_for_timeout(2000)
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval * random.uniform(0.8, 1.2)
+        if slot > now:
+            time.sleep(slot - now)
 
-                html = page.content()
 
-                browser.close()
+RATE_LIMITER = HostRateLimiter()
 
-                return html
+# egy böngésző az összes letöltő szálnak; a Playwright objektumokat csak a böngésző szál használja
+BROWSER = BrowserManager()
+atexit.register(BROWSER.close)
+
+
+def safe_request(session, url, retries=RETRY_COUNT):
+    """
+    Playwright Chromium alapú HTML lekérés (a közös, hosszú életű böngészővel)
+    """
+
+    for attempt in range(1, retries + 1):
+
+        try:
+            RATE_LIMITER.wait(url)
+
+            print(f"[PLAYWRIGHT] {url}")
+
+            status, html = BROWSER.fetch(url)
+
+            if status is not None:
+                print(
+                    f"[HTTP] {status}"
+                )
+
+                if status >= 400:
+                    print(
+                        html[:1000]
+                    )
+                    return None
+
+            return html
 
 
         except Exception as e:
@@ -214,20 +455,24 @@ def safe_request(session, url, retries=RETRY_COUNT):
 
     return None
 
-def ensure_dirs():
-    os.makedirs(SEARCH_DIR, exist_ok=True)
-    os.makedirs(JOB_DIR, exist_ok=True)
+def open_page_store():
+    """Megnyitja az oldaltárat, és törli a lejárt / méretkorlát feletti oldalakat"""
+    store = OldalTar(PAGE_STORE_DIR, {"kereses": SEARCH_PAGE_TTL, "allas": JOB_PAGE_TTL}, PAGE_STORE_MB)
+    store.takaritas()
+    return store
 
 # ----------------- LÉPÉS 1: TALÁLATI OLDALAK - UTOLSÓ OLDALSZÁM -----------------
-def get_total_pages(session):
-    """Lekéri az 1. találati oldalt és a paginationből kigyűjti az utolsó oldalszámot (o=XXX)"""
+def get_total_pages(session, store):
+    """
+    Lekéri az 1. találati oldalt és a paginationből kigyűjti az utolsó oldalszámot (o=XXX).
+    Ha az oldal nem tölthető le, vagy nincs rajta lapozó, az oldalszám ismeretlen: None.
+    """
     url = BASE_SEARCH_TEMPLATE.format(page=1)
     html = safe_request(session, url)
     if not html:
-        return 1, None
-    # mentés debug célra
-    with open(os.path.join(SEARCH_DIR, "search_page_1.html"), "w", encoding="utf-8") as f:
-        f.write(html)
+        return None, None
+    # tárba mentjük, így a 2. lépés nem tölti le újra
+    store.ment(url, "kereses", html)
     soup = BeautifulSoup(html, "html.parser")
     last_link = soup.select_one("a.ad-list-pager-item-last")
     if last_link and last_link.get("href"):
@@ -244,88 +489,150 @@ def get_total_pages(session):
             nums.append(int(txt))
         except:
             pass
-    return (max(nums) if nums else 1), html
-
-# ----------------- LÉPÉS 2: TALÁLATI OLDALAK LETÖLTÉSE -----------------
-def download_search_pages(session, total_pages):
-    """Letölti az összes search page-et véletlensorrendben (ha már megvan, kihagyja)"""
-    pages = list(range(1, total_pages + 1))
-    random.shuffle(pages)
-    downloaded = []
-    for p in pages:
-        filename = os.path.join(SEARCH_DIR, f"search_page_{p}.html")
-        if os.path.exists(filename):
-            print(f"[skip] Már megvan: {filename}")
-            downloaded.append(filename)
-            continue
-        url = BASE_SEARCH_TEMPLATE.format(page=p)
-        print(f"[download] Találati oldal {p}/{total_pages} -> {url}")
-        html = safe_request(session, url)
-        if html:
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(html)
-            downloaded.append(filename)
-        else:
-            print(f"[error] Nem sikerült letölteni: {url}")
-        time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
-    return downloaded
-
-# ----------------- LÉPÉS 3: LINKKINYERÉS A LEMENTETT TALÁLATI OLDALAKBÓL -----------------
-def extract_links_from_search_pages():
-    """Beolvassa a search HTML-eket és kigyűjti az állás linkeket (h3.item-title a.subject)"""
-    links = set()
-    files = [f for f in os.listdir(SEARCH_DIR) if f.endswith(".html")]
-    for fname in files:
-        path = os.path.join(SEARCH_DIR, fname)
-        with open(path, encoding="utf-8") as f:
-            soup = BeautifulSoup(f, "html.parser")
-        for a in soup.select("h3.item-title a.subject"):
-            href = a.get("href")
-            if not href:
-                continue
-            if href.startswith("/"):
-                href = BASE_DOMAIN + href
-            links.add(href)
-    return sorted(links)
-
-# ----------------- LÉPÉS 4: ÁLLÁSOLDALAK LETÖLTÉSE -----------------
-def download_job_pages(session, links):
-    """Letölti a job oldalak HTML-jeit job_pages mappába - visszaadja a sikeres és sikertelen listákat"""
-    success = []
-    failed = []
-    for i, link in enumerate(links, 1):
-        # fájlnév: utolsó path elem, ha ütközik, indexet teszünk elé
-        last = link.rstrip("/").split("/")[-1]
-        filename = os.path.join(JOB_DIR, last)
-        # biztosítsuk, hogy .htm vagy .html végződés legyen
-        if not filename.lower().endswith(".htm") and not filename.lower().endswith(".html"):
-            filename = filename + ".html"
-        if os.path.exists(filename):
-            print(f"[job skip] Már megvan: {filename}")
-            success.append(filename)
+    return (max(nums) if nums else None), html
+
+# ----------------- LÉPÉS 2: TALÁLATI OLDAL LETÖLTÉSE -----------------
+def fetch_search_page(session, store, page, total_pages):
+    """Egy találati oldal az oldaltárból, ha friss, különben letöltve - visszaadja a tárbeli útvonalat (vagy None)"""
+    url = BASE_SEARCH_TEMPLATE.format(page=page)
+    path = store.friss(url, "kereses")
+    if path:
+        print(f"[skip] Friss a tárban: {url}")
+        return path
+    print(f"[download] Találati oldal {page}/{total_pages} -> {url}")
+    html = safe_request(session, url)
+    if not html:
+        print(f"[error] Nem sikerült letölteni: {url}")
+        return None
+    return store.ment(url, "kereses", html)
+
+# ----------------- LÉPÉS 3: LINKKINYERÉS A TALÁLATI OLDALBÓL -----------------
+def extract_links_from_search_file(path):
+    """Egy lementett search HTML állás linkjei (h3.item-title a.subject)"""
+    links = []
+    soup = BeautifulSoup(oldal_olvasasa(path).decode("utf-8"), "html.parser")
+    for a in soup.select("h3.item-title a.subject"):
+        href = a.get("href")
+        if not href:
             continue
-        print(f"[job dl {i}/{len(links)}] {link}")
-        html = safe_request(session, link)
-        if html:
-            with open(filename, "w", encoding="utf-8") as f:
-                f.write(html)
-            success.append(filename)
-        else:
-            failed.append(link)
-            print(f"[job fail] {link}")
-        time.sleep(random.uniform(MIN_DELAY, MAX_DELAY))
-    return success, failed
+        if href.startswith("/"):
+            href = BASE_DOMAIN + href
+        links.append(href)
+    return links
+
+# ----------------- LÉPÉS 4: ÁLLÁSOLDAL LETÖLTÉSE -----------------
+def fetch_job_page(session, store, link, force=False):
+    """
+    Egy állásoldal az oldaltárból, ha friss (és nem `force`), különben letöltve -
+    visszaadja a tárbeli útvonalat (vagy None)
+    """
+    # a tárban URL-hash a kulcs, így két azonos végű link nem írja felül egymást
+    path = None if force else store.friss(link, "allas")
+    if path:
+        print(f"[job skip] Friss a tárban: {link}")
+        return path
+    print(f"[job dl] {link}")
+    html = safe_request(session, link)
+    if not html:
+        print(f"[job fail] {link}")
+        return None
+    return store.ment(link, "allas", html)
 
 # ----------------- LÉPÉS 5: PARSING ÁLLÁSOLDALAKBÓL -----------------
+NEXT_DATA_RE = re.compile(
+    rb"<script\b[^>]*\bid=[\"']?__NEXT_DATA__[\"']?[^>]*>(.*?)</script\s*>",
+    re.DOTALL | re.IGNORECASE,
+)
+
+
+def extract_next_data_bytes(path):
+    """
+    A <script id="__NEXT_DATA__"> tartalma nyers bájtként, DOM építés nélkül
+    (regex a kicsomagolt oldalon); None, ha nincs ilyen tag vagy üres.
+    """
+    m = NEXT_DATA_RE.search(oldal_olvasasa(path))
+    return m.group(1) if m and m.group(1) else None
+
+
+class _TextExtractor(HTMLParser):
+    """Minimális HTML -> szöveg a BS4 html.parser szabályaival: a tagek között összefüggő szöveg
+    egy csomópont, a CDATA szöveg, a script/style/template tartalma és a megjegyzések nem"""
+
+    SKIP_TAGS = ("script", "style", "template")
+
+    def __init__(self):
+        # az entitásokat maga oldja fel, ugyanúgy, mint a BS4 (ismeretlen: "&nev" marad)
+        super().__init__(convert_charrefs=False)
+        self.parts = []
+        self._buf = []
+        self._skip = 0
+
+    def _flush(self):
+        if self._buf:
+            data = "".join(self._buf).strip()
+            self._buf = []
+            if data and not self._skip:
+                self.parts.append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in self.SKIP_TAGS:
+            self._skip += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in self.SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        self._buf.append(data)
+
+    def handle_entityref(self, name):
+        self._buf.append(html5_entities.get(name + ";", "&" + name))
+
+    def handle_charref(self, name):
+        self._buf.append(html_unescape(f"&#{name};"))
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def unknown_decl(self, data):
+        self._flush()
+        if data.startswith("CDATA["):
+            self._buf.append(data[len("CDATA["):])
+            self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def html_to_text(raw_html):
+    """Ugyanaz, mint BeautifulSoup(raw_html, "html.parser").get_text(" ", strip=True), fa építése nélkül"""
+    if not raw_html:
+        return ""
+    parser = _TextExtractor()
+    parser.feed(raw_html)
+    parser.close()
+    return " ".join(parser.parts)
+
+
 def parse_job_file(path):
     """Kiveszi a __NEXT_DATA__ JSON-ből a product objektumot és előállít egy dict-et a Supabase-hez"""
-    with open(path, encoding="utf-8") as f:
-        soup = BeautifulSoup(f, "html.parser")
-    script_tag = soup.find("script", {"id": "__NEXT_DATA__"})
-    if not script_tag or not script_tag.string:
+    raw_json = extract_next_data_bytes(path)
+    if not raw_json:
         return None
     try:
-        data = json.loads(script_tag.string)
+        data = json.loads(raw_json)
     except Exception as e:
         print(f"[parse error] JSON dekódolás sikertelen: {path} -> {e}")
         return None
@@ -336,8 +643,7 @@ def parse_job_file(path):
     parameters = {p.get("key"): p for p in product.get("parameters", [])}
     contact_members = product.get("param_groups", {}).get("contact_info", {}).get("members", [])
     raw_body = product.get("body", "") or ""
-    soup_body = BeautifulSoup(raw_body, "html.parser")
-    megjegyzes = soup_body.get_text(" ", strip=True)
+    megjegyzes = html_to_text(raw_body)
 
     telefonok = re.findall(r'(?:\+36|06)\s?\d{1,2}\s?\d{3}\s?\d{4}', megjegyzes)
     emailek = re.findall(r'[\w\.-]+@[\w\.-]+', megjegyzes)
@@ -352,7 +658,7 @@ def parse_job_file(path):
     elerhetosegek.extend(["email: "+e for e in all_emails])
 
     hely = parameters.get("city", {}).get("values", [{}])[0].get("label", "") or ""
-    if "kerület" in hely.lower():
+    if hely_kulcs(hely) == "budapest":
         hely = "Budapest"
 
     row = {
@@ -370,8 +676,9 @@ def parse_job_file(path):
         "elvart_iskolai_vegzettseg": parameters.get("education", {}).get("values", [{}])[0].get("label",""),
         "megjegyzes": megjegyzes,
         "email": all_emails[0] if all_emails else "",
-        "letrehozva": datetime.now().strftime("%Y.%m.%d %H:%M"),
-        "utoljara_frissitve": datetime.now().strftime("%Y.%m.%d %H:%M"),
+        "letrehozva": datetime.now(timezone.utc).isoformat(),
+        "utoljara_frissitve": datetime.now(timezone.utc).isoformat(),
+        "modositva": datetime.now(timezone.utc).isoformat(),
         "active": True,
         "keresesi_link": BASE_SEARCH_TEMPLATE.format(page=1),
         "teljes_resz_munkaido_ora": "",
@@ -386,20 +693,14 @@ def parse_job_file(path):
         "allas_egyeztetes_ideje": "",
         "szarmazas": "jofogas2"
     }
+    row["tartalom_hash"] = tartalom_hash(row)
     return row
 
 # ----------------- DB MŰVELETEK -----------------
 def db_active_links_for_jofogas(supabase):
     """Lekéri a Supabase-ból a jelenleg aktív, jofogas-os linkeket"""
     try:
-        res = (
-            supabase.table(TABLE_NAME)
-            .select("link")
-            .eq("szarmazas", "jofogas2")
-            .eq("active", True)
-            .execute()
-        )
-        return set(r["link"] for r in (res.data or []))
+        return linkek_lapozva(supabase, TABLE_NAME, {"szarmazas": "jofogas2", "active": True})
     except Exception as e:
         print(f"[DB hiba] Nem sikerült lekérni az adatbázist: {e}")
         return set()
@@ -421,26 +722,34 @@ def supabase_upsert_rows(supabase, rows):
         return None
 
 
+def write_rows(supabase, rows):
+    """Új sorok upsert-je link alapján (hibás csomagnál felezve) - (mentett, hibak)"""
+    mentett, hibak = upsert_darabolva(supabase, TABLE_NAME, rows, chunk_size=len(rows) or 1)
+    for row, hiba in hibak:
+        print(f"[DB hiba] Mentés sikertelen: {row.get('link', 'N/A')} {hiba or ''}")
+    return mentett, hibak
+
+
+def replay_pending_writes(supabase, naplo):
+    """Az előző, megszakadt futás felvett, de nem nyugtázott köteg-írásainak újrajátszása (upsert, idempotens)"""
+    for iras_id, muvelet, rows in naplo.fuggo_irasok():
+        print(f"[napló] Félbemaradt írás újrajátszása: {muvelet}, {len(rows)} sor")
+        write_rows(supabase, rows)
+        naplo.iras_alkalmazva(iras_id)
+
+
 def supabase_deactivate_missing(supabase, current_links):
     """
     Inaktiválja azokat a DB rekordokat, amelyek jofogas2 származásúak
     és active=True, de nincsenek a current_links-ben
     """
     try:
-        res = (
-            supabase.table(TABLE_NAME)
-            .select("link")
-            .eq("szarmazas", "jofogas2")
-            .eq("active", True)
-            .execute()
-        )
-        db_links = set(r["link"] for r in (res.data or []))
-        to_deactivate = list(db_links - set(current_links))
-        count = 0
-        if to_deactivate:
-            # egyszerre update-elünk minden hiányzót
-            supabase.table(TABLE_NAME).update({"active": False}).in_("link", to_deactivate).execute()
-            count = len(to_deactivate)
+        db_links = db_active_links_for_jofogas(supabase)
+        most = datetime.now(timezone.utc).isoformat()
+        # URL-hossz szerint darabolva, újrapróbálva (egyetlen óriási in_ szűrő helyett)
+        to_deactivate, count = hianyzok_inaktivalasa(supabase, TABLE_NAME, db_links, current_links, most)
+        if count < to_deactivate:
+            print(f"[warn] {to_deactivate} inaktiválandóból csak {count} frissült")
         return count
     except Exception as e:
         print(f"[DB hiba] Inaktiválás sikertelen: {e}")
@@ -449,20 +758,24 @@ def supabase_deactivate_missing(supabase, current_links):
 
 # ----------------- FŐFUTTATÓ -----------------
 def db_osszes_link(supabase):
-    """Visszaadja az ÖSSZES link-et az adatbázisból (active-tól függetlenül)"""
+    """Visszaadja az ÖSSZES link-et az adatbázisból (active-tól függetlenül, a helyi link tükörből, ha elérhető)"""
     try:
-        res = supabase.table(TABLE_NAME).select("link").execute()
-        return set(r["link"] for r in (res.data or []))
+        tukor = szinkronizalt_tukor(supabase, TABLE_NAME)
+        if tukor:
+            return tukor.linkek()
+        return linkek_lapozva(supabase, TABLE_NAME)
     except Exception as e:
         print(f"[DB hiba] Nem sikerült lekérni az összes linket: {e}")
         return set()
 
 
 def db_aktiv_jofogas_linkek(supabase):
-    """Visszaadja az AKTÍV jofogas2 állás linkjét az adatbázisból (statisztikához)"""
+    """Visszaadja az AKTÍV jofogas2 állás linkjét az adatbázisból (statisztikához, a helyi link tükörből, ha elérhető)"""
     try:
-        res = supabase.table(TABLE_NAME).select("link").eq("szarmazas", "jofogas2").eq("active", True).execute()
-        return set(r["link"] for r in (res.data or []))
+        tukor = szinkronizalt_tukor(supabase, TABLE_NAME)
+        if tukor:
+            return tukor.linkek(active=True, szarmazas="jofogas2")
+        return linkek_lapozva(supabase, TABLE_NAME, {"szarmazas": "jofogas2", "active": True})
     except Exception as e:
         print(f"[DB hiba] Nem sikerült lekérni az aktív jofogas linkeket: {e}")
         return set()
@@ -473,27 +786,399 @@ def frissit_meglevo_allasokat(supabase, linkek):
     if not linkek:
         return 0
     
-    most = datetime.now().strftime("%Y.%m.%d %H:%M")
-    frissitett = 0
-    
-    for link in linkek:
-        try:
-            supabase.table(TABLE_NAME).update({
-                "utoljara_frissitve": most,
-                "active": True
-            }).eq("link", link).execute()
-            frissitett += 1
-        except Exception as e:
-            print(f"[DB hiba] Frissítés sikertelen ({link}): {e}")
+    most = datetime.now(timezone.utc).isoformat()
+    frissitett = linkek_frissitese(supabase, TABLE_NAME, linkek, {
+        "utoljara_frissitve": most,
+        "active": True
+    })
     
     if frissitett > 0:
-        print(f"[info] {frissitett} meglévő állás frissítve")
+        print(f"[info] {frissitett} meglévő állás frissítve ({len(linkek)} linkből)")
     
     return frissitett
 
 
-def main():
-    ensure_dirs()
+# ----------------- STREAMING PIPELINE -----------------
+def parse_pool(workers=PARSE_WORKERS):
+    """
+    A parse folyamatkészlet (workers<=1 esetén None, ilyenkor sorosan parse-olunk).
+    Forkserver (ha nincs, spawn) indítással, és a munkásokat azonnal elindítjuk: a main() legelején
+    hívjuk, mielőtt Playwright / letöltő / író szál indulna - egy szálakat futtató folyamat fork-ja
+    holtpontot okozhat.
+    """
+    if workers <= 1:
+        return None
+    modszer = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(modszer))
+    list(executor.map(abs, range(workers)))
+    return executor
+
+
+def pool_call(func, item):
+    """func(item) a parse folyamatban: (True, eredmény) vagy (False, hibaüzenet) - egy hibás elem nem viszi el a csoportot"""
+    try:
+        return True, func(item)
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+
+def parse_chunksize(n, workers):
+    return max(1, min(64, n // (workers * 8)))
+
+
+def queue_put(q, item, consumer):
+    """q.put(item), de nem blokkol örökre, ha a sort fogyasztó szál közben leállt"""
+    while True:
+        if not consumer.is_alive():
+            raise RuntimeError(f"A(z) {consumer.name} szál leállt, a sor nem ürül")
+        try:
+            q.put(item, timeout=1)
+            return
+        except queue.Full:
+            pass
+
+
+class BatchWriter:
+    """
+    Kötegelő DB író külön szálon: a beérkező sorokat WRITE_BATCH_SIZE darabonként,
+    vagy ha az első várakozó sor óta WRITE_FLUSH_SEC eltelt, egy upsert-tel (link alapján) írja ki.
+    A köteget kiírás előtt a futási naplóba vesszük, így megszakadás után újrajátszható.
+    """
+
+    def __init__(self, supabase, naplo=None, batch_size=WRITE_BATCH_SIZE, flush_sec=WRITE_FLUSH_SEC):
+        self.supabase = supabase
+        self.naplo = naplo
+        self.batch_size = batch_size
+        self.flush_sec = flush_sec
+        self.queue = queue.Queue(maxsize=WRITE_QUEUE_SIZE)
+        self.inserted = 0
+        self.failed = 0
+        self.batches = 0
+        # a naplóban függőben maradt (újrajátszandó) kötegek száma
+        self.unapplied = 0
+        self.error = None
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="BatchWriter", daemon=True)
+        self._thread.start()
+
+    def put(self, row):
+        """Sor átadása az írónak (teli sornál blokkol, de ha az író leállt, hibát dob)"""
+        queue_put(self.queue, row, self._thread)
+
+    def close(self):
+        """A maradék kiírása és a szál leállítása; ha az író hibával állt le, RuntimeError"""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"A DB író hibával leállt: {self.error}") from self.error
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            self.error = e
+            print(f"[DB hiba] A DB író leállt: {e}")
+
+    def _loop(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                row = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self._flush(batch)
+                batch = []
+                continue
+            if row is None:
+                self._flush(batch)
+                return
+            if not batch:
+                deadline = time.monotonic() + self.flush_sec
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+
+    def _flush(self, batch):
+        if not batch:
+            return
+        self.batches += 1
+        try:
+            iras_id = self.naplo.iras_felvetele("uj_sorok", batch) if self.naplo else None
+            mentett, hibak = write_rows(self.supabase, batch)
+            if self.naplo:
+                self.naplo.iras_alkalmazva(iras_id)
+        except Exception as e:
+            # a köteg a naplóban függő marad, a következő futás újrajátssza; az író fut tovább
+            self.failed += len(batch)
+            self.unapplied += 1
+            print(f"[DB hiba] Batch {self.batches} írása sikertelen ({len(batch)} rekord): {e}")
+            return
+        if mentett and not self.inserted:
+            print(f"[info] Első beszúrás {time.monotonic() - self._started:.0f} mp után")
+        self.inserted += mentett
+        self.failed += len(hibak)
+        print(f"[info] Batch {self.batches}: {mentett} rekord beszúrva, {len(hibak)} sikertelen")
+
+
+class PoolStage:
+    """
+    Parse fokozat külön szálon: a korlátos sorból csoportokat gyűjt (PARSE_GROUP_SIZE elem, vagy
+    PARSE_GROUP_WAIT_SEC után ami addig jött), és egy chunk-olt executor.map hívással parse-olja őket.
+    Az eredményt (kontextus, eredmény vagy None) a `handler` kapja, a fokozat szálán.
+    """
+
+    def __init__(self, name, func, handler, executor=None, workers=PARSE_WORKERS):
+        self.func = func
+        self.handler = handler
+        self.executor = executor
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=PARSE_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def put(self, item, context):
+        queue_put(self.queue, (context, item), self._thread)
+
+    def close(self):
+        """A maradék feldolgozása és a szál leállítása"""
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        done = False
+        while not done:
+            first = self.queue.get()
+            if first is None:
+                return
+            group = [first]
+            deadline = time.monotonic() + PARSE_GROUP_WAIT_SEC
+            while len(group) < PARSE_GROUP_SIZE:
+                try:
+                    entry = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if entry is None:
+                    done = True
+                    break
+                group.append(entry)
+            self._process(group)
+
+    def _process(self, group):
+        items = [item for _, item in group]
+        try:
+            if self.executor:
+                results = list(self.executor.map(pool_call, repeat(self.func), items,
+                                                 chunksize=parse_chunksize(len(items), self.workers)))
+            else:
+                results = [pool_call(self.func, item) for item in items]
+        except Exception as e:  # pl. BrokenProcessPool
+            print(f"[parse hiba] {len(items)} elemes csoport: {e}")
+            results = [(False, str(e))] * len(items)
+        for (context, item), (ok, result) in zip(group, results):
+            if not ok:
+                print(f"[parse hiba] {item}: {result}")
+            try:
+                self.handler(context, result if ok else None)
+            except Exception as e:
+                print(f"[worker hiba] {context}: {e}")
+
+
+class JobPipeline:
+    """
+    Streaming futás korlátos sorokkal:
+      találati oldal szálak -> linkkinyerés (folyamatkészlet) -> (új linkek) -> állásoldal szálak
+      -> parse (folyamatkészlet) -> BatchWriter.
+    Minden fokozat azonnal továbbadja, amit elkészített, így az első beszúrás percek alatt megtörténik,
+    a memóriában csak a sorokban várakozó elemek vannak, és a futásidő a leglassabb fokozathoz közelít.
+    """
+
+    def __init__(self, session, supabase, store, osszes_link, aktiv_linkek, nevtar=None, executor=None, naplo=None,
+                 parse_workers=PARSE_WORKERS, tukor=None):
+        self.session = session
+        self.supabase = supabase
+        self.store = store
+        self.osszes_link = osszes_link
+        self.aktiv_linkek = aktiv_linkek
+        self.nevtar = nevtar
+        self.executor = executor
+        self.parse_workers = parse_workers
+        self.naplo = naplo
+        self.tukor = tukor
+        self.job_queue = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+        self._lock = threading.Lock()
+
+        self.search_pages_ok = 0
+        self.all_links = set()
+        self.new_links = []
+        self.existing_jofogas = []
+        self.existing_other = []
+        self.job_success = 0
+        self.job_failed = []
+        # újraellenőrzött meglévő állások: link -> a DB-ben tárolt tartalom hash (vagy None)
+        self.recheck = {}
+        self.modified = 0
+        self.parsed = 0
+        self.unresolved = 0
+        self.frissitett = 0
+        self.writer = None
+        self.search_stage = None
+        self.parse_stage = None
+
+    # ----- fokozatok -----
+    def _search_worker(self, pages, total_pages):
+        while True:
+            try:
+                page = pages.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                links = self.naplo.lekeres("oldal", page) if self.naplo else None
+                if links is not None:
+                    print(f"[napló] Találati oldal {page} a futási naplóból")
+                    self._links_found(links)
+                    continue
+                path = fetch_search_page(self.session, self.store, page, total_pages)
+                if path:
+                    self.search_stage.put(path, page)
+            except Exception as e:
+                print(f"[worker hiba] találati oldal {page}: {e}")
+
+    def _search_parsed(self, page, links):
+        if links is None:
+            return
+        if self.naplo:
+            self.naplo.rogzit("oldal", page, links)
+        self._links_found(links)
+
+    def _links_found(self, links):
+        """Szétválogatás: tényleg új (nincs a DB-ben) -> letöltő sor; aktív jofogas2 -> frissítendő; más -> skip"""
+        uj = []
+        with self._lock:
+            self.search_pages_ok += 1
+            for link in links:
+                if link in self.all_links:
+                    continue
+                self.all_links.add(link)
+                if link not in self.osszes_link:
+                    self.new_links.append(link)
+                    uj.append(link)
+                elif link in self.aktiv_linkek:
+                    self.existing_jofogas.append(link)
+                else:
+                    self.existing_other.append(link)
+        for link in uj:
+            self.job_queue.put(link)
+
+    def _job_worker(self):
+        while True:
+            link = self.job_queue.get()
+            if link is None:
+                return
+            try:
+                self._process_job(link)
+            except Exception as e:
+                print(f"[worker hiba] {link}: {e}")
+
+    def _process_job(self, link):
+        recheck = link in self.recheck
+        path = fetch_job_page(self.session, self.store, link, force=recheck)
+        if recheck:
+            if path:
+                self.parse_stage.put(path, link)
+            return
+        if not path:
+            with self._lock:
+                self.job_failed.append(link)
+            return
+        with self._lock:
+            self.job_success += 1
+        self.parse_stage.put(path, link)
+
+    def _job_parsed(self, link, row):
+        if not row:
+            return
+        if link in self.recheck:
+            # meglévő állás: csak ha a tartalma változott, és a létrehozás ideje marad
+            if row["tartalom_hash"] == self.recheck[link]:
+                return
+            row.pop("letrehozva", None)
+            with self._lock:
+                self.modified += 1
+        # koordináták a közös helységnévtárból (a parse folyamatokban nincs DB kapcsolat)
+        if self.nevtar:
+            row.update(self.nevtar.mezok(row["hely"]))
+        with self._lock:
+            if link not in self.recheck:
+                self.parsed += 1
+            if self.nevtar and row["szel_fok"] is None:
+                self.unresolved += 1
+        self.writer.put(row)
+
+    def _queue_rechecks(self, limit=RECHECK_MAX):
+        """A meglévő jofogas2 állások közül `limit` darab, a tárban legrégebben (vagy sosem) letöltöttek"""
+        if limit <= 0 or not self.existing_jofogas:
+            return
+        letoltve = self.store.letoltesi_idok(self.existing_jofogas)
+        minta = sorted(self.existing_jofogas, key=lambda link: letoltve.get(link, 0.0))[:limit]
+        tarolt = self.tukor.tartalom_hashek(minta) if self.tukor else {}
+        self.recheck = {link: tarolt.get(link) for link in minta}
+        print(f"[info] {len(minta)} meglévő állás újraellenőrzése (tartalmi változás)")
+        for link in minta:
+            self.job_queue.put(link)
+
+    # ----- futtatás -----
+    def run(self, total_pages, workers=DOWNLOAD_WORKERS, search_workers=SEARCH_WORKERS):
+        pages = queue.Queue()
+        order = list(range(1, total_pages + 1))
+        random.shuffle(order)
+        for p in order:
+            pages.put(p)
+
+        self.writer = BatchWriter(self.supabase, self.naplo)
+        self.parse_stage = PoolStage("parse", parse_job_file, self._job_parsed, self.executor, self.parse_workers)
+        self.search_stage = PoolStage("search-parse", extract_links_from_search_file, self._search_parsed,
+                                      self.executor, self.parse_workers)
+        job_threads = [threading.Thread(target=self._job_worker, daemon=True) for _ in range(max(1, workers))]
+        search_threads = [
+            threading.Thread(target=self._search_worker, args=(pages, total_pages), daemon=True)
+            for _ in range(max(1, min(search_workers, total_pages)))
+        ]
+        for t in job_threads + search_threads:
+            t.start()
+
+        for t in search_threads:
+            t.join()
+        self.search_stage.close()
+        print(f"[info] Találati oldalak kész: {self.search_pages_ok}/{total_pages}, linkek: {len(self.all_links)}")
+
+        # meglévő jofogas2 állások frissítése (csak utoljara_frissitve), amíg az állásoldalak töltődnek
+        self.frissitett = frissit_meglevo_allasokat(self.supabase, self.existing_jofogas)
+        self._queue_rechecks()
+
+        for _ in job_threads:
+            self.job_queue.put(None)
+        for t in job_threads:
+            t.join()
+        self.parse_stage.close()
+        self.writer.close()
+
+
+def main(workers=PARSE_WORKERS):
+    # a folyamatkészlet minden szál (Playwright, letöltők, író) előtt indul
+    executor = parse_pool(workers)
+    try:
+        run_pipeline(executor, workers)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def run_pipeline(executor, workers=PARSE_WORKERS):
+    store = open_page_store()
 
     session = requests.Session(
         impersonate="chrome136"
@@ -508,113 +1193,90 @@ def main():
 
     supabase = supabase_client()
 
-    # 1) lekérjük a total pages-t
-    total_pages, _ = get_total_pages(session)
+    # futási napló: megszakadt futás után a kész találati oldalak nem töltődnek le újra, és a
+    # félbemaradt írások a DB link lekérés előtt újrajátszódnak (így azokat már nem kezeljük újként)
+    naplo = FutasiNaplo("jofogas", {"kereses": BASE_SEARCH_TEMPLATE})
+    replay_pending_writes(supabase, naplo)
+
+    # 1) lekérjük a total pages-t; ha ismeretlen, csak az 1. oldalt járjuk be, és nem inaktiválunk
+    total_pages, _ = get_total_pages(session, store)
+    pages_known = total_pages is not None
+    if not pages_known:
+        print("[warn] A találati oldalak száma nem állapítható meg (nincs 1. oldal / lapozó), csak az 1. oldal készül")
+        total_pages = 1
     print(f"[info] Találati oldalak száma: {total_pages}")
 
-    # 1) lekérjük a total pages-t
-    total_pages, _ = get_total_pages(session)
-    print(f"[info] Találati oldalak száma: {total_pages}")
+    # 2) DB: ÖSSZES link lekérése (duplikáció elkerülésére) - a szétválogatás már letöltés közben megy
+    osszes_link = db_osszes_link(supabase)
+    aktiv_jofogas_linkek = db_aktiv_jofogas_linkek(supabase)
+    print(f"[info] DB-ben ÖSSZES link (bármilyen szarmazas/active): {len(osszes_link)}")
+    print(f"[info] DB-ben AKTÍV jofogas2 link: {len(aktiv_jofogas_linkek)}")
+    nevtar = helysegnevtar(supabase)
 
-    # 2) letöltjük a találati oldalakat
-    downloaded_searches = download_search_pages(session, total_pages)
+    # 3-9) találati oldalak -> linkek -> új állásoldalak -> parse -> kötegelt INSERT, egymással párhuzamosan
+    pipeline = JobPipeline(session, supabase, store, osszes_link, aktiv_jofogas_linkek, nevtar, executor, naplo,
+                           parse_workers=workers, tukor=szinkronizalt_tukor(supabase, TABLE_NAME))
+    pipeline.run(total_pages)
 
-    # 3) linkek kinyerése
-    all_links = extract_links_from_search_pages()
+    all_links = pipeline.all_links
     print(f"[info] Kinyert linkek száma: {len(all_links)}")
+    print(f"[info] Tényleg új állások (nincs a DB-ben): {len(pipeline.new_links)}")
+    print(f"[info] Már létező jofogas2 aktív állások (frissítendő): {len(pipeline.existing_jofogas)}")
+    print(f"[info] Már létező más forrásból (skip): {len(pipeline.existing_other)}")
+    print(f"[info] Sikeres letöltések: {pipeline.job_success}, sikertelen: {len(pipeline.job_failed)}")
+    print(f"[info] Parse-olt új hirdetések: {pipeline.parsed}")
+    print(f"[info] Újraellenőrzött meglévő állások: {len(pipeline.recheck)}, ebből módosult: {pipeline.modified}")
+    if pipeline.unresolved:
+        print(f"[warn] {pipeline.unresolved} új hirdetés helyéhez nincs koordináta")
+    print(f"[info] Összesen {pipeline.writer.inserted} rekord kiírva (új + módosult), {pipeline.writer.failed} sikertelen")
 
     if not all_links:
         print("[warn] Nincsenek linkek — leállok")
         send_email("Jófogás pipeline hibajelzés", "Nem sikerült kinyerni linkeket a találati oldalakról.")
+        store.close()
+        naplo.close()
         return
 
-    # 4) DB: ÖSSZES link lekérése (duplikáció elkerülésére)
-    osszes_link = db_osszes_link(supabase)
-    aktiv_jofogas_linkek = db_aktiv_jofogas_linkek(supabase)
-    print(f"[info] DB-ben ÖSSZES link (bármilyen szarmazas/active): {len(osszes_link)}")
-    print(f"[info] DB-ben AKTÍV jofogas2 link: {len(aktiv_jofogas_linkek)}")
-
-    # 5) Szétválogatás: Tényleg új (nincs a DB-ben EGYÁLTALÁN) vs Már létező
-    tenyleg_uj_linkek = []
-    mar_letezo_linkek_jofogas = []  # jofogas linkek, amik már bent vannak
-    mar_letezo_linkek_mas = []  # más forrásból származó linkek
-    
-    for link in all_links:
-        if link not in osszes_link:
-            # TÉNYLEG ÚJ - nincs a DB-ben
-            tenyleg_uj_linkek.append(link)
-        elif link in aktiv_jofogas_linkek:
-            # JOFOGAS2, AKTÍV - frissítendő
-            mar_letezo_linkek_jofogas.append(link)
-        else:
-            # Más forrásból vagy inaktív jofogas - skip (nem frissítjük)
-            mar_letezo_linkek_mas.append(link)
-    
-    print(f"[info] Tényleg új állások (nincs a DB-ben): {len(tenyleg_uj_linkek)}")
-    print(f"[info] Már létező jofogas2 aktív állások (frissítendő): {len(mar_letezo_linkek_jofogas)}")
-    print(f"[info] Már létező más forrásból (skip): {len(mar_letezo_linkek_mas)}")
-
-    # 6) Meglévő jofogas2 állások frissítése (csak utoljara_frissitve)
-    frissitett_count = frissit_meglevo_allasokat(supabase, mar_letezo_linkek_jofogas)
-
-    # 7) Csak az ÚJ állások letöltése és parse-olása
-    job_success_files = []
-    job_failed_links = []
-    
-    if tenyleg_uj_linkek:
-        print(f"[info] {len(tenyleg_uj_linkek)} új állásoldal letöltése...")
-        job_success_files, job_failed_links = download_job_pages(session, tenyleg_uj_linkek)
-        print(f"[info] Sikeres letöltések: {len(job_success_files)}, sikertelen: {len(job_failed_links)}")
-    else:
-        print("[info] Nincs új állás, nincs mit letölteni")
-
-    # 8) Parse CSAK az új állásokhoz (teljes mezőlistával, beleértve letrehozva-t)
-    new_rows = []
-    for fpath in job_success_files:
-        row = parse_job_file(fpath)
-        if row:
-            new_rows.append(row)
-    
-    print(f"[info] Parse-olt új hirdetések: {len(new_rows)}")
-
-    # 9) INSERT új rekordok (batch-enként)
-    inserted_count = 0
-    if new_rows:
-        batch_size = 100
-        failed_count = 0
-        
-        for i in range(0, len(new_rows), batch_size):
-            batch = new_rows[i:i+batch_size]
-            try:
-                result = supabase.table(TABLE_NAME).insert(batch).execute()
-                inserted_count += len(batch)
-                print(f"[info] Batch {i//batch_size + 1}: {len(batch)} rekord beszúrva")
-            except Exception as e:
-                failed_count += len(batch)
-                print(f"[DB hiba] Batch {i//batch_size + 1} Insert sikertelen: {e}")
-                print(f"[debug] Első hibás rekord link: {batch[0].get('link', 'N/A')}")
-        
-        print(f"[info] Összesen {inserted_count} új rekord beszúrva, {failed_count} sikertelen")
-
     # 10) Inaktiválás (amiket már nem találunk)
-    scrapped_linkek = set(all_links)
-    deactivated_count = supabase_deactivate_missing(supabase, scrapped_linkek)
-    print(f"[info] Inaktivált rekordok száma: {deactivated_count}")
+    # hiányzó találati oldalnál, ismeretlen oldalszámnál, vagy ha gyanúsan kevés linket láttunk,
+    # a hiányzó linkek nem biztos, hogy megszűntek
+    deactivated_count = 0
+    if not pages_known:
+        print("[warn] Ismeretlen oldalszám, inaktiválás kihagyva")
+    elif pipeline.search_pages_ok < total_pages:
+        print(f"[warn] {total_pages - pipeline.search_pages_ok} találati oldal nem tölthető le, inaktiválás kihagyva")
+    elif len(all_links) < len(aktiv_jofogas_linkek) * DEACTIVATE_MIN_RATIO:
+        print(f"[warn] Csak {len(all_links)} link a {len(aktiv_jofogas_linkek)} aktívhoz képest "
+              f"(< {DEACTIVATE_MIN_RATIO:.0%}), inaktiválás kihagyva")
+    else:
+        deactivated_count = supabase_deactivate_missing(supabase, all_links)
+        print(f"[info] Inaktivált rekordok száma: {deactivated_count}")
+
+    store.takaritas()
+    print(f"[info] {store.osszegzes()}")
+    store.close()
+    if pipeline.writer.unapplied:
+        # a sikertelen kötegeket a következő futás a naplóból újrajátssza
+        print(f"[warn] {pipeline.writer.unapplied} köteg nem íródott ki, futási napló megtartva: {naplo.path}")
+        naplo.close()
+    else:
+        naplo.lezaras()
 
     # 11) Email összegzés
     email_body = (
         f"Jófogás pipeline összegzés\n\n"
-        f"Találati oldalak száma: {total_pages}\n"
+        f"Találati oldalak száma: {total_pages if pages_known else 'ismeretlen (csak az 1. oldal)'}\n"
         f"Kinyert linkek: {len(all_links)}\n"
-        f"Tényleg új állások (nincs a DB-ben): {len(tenyleg_uj_linkek)}\n"
-        f"Már létező jofogas2 aktív (frissítve): {len(mar_letezo_linkek_jofogas)}\n"
-        f"Már létező más forrásból (skip): {len(mar_letezo_linkek_mas)}\n"
-        f"Letöltött új állásoldalak (sikeres): {len(job_success_files)}\n"
-        f"Parse-olt új hirdetések: {len(new_rows)}\n"
-        f"Új rekordok beszúrva a DB-be: {inserted_count}\n"
-        f"Meglévő rekordok frissítve: {frissitett_count}\n"
+        f"Tényleg új állások (nincs a DB-ben): {len(pipeline.new_links)}\n"
+        f"Már létező jofogas2 aktív (frissítve): {len(pipeline.existing_jofogas)}\n"
+        f"Már létező más forrásból (skip): {len(pipeline.existing_other)}\n"
+        f"Letöltött új állásoldalak (sikeres): {pipeline.job_success}\n"
+        f"Parse-olt új hirdetések: {pipeline.parsed}\n"
+        f"Rekordok kiírva a DB-be (új + módosult): {pipeline.writer.inserted}\n"
+        f"Újraellenőrzött meglévő állások: {len(pipeline.recheck)}, ebből módosult: {pipeline.modified}\n"
+        f"Meglévő rekordok frissítve: {pipeline.frissitett}\n"
         f"Inaktivált rekordok: {deactivated_count}\n"
-        f"Letöltési hibák (új állások): {len(job_failed_links)}\n"
+        f"Letöltési hibák (új állások): {len(pipeline.job_failed)}\n"
         f"\nTimestamp: {datetime.now().strftime('%Y.%m.%d %H:%M')}\n"
     )
     send_email("Jófogás álláspipeline - összegzés", email_body)
@@ -622,4 +1284,11 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Jófogás álláspipeline")
+    parser.add_argument("--workers", type=int, default=PARSE_WORKERS,
+                        help="parse-oló folyamatok száma (alapértelmezés: CPU magok száma)")
+    args = parser.parse_args()
+    try:
+        main(workers=args.workers)
+    finally:
+        BROWSER.close()
@@ -0,0 +1,196 @@
+# lefedettseg.py
+# Keresési lefedettség tervező a VMP (helyseg, tavolsag) körkereséseihez.
+#
+# A jelenlegi futási listák körei erősen átfedik egymást (pl. újpest / kispest /
+# budaörs / gödöllő Budapest körül), és minden átfedő kör ugyanazokat a találati
+# oldalakat lapozza újra (~30 mp / oldal). A tervező:
+#   1. a helyseg_koordinatak táblából feloldja a települések koordinátáit,
+#   2. a célterület = azok a települések, ahol van aktív VMP állás, és amelyeket a
+#      megadott futási lista körei lefednek,
+#   3. a becsült találatszám / kör = az aktív VMP állások száma a körön belüli településeken,
+#   4. mohó súlyozott halmazlefedéssel olyan (helyseg, tavolsag) listát választ,
+#      amely minden célpontot lefed, a lehető legkevesebb becsült oldallekéréssel.
+# A kimenet ugyanolyan futási lista, mint amit az allasok.py --lista fogad.
+#
+# Használat:
+#   python lefedettseg.py --lista reggel_varosok.txt --kimenet reggel_terv.txt
+import os
+import math
+import argparse
+from collections import Counter
+
+from supabase import create_client
+from db_muveletek import sorok_lapozva
+from helysegnevtar import helysegnevtar_betoltese, hely_kulcs
+
+# ---------------------------------------------------------
+# Beállítások
+# ---------------------------------------------------------
+TABLE_NAME = os.getenv("TABLE_NAME", "allasok")
+VMP_SZARMAZAS = "virtuális munkaerő piac"
+
+# A VMP kereső által elfogadott távolságok (km)
+TAVOLSAGOK = (10, 25, 50)
+TALALAT_PER_OLDAL = 40
+DEFAULT_TAVOLSAG = 50
+
+
+# ---------------------------------------------------------
+# Segédfüggvények
+# ---------------------------------------------------------
+def tavolsag_km(a, b):
+    """Haversine távolság két (lat, lng) pont között km-ben"""
+    lat1, lng1 = map(math.radians, a)
+    lat2, lng2 = map(math.radians, b)
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(h))
+
+
+def becsult_oldalak(talalat):
+    """Ennyi találati oldalt kell lapozni (legalább egyet mindig lekérünk)"""
+    return max(1, math.ceil(talalat / TALALAT_PER_OLDAL))
+
+
+def futasi_lista_beolvasasa(path):
+    """Ugyanaz a formátum, mint az allasok.py --lista: soronként "város [km]" """
+    varosok = []
+    with open(path, encoding="utf-8") as f:
+        for sor in f:
+            sor = sor.split("#", 1)[0].strip()
+            if not sor:
+                continue
+            reszek = sor.split()
+            varosok.append((reszek[0], int(reszek[1]) if len(reszek) > 1 else DEFAULT_TAVOLSAG))
+    return varosok
+
+
+# ---------------------------------------------------------
+# Tervezés
+# ---------------------------------------------------------
+def korben(kozeppont, tavolsag, helyek):
+    """A `helyek` ({kulcs: (lat, lng)}) közül a kör által lefedett kulcsok"""
+    return {kulcs for kulcs, koord in helyek.items() if tavolsag_km(kozeppont, koord) <= tavolsag}
+
+
+def terv_keszitese(koordinatak, allas_szamok, jelenlegi, tavolsagok=TAVOLSAGOK):
+    """
+    koordinatak: {hely_kulcs: (nev, lat, lng)}
+    allas_szamok: {hely_kulcs: aktív VMP állások száma}
+    jelenlegi: [(város, km)] - ezek körei adják a célterületet
+    Visszaad: (terv [(nev, km, becsült találat)], célpontok halmaza, fel nem oldott városok)
+    """
+    helyek_allassal = {
+        kulcs: (lat, lng) for kulcs, (_, lat, lng) in koordinatak.items() if allas_szamok.get(kulcs)
+    }
+
+    celpontok = set()
+    nem_talalt = []
+    for varos, km in jelenlegi:
+        kulcs = hely_kulcs(varos)
+        if kulcs not in koordinatak:
+            nem_talalt.append(varos)
+            continue
+        _, lat, lng = koordinatak[kulcs]
+        celpontok |= korben((lat, lng), km, helyek_allassal)
+
+    # jelöltek: minden célpont (és jelenlegi középpont) minden megengedett távolsággal
+    kozeppontok = set(celpontok) | {hely_kulcs(v) for v, _ in jelenlegi if hely_kulcs(v) in koordinatak}
+    jeloltek = []
+    for kulcs in kozeppontok:
+        nev, lat, lng = koordinatak[kulcs]
+        for km in tavolsagok:
+            lefedett = korben((lat, lng), km, helyek_allassal)
+            talalat = sum(allas_szamok[k] for k in lefedett)
+            jeloltek.append((nev, km, lefedett & celpontok, talalat))
+
+    # mohó súlyozott halmazlefedés: új lefedett állás / becsült oldal
+    terv = []
+    fedetlen = set(celpontok)
+    while fedetlen:
+        legjobb = max(
+            jeloltek,
+            key=lambda j: (sum(allas_szamok[k] for k in j[2] & fedetlen) / becsult_oldalak(j[3]), -j[1]),
+        )
+        uj = legjobb[2] & fedetlen
+        if not uj:
+            break
+        terv.append((legjobb[0], legjobb[1], legjobb[3]))
+        fedetlen -= uj
+
+    return terv, celpontok, nem_talalt
+
+
+def koltseg(korok):
+    """Becsült oldallekérések száma egy [(.., .., becsült találat)] listára"""
+    return sum(becsult_oldalak(talalat) for *_, talalat in korok)
+
+
+# ---------------------------------------------------------
+# Main
+# ---------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="VMP keresési lefedettség tervező")
+    parser.add_argument("--lista", action="append", required=True,
+                        help="jelenlegi futási lista (többször is megadható); ezek körei adják a célterületet")
+    parser.add_argument("--kimenet", help="ide írja a javasolt futási listát (allasok.py --lista formátum)")
+    parser.add_argument("--tavolsagok", default=",".join(map(str, TAVOLSAGOK)),
+                        help="megengedett keresési távolságok km-ben, vesszővel")
+    args = parser.parse_args()
+
+    tavolsagok = tuple(int(t) for t in args.tavolsagok.split(","))
+    jelenlegi = [v for path in args.lista for v in futasi_lista_beolvasasa(path)]
+
+    supabase = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"])
+
+    nevtar = helysegnevtar_betoltese(supabase)
+    koordinatak = {kulcs: (hely.nev, hely.lat, hely.lng) for kulcs, hely in nevtar.index.items()}
+    print(f"📍 {len(koordinatak)} település koordinátával")
+
+    allas_szamok = Counter()
+    link_szamok = Counter()
+    for sor in sorok_lapozva(supabase, TABLE_NAME, "hely, keresesi_link",
+                             {"active": True, "szarmazas": VMP_SZARMAZAS}):
+        allas_szamok[hely_kulcs(sor.get("hely"))] += 1
+        link_szamok[sor.get("keresesi_link")] += 1
+    print(f"📊 {sum(allas_szamok.values())} aktív VMP állás, {len(allas_szamok)} helyen")
+
+    terv, celpontok, nem_talalt = terv_keszitese(koordinatak, allas_szamok, jelenlegi, tavolsagok)
+    for varos in nem_talalt:
+        print(f"⚠ Nincs koordináta: {varos} (a célterületből kimarad)")
+
+    # Jelenlegi lista: becsült találat vs. a keresési linkhez tartozó (elsőként általa talált) állások
+    print("\n📋 JELENLEGI LISTA:")
+    helyek_allassal = {k: (lat, lng) for k, (_, lat, lng) in koordinatak.items() if allas_szamok.get(k)}
+    jelenlegi_korok = []
+    for varos, km in jelenlegi:
+        kulcs = hely_kulcs(varos)
+        if kulcs not in koordinatak:
+            continue
+        _, lat, lng = koordinatak[kulcs]
+        becsult = sum(allas_szamok[k] for k in korben((lat, lng), km, helyek_allassal))
+        keresesi_link = (
+            "https://vmp.munka.hu/allas/talalatok?kulcsszo=&kategoria=&isk=&oszk=&feor="
+            f"&helyseg={varos}&tavolsag={km}&munkaido=3&attelepules=&kereses=Keresés"
+        )
+        sajat = link_szamok.get(keresesi_link, 0)
+        atfedes = 1 - sajat / becsult if becsult else 0
+        jelenlegi_korok.append((varos, km, becsult))
+        print(f"   {varos} {km}km: ~{becsult} találat, ~{becsult_oldalak(becsult)} oldal, "
+              f"saját: {sajat} -> becsült átfedés {atfedes:.0%}")
+
+    unio = sum(allas_szamok[k] for k in celpontok)
+    print(f"\n🎯 Célterület: {len(celpontok)} település, ~{unio} egyedi állás")
+    print(f"   Jelenlegi lista: {len(jelenlegi_korok)} kör, ~{koltseg(jelenlegi_korok)} oldal")
+    print(f"   Javasolt lista:  {len(terv)} kör, ~{koltseg(terv)} oldal")
+
+    sorok = [f"# lefedettseg.py terv: {len(celpontok)} település, ~{koltseg(terv)} becsült oldal"]
+    sorok += [f"{nev.lower()} {km}" for nev, km, _ in terv]
+    print("\n" + "\n".join(sorok))
+    if args.kimenet:
+        with open(args.kimenet, "w", encoding="utf-8") as f:
+            f.write("\n".join(sorok) + "\n")
+        print(f"\n✅ Futási lista mentve: {args.kimenet}")
+
+
+if __name__ == "__main__":
+    main()
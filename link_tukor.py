@@ -0,0 +1,227 @@
+# link_tukor.py
+# Helyi SQLite tükör az állás tábla link-állapotáról (link, active, szarmazas,
+# keresesi_link, utoljara_frissitve, tartalom_hash), hogy az "új-e ez a link?" ellenőrzésekhez
+# ne kelljen minden futásnál a teljes link oszlopot letölteni.
+# Frissítés: utoljara_frissitve vízjel alapján inkrementálisan, időnként teljes újraolvasással.
+import os
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+from db_muveletek import sorok_lapozva, TARTALOM_HASH_OSZLOP
+
+# ---------------------------------------------------------
+# Beállítások
+# ---------------------------------------------------------
+LINK_TUKOR_PATH = os.getenv("LINK_TUKOR_PATH", os.path.join(os.getcwd(), "link_tukor.sqlite3"))
+
+# Ennyi naponta teljes újraolvasás (pl. DB-ben törölt sorok miatt)
+TELJES_SZINKRON_NAPOK = 7
+
+# A vízjelet ennyivel visszább tesszük (óraeltérés, futás közben írt sorok)
+VIZJEL_RAHAGYAS = timedelta(minutes=15)
+
+OSZLOPOK = f"id, link, active, szarmazas, keresesi_link, utoljara_frissitve, {TARTALOM_HASH_OSZLOP}"
+
+
+class LinkTukor:
+    """A link-állapot helyi tükre egy adott Supabase táblához"""
+
+    def __init__(self, table_name, path=LINK_TUKOR_PATH):
+        self.table_name = table_name
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS linkek (
+                link TEXT PRIMARY KEY,
+                id TEXT,
+                active INTEGER,
+                szarmazas TEXT,
+                keresesi_link TEXT,
+                utoljara_frissitve TEXT,
+                tartalom_hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS linkek_active ON linkek (active, szarmazas);
+            CREATE INDEX IF NOT EXISTS linkek_keresesi_link ON linkek (keresesi_link, active);
+            CREATE TABLE IF NOT EXISTS meta (
+                kulcs TEXT PRIMARY KEY,
+                ertek TEXT
+            );
+            -- csak helyi: a találati listában látott mezők hash-e, a teljes szinkron sem törli
+            CREATE TABLE IF NOT EXISTS lista_hashek (
+                link TEXT PRIMARY KEY,
+                hash TEXT
+            );
+            -- csak helyi: a részletes oldal utolsó újraellenőrzése (forgó mintavétel)
+            CREATE TABLE IF NOT EXISTS ellenorzesek (
+                link TEXT PRIMARY KEY,
+                ido TEXT
+            );
+        """)
+        oszlopok = {sor[1] for sor in self.conn.execute("PRAGMA table_info(linkek)")}
+        if "tartalom_hash" not in oszlopok:
+            # régebbi tükör fájl: új oszlop, és a következő szinkron legyen teljes
+            self.conn.execute("ALTER TABLE linkek ADD COLUMN tartalom_hash TEXT")
+            self.conn.execute("DELETE FROM meta WHERE kulcs = 'vizjel'")
+            self.conn.commit()
+        if self._meta("tabla") != table_name:
+            # másik táblához tartozó tükör: eldobjuk, a következő szinkron teljes lesz
+            self.conn.execute("DELETE FROM linkek")
+            self.conn.execute("DELETE FROM meta")
+            self._meta_beallit("tabla", table_name)
+            self.conn.commit()
+
+    # ----- meta -----
+    def _meta(self, kulcs):
+        sor = self.conn.execute("SELECT ertek FROM meta WHERE kulcs = ?", (kulcs,)).fetchone()
+        return sor[0] if sor else None
+
+    def _meta_beallit(self, kulcs, ertek):
+        self.conn.execute("INSERT OR REPLACE INTO meta (kulcs, ertek) VALUES (?, ?)", (kulcs, ertek))
+
+    # ----- szinkron -----
+    def szinkronizal(self, supabase):
+        """
+        Behúzza a változásokat a legutóbbi vízjel óta (vagy mindent, ha nincs
+        vízjel / régi a teljes szinkron). Visszaadja a beolvasott sorok számát.
+        """
+        kezdes = datetime.now(timezone.utc)
+        vizjel = self._meta("vizjel")
+        utolso_teljes = self._meta("utolso_teljes")
+        teljes = (
+            vizjel is None
+            or utolso_teljes is None
+            or kezdes - datetime.fromisoformat(utolso_teljes) > timedelta(days=TELJES_SZINKRON_NAPOK)
+        )
+
+        szurok = None if teljes else {"utoljara_frissitve": ("gte", vizjel)}
+        if teljes:
+            self.conn.execute("DELETE FROM linkek")
+
+        beolvasott = 0
+        csomag = []
+        for sor in sorok_lapozva(supabase, self.table_name, OSZLOPOK, szurok):
+            csomag.append(sor)
+            if len(csomag) >= 1000:
+                beolvasott += self.bejegyez(csomag, commit=False)
+                csomag = []
+        beolvasott += self.bejegyez(csomag, commit=False)
+
+        self._meta_beallit("vizjel", (kezdes - VIZJEL_RAHAGYAS).isoformat())
+        if teljes:
+            self._meta_beallit("utolso_teljes", kezdes.isoformat())
+        self.conn.commit()
+        print(f"🗂 Link tükör {'teljes' if teljes else 'inkrementális'} szinkron: {beolvasott} sor ({self.path})")
+        return beolvasott
+
+    def bejegyez(self, sorok, commit=True):
+        """Sorok (dict-ek a fenti oszlopokkal) beírása / felülírása link alapján"""
+        adatok = [
+            (
+                sor["link"],
+                None if sor.get("id") is None else str(sor.get("id")),
+                1 if sor.get("active") else 0,
+                sor.get("szarmazas"),
+                sor.get("keresesi_link"),
+                sor.get("utoljara_frissitve"),
+                sor.get(TARTALOM_HASH_OSZLOP),
+            )
+            for sor in sorok
+            if sor.get("link")
+        ]
+        if adatok:
+            self.conn.executemany("""
+                INSERT INTO linkek (link, id, active, szarmazas, keresesi_link, utoljara_frissitve, tartalom_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (link) DO UPDATE SET
+                    id = COALESCE(excluded.id, linkek.id),
+                    active = excluded.active,
+                    szarmazas = COALESCE(excluded.szarmazas, linkek.szarmazas),
+                    keresesi_link = COALESCE(excluded.keresesi_link, linkek.keresesi_link),
+                    utoljara_frissitve = excluded.utoljara_frissitve,
+                    tartalom_hash = COALESCE(excluded.tartalom_hash, linkek.tartalom_hash)
+            """, adatok)
+        if commit:
+            self.conn.commit()
+        return len(adatok)
+
+    # ----- lekérdezések -----
+    def linkek(self, active=None, szarmazas=None):
+        """Linkek halmaza, opcionálisan active / szarmazas szerint szűrve"""
+        feltetelek = []
+        parameterek = []
+        if active is not None:
+            feltetelek.append("active = ?")
+            parameterek.append(1 if active else 0)
+        if szarmazas is not None:
+            feltetelek.append("szarmazas = ?")
+            parameterek.append(szarmazas)
+        where = f" WHERE {' AND '.join(feltetelek)}" if feltetelek else ""
+        return {sor[0] for sor in self.conn.execute(f"SELECT link FROM linkek{where}", parameterek)}
+
+    def _linkenkent(self, sql, linkek):
+        """{link: érték} a `sql` (egy ? helyőrző a link listának) eredményéből, 500-as csomagokban"""
+        linkek = list(linkek)
+        eredmeny = {}
+        for i in range(0, len(linkek), 500):
+            csomag = linkek[i:i + 500]
+            helyorzok = ", ".join("?" * len(csomag))
+            eredmeny.update(self.conn.execute(sql.format(helyorzok), csomag).fetchall())
+        return eredmeny
+
+    def tartalom_hashek(self, linkek):
+        """{link: a DB-ben tárolt tartalom_hash} az ismert, hash-sel rendelkező linkekre"""
+        return self._linkenkent(
+            "SELECT link, tartalom_hash FROM linkek WHERE tartalom_hash IS NOT NULL AND link IN ({})", linkek
+        )
+
+    def lista_hashek(self, linkek):
+        """{link: a legutóbb a találati listában látott mezők hash-e}"""
+        return self._linkenkent("SELECT link, hash FROM lista_hashek WHERE link IN ({})", linkek)
+
+    def lista_hashek_mentese(self, hashek):
+        self.conn.executemany("INSERT OR REPLACE INTO lista_hashek (link, hash) VALUES (?, ?)", hashek.items())
+        self.conn.commit()
+
+    def legregebben_ellenorzott(self, linkek, darab):
+        """Legfeljebb `darab` link a megadottakból: előbb a sosem ellenőrzöttek, aztán a legrégebben ellenőrzöttek"""
+        linkek = list(dict.fromkeys(linkek))
+        idok = self._linkenkent("SELECT link, ido FROM ellenorzesek WHERE link IN ({})", linkek)
+        return sorted(linkek, key=lambda link: idok.get(link, ""))[:max(0, darab)]
+
+    def ellenorzes_mentese(self, linkek, ido):
+        self.conn.executemany("INSERT OR REPLACE INTO ellenorzesek (link, ido) VALUES (?, ?)",
+                              ((link, ido.isoformat()) for link in linkek))
+        self.conn.commit()
+
+    # ----- találati lista bejárás -----
+    def utolso_teljes_lapozas(self, keresesi_link):
+        """A keresés utolsó teljes (nem korán megállított) lapozásának ideje, vagy None"""
+        ertek = self._meta(f"teljes_lapozas:{keresesi_link}")
+        return datetime.fromisoformat(ertek) if ertek else None
+
+    def teljes_lapozas_mentese(self, keresesi_link, ido):
+        self._meta_beallit(f"teljes_lapozas:{keresesi_link}", ido.isoformat())
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+_tukrok = {}
+
+
+def szinkronizalt_tukor(supabase, table_name):
+    """
+    A folyamaton belül egyszer szinkronizált tükör az adott táblához.
+    Hiba esetén None - ilyenkor a hívó olvasson közvetlenül a DB-ből.
+    """
+    if table_name in _tukrok:
+        return _tukrok[table_name]
+    try:
+        tukor = LinkTukor(table_name)
+        tukor.szinkronizal(supabase)
+    except Exception as e:
+        print(f"⚠ Link tükör nem használható, közvetlen DB olvasás: {e}")
+        tukor = None
+    _tukrok[table_name] = tukor
+    return tukor
@@ -0,0 +1,156 @@
+# oldal_tar.py
+# Tömörített, URL-hash címzésű oldaltár a jofogas.py letöltéseihez.
+# - fájl: <mappa>/<fajta>/<hash[:2]>/<hash>.html.gz (a sha256(URL) nem ütközik, mint a régi fájlnevek)
+# - index (SQLite): url, fajta, letöltés ideje, státusz, tartalom hash, méret, utolsó használat
+# - fajtánkénti TTL: a lejárt oldalt újra letöltjük, a futás elején töröljük
+# - méretkorlát: a legrégebben használt oldalak törlődnek (LRU)
+import os
+import gzip
+import time
+import sqlite3
+import hashlib
+import threading
+
+
+def oldal_olvasasa(path):
+    """Egy tárolt oldal HTML-je bájtként (a parse folyamatok is ezt használják, index nélkül)"""
+    with gzip.open(path, "rb") as f:
+        return f.read()
+
+
+class OldalTar:
+    def __init__(self, mappa, ttl, max_meret_mb=500):
+        """`ttl`: {fajta: másodperc}, pl. {"kereses": 1800, "allas": 7 * 86400}"""
+        self.mappa = mappa
+        self.ttl = ttl
+        self.max_meret = int(max_meret_mb * 1024 * 1024)
+        os.makedirs(mappa, exist_ok=True)
+        # a letöltések több szálon futnak: egy kapcsolat, zárral
+        self._zar = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(mappa, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS oldalak (
+                kulcs TEXT PRIMARY KEY,
+                url TEXT,
+                fajta TEXT,
+                letoltve REAL,
+                statusz INTEGER,
+                tartalom_hash TEXT,
+                meret INTEGER,
+                hasznalva REAL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS oldalak_hasznalva ON oldalak (hasznalva)")
+        self.conn.commit()
+        self.statisztika = {"friss": 0, "letoltve": 0, "valtozatlan": 0, "torolve": 0}
+
+    @staticmethod
+    def kulcs(url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def utvonal(self, url, fajta):
+        kulcs = self.kulcs(url)
+        return os.path.join(self.mappa, fajta, kulcs[:2], f"{kulcs}.html.gz")
+
+    def friss(self, url, fajta):
+        """A tárolt oldal útvonala, ha a fajta TTL-jén belül van és a fájl megvan; különben None"""
+        with self._zar:
+            sor = self.conn.execute(
+                "SELECT letoltve FROM oldalak WHERE kulcs = ?", (self.kulcs(url),)
+            ).fetchone()
+            path = self.utvonal(url, fajta)
+            if not sor or time.time() - sor[0] >= self.ttl.get(fajta, 0) or not os.path.exists(path):
+                return None
+            self.conn.execute("UPDATE oldalak SET hasznalva = ? WHERE kulcs = ?", (time.time(), self.kulcs(url)))
+            self.conn.commit()
+            self.statisztika["friss"] += 1
+            return path
+
+    def letoltesi_idok(self, urlek):
+        """{url: utolsó letöltés ideje (epoch mp)} a tárban lévő URL-ekre"""
+        urlek = list(urlek)
+        kulcsok = {self.kulcs(url): url for url in urlek}
+        idok = {}
+        with self._zar:
+            lista = list(kulcsok)
+            for i in range(0, len(lista), 500):
+                csomag = lista[i:i + 500]
+                for kulcs, letoltve in self.conn.execute(
+                    f"SELECT kulcs, letoltve FROM oldalak WHERE kulcs IN ({', '.join('?' * len(csomag))})", csomag
+                ):
+                    idok[kulcsok[kulcs]] = letoltve
+        return idok
+
+    def ment(self, url, fajta, html, statusz=200):
+        """Letöltött oldal mentése; ha a tartalom nem változott, csak az időbélyeg frissül"""
+        adat = html.encode("utf-8") if isinstance(html, str) else html
+        tartalom_hash = hashlib.blake2b(adat, digest_size=16).hexdigest()
+        kulcs = self.kulcs(url)
+        path = self.utvonal(url, fajta)
+        most = time.time()
+        with self._zar:
+            sor = self.conn.execute("SELECT tartalom_hash FROM oldalak WHERE kulcs = ?", (kulcs,)).fetchone()
+            valtozatlan = sor and sor[0] == tartalom_hash and os.path.exists(path)
+        if valtozatlan:
+            self.statisztika["valtozatlan"] += 1
+            meret = os.path.getsize(path)
+        else:
+            self.statisztika["letoltve"] += 1
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            ideiglenes = f"{path}.{threading.get_ident()}.tmp"
+            with gzip.open(ideiglenes, "wb", compresslevel=6) as f:
+                f.write(adat)
+            os.replace(ideiglenes, path)
+            meret = os.path.getsize(path)
+        with self._zar:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO oldalak (kulcs, url, fajta, letoltve, statusz, tartalom_hash, meret, hasznalva) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (kulcs, url, fajta, most, statusz, tartalom_hash, meret, most),
+            )
+            self.conn.commit()
+        return path
+
+    def _torles(self, sorok):
+        for kulcs, url, fajta in sorok:
+            try:
+                os.remove(self.utvonal(url, fajta))
+            except FileNotFoundError:
+                pass
+            self.conn.execute("DELETE FROM oldalak WHERE kulcs = ?", (kulcs,))
+        self.statisztika["torolve"] += len(sorok)
+
+    def takaritas(self):
+        """A lejárt oldalak törlése, majd méretkorlát felett LRU ürítés"""
+        with self._zar:
+            most = time.time()
+            lejart = [
+                (kulcs, url, fajta)
+                for kulcs, url, fajta, letoltve in self.conn.execute("SELECT kulcs, url, fajta, letoltve FROM oldalak")
+                if most - letoltve >= self.ttl.get(fajta, 0)
+            ]
+            self._torles(lejart)
+
+            meret = self.conn.execute("SELECT COALESCE(SUM(meret), 0) FROM oldalak").fetchone()[0]
+            if meret > self.max_meret:
+                cel = self.max_meret * 0.9
+                uritendo = []
+                for kulcs, url, fajta, hossz in self.conn.execute(
+                    "SELECT kulcs, url, fajta, meret FROM oldalak ORDER BY hasznalva"
+                ).fetchall():
+                    if meret <= cel:
+                        break
+                    uritendo.append((kulcs, url, fajta))
+                    meret -= hossz
+                self._torles(uritendo)
+            self.conn.commit()
+
+    def osszegzes(self):
+        s = self.statisztika
+        return (f"Oldaltár: {s['friss']} friss találat, {s['letoltve']} új/változott, "
+                f"{s['valtozatlan']} változatlan tartalom, {s['torolve']} törölve")
+
+    def close(self):
+        with self._zar:
+            self.conn.commit()
+            self.conn.close()
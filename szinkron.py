@@ -1,10 +1,19 @@
 import os
+import json
+import time
+import random
+import asyncio
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from typesense import Client as TypesenseClient
+from typesense.exceptions import ObjectNotFound
 from typing import List, Dict, Optional, Any
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from collections import Counter
+from itertools import islice
+from db_muveletek import sorok_lapozva, ujraprobalva, MODOSITVA_OSZLOP
+from helysegnevtar import Helysegnevtar, helysegnevtar, hely_kulcs
 
 # Naplózás beállítása
 logging.basicConfig(level=logging.INFO)
@@ -26,156 +35,522 @@ typesense = TypesenseClient({
         'protocol': 'https'
     }],
     'api_key': os.getenv('TYPESENSE_API_KEY'),
-    'connection_timeout_seconds': 10
+    # nagy (több MB-os) JSONL import kérések miatt
+    'connection_timeout_seconds': 60
 })
 
 
-def normalize_place_name(place_name: Optional[str]) -> str:
-    """Helynevek normalizálása a koordinátákhoz való illesztéshez"""
-    if not place_name:
-        return ''
-    
-    # Kisbetűsítés és felesleges szóközök eltávolítása
-    normalized = place_name.strip().lower()
-    
-    # Budapest kerületek kezelése
-    if 'budapest' in normalized:
-        normalized = 'budapest'
-    
-    # Egyéb gyakori helynév normalizálások
-    replacements = {
-        'bp.': 'budapest',
-        'budaörs': 'budaörs',
-        'rákócziújfalu': 'rákócziújfalu',
-        'ászár': 'ászár'
-    }
-    
-    # Ismert helynevek cseréje
-    for from_str, to_str in replacements.items():
-        if from_str in normalized:
-            normalized = to_str
+# Az alias neve (a kereső ezt használja); mögötte időbélyeges collection-ök cserélődnek
+ALIAS_NEV = 'allasok'
+# Amíg az ALIAS_NEV nevet a régi, nem alias alapú 'allasok' collection foglalja, a szinkron ezt az
+# ideiglenes aliast állítja (a régi collection-höz nem nyúl, a keresők zavartalanul futnak).
+# Egyszeri, kézi átállás, a kettő közül az egyik:
+#   a) a keresők átállítása az ideiglenes aliasra (ATMENETI_ALIAS_NEV) - ezután minden marad így;
+#   b) `python szinkron.py --alias-atallas`: a régi collection törlése és rögtön utána az ALIAS_NEV
+#      alias létrehozása az ideiglenes alias collection-jére (a keresők a nevet szinte szünet nélkül látják)
+ATMENETI_ALIAS_NEV = os.getenv('TYPESENSE_ATMENETI_ALIAS', f'{ALIAS_NEV}_aktualis')
+
+# Az élő collection mellett ennyi korábbit tartunk meg (visszaállításhoz)
+MEGTARTOTT_REGI_COLLECTIONOK = 1
+
+# Ennél nagyobb import hiba arány esetén nem állunk át az új collection-re
+MAX_IMPORT_HIBA_ARANY = 0.01
+
+COLLECTION_MEZOK = [
+    {'name': 'id', 'type': 'string'},
+    {'name': 'munka_neve', 'type': 'string'},
+    {'name': 'munkakor', 'type': 'string'},
+    {'name': 'ceg_neve', 'type': 'string'},
+    {'name': 'hely', 'type': 'string'},
+    {'name': 'ceg', 'type': 'string'},
+    {'name': 'kepviselo_elerhetosegei', 'type': 'string', 'optional': True},
+    {'name': 'felajanlott_havi_brutto_kereset', 'type': 'string', 'optional': True},
+    {'name': 'munkavegzes_helye', 'type': 'string', 'optional': True},
+    {'name': 'megjegyzes', 'type': 'string', 'optional': True},
+    {'name': 'email', 'type': 'string', 'optional': True},
+    {'name': 'utoljara_frissitve', 'type': 'string', 'optional': True},
+    {'name': 'active', 'type': 'bool', 'optional': True},
+    {'name': 'munkarend', 'type': 'string', 'optional': True},
+    {'name': 'speciális_követelmények', 'type': 'string', 'optional': True},
+    {'name': 'speciális_körülmények', 'type': 'string', 'optional': True},
+    {'name': 'a_munkakorhoz_kapcsolodo_juttatasok', 'type': 'string', 'optional': True},
+    {'name': 'allas_egyeztes_helye', 'type': 'string', 'optional': True},
+    {'name': 'location', 'type': 'geopoint'},
+]
+
+
+def uj_collection_nev() -> str:
+    return f"{ALIAS_NEV}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}"
+
+
+def alias_collection(alias_nev: str = ALIAS_NEV) -> Optional[str]:
+    """Az alias mögötti collection neve, vagy None, ha még nincs alias"""
+    try:
+        return typesense.aliases[alias_nev].retrieve()['collection_name']
+    except ObjectNotFound:
+        return None
+
+
+def regi_collection_letezik() -> bool:
+    """Van-e még régi, nem alias alapú ALIAS_NEV nevű collection (az alias ellenőrzése után hívandó)"""
+    try:
+        typesense.collections[ALIAS_NEV].retrieve()
+        return True
+    except ObjectNotFound:
+        return False
+
+
+def elo_alias_nev() -> str:
+    """Az alias, amit a szinkron állít: ALIAS_NEV, vagy amíg a régi collection foglalja, ATMENETI_ALIAS_NEV"""
+    if alias_collection(ALIAS_NEV) is None and regi_collection_letezik():
+        logger.warning(f'A {ALIAS_NEV} nevet még a régi collection foglalja, ideiglenes alias: {ATMENETI_ALIAS_NEV} '
+                       f'(átállás: lásd ATMENETI_ALIAS_NEV)')
+        return ATMENETI_ALIAS_NEV
+    return ALIAS_NEV
+
+
+def collection_torlese(nev: str) -> None:
+    try:
+        typesense.collections[nev].delete()
+        logger.info(f'Collection törölve: {nev}')
+    except Exception as e:
+        logger.warning(f'Collection törlése sikertelen ({nev}): {str(e)}')
+
+
+# ---------------------------------------------------------
+# JSONL import (bájt alapú csomagolás, hibás dokumentumok újrapróbálása, dead-letter fájl)
+# ---------------------------------------------------------
+# Egy import kérés cél mérete; a dokumentumszám a dokumentumok méretéhez igazodik
+IMPORT_CEL_BAJT = int(float(os.getenv('TYPESENSE_IMPORT_MB', '2')) * 1024 * 1024)
+IMPORT_MAX_DOKUMENTUM = 10000
+
+# A hibás dokumentumok újrapróbálása (2, 4, 8 mp + szórás várakozással), utána dead-letter fájl
+IMPORT_UJRAPROBALASOK = 3
+DEAD_LETTER_PATH = os.getenv('TYPESENSE_DEAD_LETTER', os.path.join(os.getcwd(), 'typesense_dead_letter.jsonl'))
+
+
+def jsonl_importalasa(collection_nev: str, sorok: List[str]) -> tuple:
+    """
+    JSONL sorok upsert importja egy kérésben. Ha maga a kérés hibázik (időtúllépés,
+    túl nagy törzs), a csomagot felezve újraküldjük.
+    Visszaad: (sikeres darab, [(hibás sor, hibaüzenet)]).
+    """
+    payload = '\n'.join(sorok)
+    bajt = len(payload.encode('utf-8'))
+    kezdes = time.monotonic()
+    try:
+        valasz = typesense.collections[collection_nev].documents.import_(payload, {'action': 'upsert'})
+    except Exception as e:
+        if len(sorok) == 1:
+            return 0, [(sorok[0], str(e))]
+        logger.warning(f'Import kérés hiba ({len(sorok)} dokumentum, {bajt / 1024:.0f} kB): {str(e)} - felezés')
+        fele = len(sorok) // 2
+        sikeres1, hibak1 = jsonl_importalasa(collection_nev, sorok[:fele])
+        sikeres2, hibak2 = jsonl_importalasa(collection_nev, sorok[fele:])
+        return sikeres1 + sikeres2, hibak1 + hibak2
+
+    eredmenyek = [json.loads(sor) for sor in valasz.splitlines() if sor.strip()]
+    hibak = [(sor, e.get('error')) for sor, e in zip(sorok, eredmenyek) if not e.get('success')]
+    # ha a válasz rövidebb a kérésnél, a maradék sorsa ismeretlen: hibásnak vesszük
+    hibak += [(sor, 'nincs válasz a dokumentumra') for sor in sorok[len(eredmenyek):]]
+    sikeres = len(sorok) - len(hibak)
+    logger.info(
+        f'Batch: {len(sorok)} dokumentum, {bajt / 1024:.0f} kB, {time.monotonic() - kezdes:.2f} s. '
+        f'Sikeres: {sikeres}, Hibás: {len(hibak)}' + (f' (pl. {hibak[0][1]})' if hibak else '')
+    )
+    return sikeres, hibak
+
+
+def bajt_csomagok(sorok: List[str]):
+    """JSONL sorok csomagokra bontása IMPORT_CEL_BAJT / IMPORT_MAX_DOKUMENTUM szerint"""
+    csomag, meret = [], 0
+    for sor in sorok:
+        csomag.append(sor)
+        meret += len(sor.encode('utf-8')) + 1
+        if meret >= IMPORT_CEL_BAJT or len(csomag) >= IMPORT_MAX_DOKUMENTUM:
+            yield csomag
+            csomag, meret = [], 0
+    if csomag:
+        yield csomag
+
+
+def hibas_dokumentumok_ujraprobalasa(collection_nev: str, hibak: List[tuple]) -> tuple:
+    """Visszaad: (újrapróbálva sikeres darab, végleg hibás [(sor, hibaüzenet)])"""
+    sikeres = 0
+    for proba in range(1, IMPORT_UJRAPROBALASOK + 1):
+        if not hibak:
             break
-    
-    return normalized
+        varakozas = 2 ** proba + random.uniform(0, 1)
+        logger.info(f'{len(hibak)} hibás dokumentum újrapróbálása ({proba}/{IMPORT_UJRAPROBALASOK}) {varakozas:.1f} s múlva...')
+        time.sleep(varakozas)
+        uj_hibak = []
+        for csomag in bajt_csomagok([sor for sor, _ in hibak]):
+            csomag_sikeres, csomag_hibak = jsonl_importalasa(collection_nev, csomag)
+            sikeres += csomag_sikeres
+            uj_hibak += csomag_hibak
+        hibak = uj_hibak
+    return sikeres, hibak
+
+
+def dead_letter_mentese(collection_nev: str, hibak: List[tuple]) -> None:
+    """A végleg sikertelen dokumentumok hozzáfűzése a dead-letter JSONL fájlhoz"""
+    ido = datetime.now(timezone.utc).isoformat()
+    with open(DEAD_LETTER_PATH, 'a', encoding='utf-8') as f:
+        for sor, hiba in hibak:
+            f.write(json.dumps({'ido': ido, 'collection': collection_nev, 'hiba': hiba, 'dokumentum': json.loads(sor)},
+                               ensure_ascii=False) + '\n')
+    logger.error(f'{len(hibak)} dokumentum végleg sikertelen, mentve: {DEAD_LETTER_PATH}')
+
+
+def importalas_ellenorzese(collection_nev: str, sikeres: int, hibas: int, vart: int) -> None:
+    """Kivételt dob, ha az új collection nem alkalmas az átállásra"""
+    dokumentumok = typesense.collections[collection_nev].retrieve()['num_documents']
+    logger.info(f'Ellenőrzés: {dokumentumok} dokumentum a collection-ben, {sikeres} sikeres / {hibas} hibás import, {vart} várt')
+    if vart and not sikeres:
+        raise RuntimeError('Egyetlen dokumentum sem került be')
+    if vart and hibas / vart > MAX_IMPORT_HIBA_ARANY:
+        raise RuntimeError(f'Túl sok hibás dokumentum: {hibas}/{vart}')
+    if dokumentumok != sikeres:
+        raise RuntimeError(f'Dokumentumszám eltérés: {dokumentumok} a collection-ben, {sikeres} sikeresen importálva')
+
+
+def alias_atallitasa(alias_nev: str, collection_nev: str) -> None:
+    """Az alias átállítása az új collection-re (atomi a keresők felé); a régi collection-höz nem nyúl"""
+    nevek = [alias_nev]
+    if alias_nev == ALIAS_NEV and alias_collection(ATMENETI_ALIAS_NEV) is not None:
+        # az a) átállás után az ideiglenes aliast használó keresők is az új collection-t lássák
+        nevek.append(ATMENETI_ALIAS_NEV)
+    for nev in nevek:
+        typesense.aliases.upsert(nev, {'collection_name': collection_nev})
+        logger.info(f'Alias {nev} -> {collection_nev}')
+
+
+def alias_atallas() -> None:
+    """
+    Egyszeri, kézi átállás (--alias-atallas): a régi, nem alias alapú ALIAS_NEV collection törlése,
+    és rögtön utána az ALIAS_NEV alias az ideiglenes alias mögötti (naprakész) collection-re.
+    """
+    if alias_collection(ALIAS_NEV) is not None:
+        logger.info(f'A(z) {ALIAS_NEV} már alias, nincs teendő')
+        return
+    cel = alias_collection(ATMENETI_ALIAS_NEV)
+    if cel is None:
+        raise RuntimeError(f'Nincs {ATMENETI_ALIAS_NEV} alias: előbb fusson le egy szinkron')
+    if regi_collection_letezik():
+        logger.info(f'Régi, nem alias alapú {ALIAS_NEV} collection törlése...')
+        typesense.collections[ALIAS_NEV].delete()
+    alias_atallitasa(ALIAS_NEV, cel)
+
+
+def regi_collectionok_torlese(elo_nev: str) -> None:
+    """Az élő és a legutóbbi MEGTARTOTT_REGI_COLLECTIONOK darab kivételével a régi collection-ök törlése"""
+    nevek = sorted(
+        (c['name'] for c in typesense.collections.retrieve()
+         if c['name'].startswith(f'{ALIAS_NEV}_') and c['name'] != elo_nev),
+        reverse=True
+    )
+    for nev in nevek[MEGTARTOTT_REGI_COLLECTIONOK:]:
+        collection_torlese(nev)
 
 
+def allas_dokumentum(allas: Dict[str, Any], nevtar: Optional[Helysegnevtar],
+                     nem_talalt: Counter) -> Optional[Dict[str, Any]]:
+    """
+    Állás sor -> Typesense dokumentum. A koordináta a sorból jön (a scraperek a helységnévtárból
+    töltik); régebbi, koordináta nélküli soroknál a névtárból. None (és a hely a `nem_talalt`-ba), ha nincs.
+    """
+    lat, lng = allas.get('szel_fok'), allas.get('hossz_fok')
+    if lat is None or lng is None:
+        hely = nevtar.feloldas(allas.get('hely')) if nevtar else None
+        if not hely:
+            nem_talalt[hely_kulcs(allas.get('hely'))] += 1
+            return None
+        lat, lng = hely.lat, hely.lng
 
+    # Javított location formátum: [lat, lng]
+    location = None
+    try:
+        lat = float(lat)
+        lng = float(lng)
+        if lat and lng:
+            location = [lat, lng]
+    except (ValueError, TypeError):
+        pass
+
+    return {
+        'id': str(allas.get('id', '')),
+        'munka_neve': allas.get('munka_neve', ''),
+        'munkakor': allas.get('munkakor', ''),
+        'ceg_neve': allas.get('ceg_neve', ''),
+        'hely': allas.get('hely', ''),
+        'ceg': allas.get('ceg', ''),
+        'kepviselo_elerhetosegei': allas.get('kepviselo_elerhetosegei', ''),
+        'felajanlott_havi_brutto_kereset': allas.get('felajanlott_havi_brutto_kereset'),
+        'munkavegzes_helye': allas.get('munkavegzes_helye', ''),
+        'megjegyzes': allas.get('megjegyzes', ''),
+        'email': allas.get('email', ''),
+        'utoljara_frissitve': allas.get('utoljara_frissitve', ''),
+        'active': bool(allas.get('active', False)),
+        'munkarend': allas.get('munkarend', ''),
+        'speciális_követelmények': allas.get('speciális_követelmények', ''),
+        'speciális_körülmények': allas.get('speciális_körülmények', ''),
+        'a_munkakorhoz_kapcsolodo_juttatasok': allas.get('a_munkakorhoz_kapcsolodo_juttatasok', ''),
+        'allas_egyeztes_helye': allas.get('allas_egyeztes_helye', ''),
+        'location': location
+    }
+
+
+def nevtar_betoltese() -> Optional[Helysegnevtar]:
+    logger.info('Helységnévtár betöltése (a régebbi, koordináta nélküli sorokhoz)...')
+    nevtar = helysegnevtar(supabase)
+    if nevtar:
+        logger.info(f'Helységnévtár: {len(nevtar)} hely')
+    return nevtar
+
+
+def nem_talalt_helyek_osszegzese(nem_talalt: Counter, max_sor: int = 20) -> None:
+    """Egy összesítő figyelmeztetés soronkénti helyett"""
+    if not nem_talalt:
+        return
+    leggyakoribbak = ', '.join(f"{hely or '(üres)'}: {db}" for hely, db in nem_talalt.most_common(max_sor))
+    logger.warning(
+        f'{sum(nem_talalt.values())} állás helyéhez nincs koordináta ({len(nem_talalt)} különböző hely). '
+        f'Leggyakoribbak: {leggyakoribbak}'
+    )
+
+
+# ---------------------------------------------------------
+# Szinkron állapot (vízjel) - egy sor a Supabase-ben
+# ---------------------------------------------------------
+# Az állapot nem a munkakönyvtárban van (az Actions runner minden futásra üresen indul), hanem a DB-ben,
+# így bármelyik gépről indított szinkron a legutóbbi vízjelről folytat. Egyszeri létrehozás:
+#   CREATE TABLE szinkron_allapot (nev text PRIMARY KEY, allapot jsonb NOT NULL, modositva timestamptz DEFAULT now());
+SZINKRON_ALLAPOT_TABLA = os.getenv('TYPESENSE_SZINKRON_ALLAPOT_TABLA', 'szinkron_allapot')
+SZINKRON_ALLAPOT_NEV = 'typesense'
+
+# A vízjelet ennyivel visszább tesszük (óraeltérés, szinkron közben írt sorok)
+VIZJEL_RAHAGYAS = timedelta(minutes=15)
 
+# A sikertelen dokumentumok újraolvasása ekkora id csomagokban (in_ szűrő az URL-ben)
+UJRAPROBALAS_CSOMAG = 200
 
-async def sync_data():
-    """Fő szinkronizáló függvény"""
+
+def allapot_betoltese() -> Dict[str, Any]:
+    """A mentett állapot; {} (-> teljes újraépítés), ha nincs, vagy nem olvasható"""
     try:
-        logger.info('Lekérjük az összes állást...')
-        allasok_response = supabase.table('allasok').select('*').execute()
-        allasok = allasok_response.data
-        logger.info(f'Talált állások száma: {len(allasok)}')
-
-        logger.info('Lekérjük a koordinátákat...')
-        kordinatak_response = supabase.table('helyseg_koordinatak').select('*').execute()
-        kordinatak = kordinatak_response.data
-        logger.info(f'Talált koordináták száma: {len(kordinatak)}')
-
-        # Összefűzzük a kettőt: állás + koordináta
-        transformed = []
+        resp = ujraprobalva(
+            lambda: supabase.table(SZINKRON_ALLAPOT_TABLA).select('allapot').eq('nev', SZINKRON_ALLAPOT_NEV).execute()
+        )
+    except Exception as e:
+        logger.warning(f'A szinkron állapot nem olvasható ({SZINKRON_ALLAPOT_TABLA}): {str(e)}')
+        return {}
+    return (resp.data[0].get('allapot') or {}) if resp.data else {}
+
+
+def allapot_mentese(collection_nev: str, vizjel: str, ujraprobalando: List[str]) -> None:
+    """`ujraprobalando`: a végleg sikertelen dokumentumok id-i, a következő futás újraküldi őket"""
+    ujraprobalva(lambda: supabase.table(SZINKRON_ALLAPOT_TABLA).upsert({
+        'nev': SZINKRON_ALLAPOT_NEV,
+        'allapot': {'collection': collection_nev, 'vizjel': vizjel, 'ujraprobalando': ujraprobalando},
+        'modositva': datetime.now(timezone.utc).isoformat(),
+    }, on_conflict='nev').execute())
+
+
+# ---------------------------------------------------------
+# Folyam: lapozott olvasás -> átalakítás -> korlátos sor -> párhuzamos import
+# ---------------------------------------------------------
+# Csak az indexelt mezők oszlopai (a munkakor / ceg_neve nem oszlop a táblában, a dokumentumban üres marad)
+INDEXELT_OSZLOPOK = ', '.join([
+    'id', 'munka_neve', 'hely', 'ceg', 'kepviselo_elerhetosegei', 'felajanlott_havi_brutto_kereset',
+    'munkavegzes_helye', 'megjegyzes', 'email', 'utoljara_frissitve', 'active', 'munkarend',
+    'speciális_követelmények', 'speciális_körülmények', 'a_munkakorhoz_kapcsolodo_juttatasok',
+    'allas_egyeztes_helye', 'szel_fok', 'hossz_fok',
+])
+
+OLVASAS_CSOMAG = 500
+IMPORT_MUNKASOK = int(os.getenv('TYPESENSE_IMPORT_MUNKASOK', '4'))
+# Legfeljebb ennyi átalakított csomag vár importra (ez korlátozza a memóriát, nem a tábla mérete)
+SOR_MERET = IMPORT_MUNKASOK * 2
+
+
+async def _olvaso(szurok: Optional[Dict[str, Any]], nevtar: Optional[Helysegnevtar],
+                  sor: asyncio.Queue, eredmeny: Dict[str, Any], torlendo: Optional[List[str]]) -> None:
+    """
+    A Supabase lapokat szálon olvassa (a kliens blokkoló), JSONL sorokká alakítja, és
+    ~IMPORT_CEL_BAJT méretű csomagokban a sorba teszi.
+    Inaktív sor mindkét módban kimarad az indexből (a teljes újraépítés és az inkrementális
+    szinkron ugyanazt az indexet adja); ha `torlendo` lista, az inaktív / fel nem oldható
+    sorok id-je oda kerül (inkrementális mód).
+    """
+    allas_sorok = sorok_lapozva(supabase, 'allasok', INDEXELT_OSZLOPOK, szurok)
+    csomag, meret = [], 0
+    while True:
+        allasok = await asyncio.to_thread(lambda: list(islice(allas_sorok, OLVASAS_CSOMAG)))
+        if not allasok:
+            break
+        eredmeny['beolvasott'] += len(allasok)
         for allas in allasok:
-            hely = normalize_place_name(allas.get('hely'))
-            kordi = next(
-                (k for k in kordinatak 
-                 if normalize_place_name(k.get('helyseg_nev')) == hely),
-                None
-            )
-
-            if not kordi:
-                logger.warning(f'Nem található koordináta ehhez a helyhez: {allas.get("hely")} (normalizálva: {hely})')
+            dokumentum = None
+            if allas.get('active'):
+                dokumentum = allas_dokumentum(allas, nevtar, eredmeny['nem_talalt'])
+            if not dokumentum:
+                if torlendo is not None and allas.get('id') is not None:
+                    torlendo.append(str(allas['id']))
                 continue
+            jsonl_sor = json.dumps(dokumentum, ensure_ascii=False)
+            csomag.append(jsonl_sor)
+            meret += len(jsonl_sor.encode('utf-8')) + 1
+            eredmeny['atalakitott'] += 1
+            if meret >= IMPORT_CEL_BAJT or len(csomag) >= IMPORT_MAX_DOKUMENTUM:
+                await sor.put(csomag)
+                csomag, meret = [], 0
+    if csomag:
+        await sor.put(csomag)
+    for _ in range(IMPORT_MUNKASOK):
+        await sor.put(None)
+
+
+async def _import_munkas(collection_nev: str, sor: asyncio.Queue, eredmeny: Dict[str, Any]) -> None:
+    while (csomag := await sor.get()) is not None:
+        sikeres, hibak = await asyncio.to_thread(jsonl_importalasa, collection_nev, csomag)
+        eredmeny['sikeres'] += sikeres
+        eredmeny['hibak'] += hibak
+        eredmeny['csomagok'] += 1
+
+
+async def dokumentum_folyam(collection_nev: str, szurok: Optional[Dict[str, Any]] = None,
+                            torlendo: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    A `szurok`-nek megfelelő állások streamelt importja a collection-be.
+    A hibás dokumentumokat a végén újrapróbálja; ami így sem megy, a dead-letter fájlba kerül.
+    Visszaad: {beolvasott, atalakitott, sikeres, hibas, hibas_idk, csomagok, nem_talalt}.
+    """
+    nevtar = await asyncio.to_thread(nevtar_betoltese)
+    eredmeny = {'beolvasott': 0, 'atalakitott': 0, 'sikeres': 0, 'hibak': [], 'csomagok': 0, 'nem_talalt': Counter()}
+    sor = asyncio.Queue(maxsize=SOR_MERET)
+    feladatok = [asyncio.create_task(_olvaso(szurok, nevtar, sor, eredmeny, torlendo))]
+    feladatok += [asyncio.create_task(_import_munkas(collection_nev, sor, eredmeny)) for _ in range(IMPORT_MUNKASOK)]
+    try:
+        await asyncio.gather(*feladatok)
+    except Exception:
+        for feladat in feladatok:
+            feladat.cancel()
+        raise
+
+    if eredmeny['hibak']:
+        ujra_sikeres, vegleges_hibak = await asyncio.to_thread(
+            hibas_dokumentumok_ujraprobalasa, collection_nev, eredmeny['hibak']
+        )
+        eredmeny['sikeres'] += ujra_sikeres
+        if vegleges_hibak:
+            dead_letter_mentese(collection_nev, vegleges_hibak)
+        eredmeny['hibak'] = vegleges_hibak
+    eredmeny['hibas'] = len(eredmeny['hibak'])
+    eredmeny['hibas_idk'] = [str(json.loads(sor)['id']) for sor, _ in eredmeny['hibak']]
+
+    logger.info(
+        f"Beolvasva: {eredmeny['beolvasott']}, átalakítva: {eredmeny['atalakitott']}, "
+        f"sikeres: {eredmeny['sikeres']}, hibás: {eredmeny['hibas']} ({eredmeny['csomagok']} csomag, {IMPORT_MUNKASOK} munkás)"
+    )
+    nem_talalt_helyek_osszegzese(eredmeny['nem_talalt'])
+    return eredmeny
+
+
+# ---------------------------------------------------------
+# Teljes újraépítés / inkrementális szinkron
+# ---------------------------------------------------------
+async def teljes_ujraepites(alias_nev: str = ALIAS_NEV) -> tuple:
+    """
+    Minden aktív állás új collection-be, majd az `alias_nev` alias cseréje.
+    Visszaad: (új collection neve, a végleg sikertelen dokumentumok id-i).
+    """
+    uj_nev = uj_collection_nev()
+    logger.info(f'Új collection létrehozása: {uj_nev}')
+    typesense.collections.create({'name': uj_nev, 'fields': COLLECTION_MEZOK})
+
+    try:
+        logger.info('Állások streamelt feltöltése...')
+        # az inaktív sorokat már a DB-ből sem olvassuk (az inkrementális szinkron törli őket)
+        eredmeny = await dokumentum_folyam(uj_nev, {'active': True})
+        importalas_ellenorzese(uj_nev, eredmeny['sikeres'], eredmeny['hibas'], eredmeny['atalakitott'])
+    except Exception:
+        # Az alias nem változik, a keresés továbbra is a régi collection-ből megy
+        logger.error(f'Az import sikertelen, az élő alias változatlan; {uj_nev} törlése')
+        collection_torlese(uj_nev)
+        raise
+
+    alias_atallitasa(alias_nev, uj_nev)
+    regi_collectionok_torlese(uj_nev)
+    return uj_nev, eredmeny['hibas_idk']
+
+
+def dokumentumok_torlese(collection_nev: str, idk: List[str]) -> int:
+    """Dokumentumok törlése id alapján, 100-as csomagokban; visszaadja a törölt darabszámot"""
+    torolt = 0
+    for i in range(0, len(idk), 100):
+        csomag = idk[i:i + 100]
+        eredmeny = typesense.collections[collection_nev].documents.delete(
+            {'filter_by': f"id:[{','.join(csomag)}]"}
+        )
+        torolt += eredmeny.get('num_deleted', 0)
+    return torolt
+
+
+async def inkrementalis_szinkron(collection_nev: str, vizjel: str, ujraprobalando: Optional[List[str]] = None) -> List[str]:
+    """
+    Csak a vízjel óta változott sorok: az aktívak (koordinátával) upsert-elődnek,
+    az inaktívvá váltak (és a már nem feloldható helyűek) törlődnek az indexből.
+    A vízjel a `modositva` oszlopon megy: a scraperek minden futáskor minden még meglévő
+    állás utoljara_frissitve mezőjét átírják, a modositva csak tartalmi változáskor / inaktiváláskor változik.
+    Az előző futásokban végleg sikertelen (`ujraprobalando`) sorokat id alapján újra beolvassa és küldi.
+    Visszaadja az ezúttal is sikertelen dokumentumok id-it.
+    """
+    logger.info(f'A {vizjel} óta változott állások streamelt feltöltése...')
+    torlendo = []
+    eredmenyek = [await dokumentum_folyam(collection_nev, {MODOSITVA_OSZLOP: ('gte', vizjel)}, torlendo)]
+    ujraprobalando = list(ujraprobalando or [])
+    if ujraprobalando:
+        logger.info(f'{len(ujraprobalando)} korábban sikertelen dokumentum újraküldése...')
+        for i in range(0, len(ujraprobalando), UJRAPROBALAS_CSOMAG):
+            csomag = ujraprobalando[i:i + UJRAPROBALAS_CSOMAG]
+            eredmenyek.append(await dokumentum_folyam(collection_nev, {'id': ('in_', csomag)}, torlendo))
+
+    sikeres = sum(e['sikeres'] for e in eredmenyek)
+    hibas_idk = list(dict.fromkeys(i for e in eredmenyek for i in e['hibas_idk']))
+    if hibas_idk and not sikeres:
+        # semmi nem ment be: valószínűleg nem dokumentum-, hanem rendszerszintű hiba;
+        # a vízjel nem lép előre, a következő futás újrapróbálja (az upsert idempotens)
+        raise RuntimeError(f"{len(hibas_idk)} dokumentum importja sikertelen")
+    torolt = await asyncio.to_thread(dokumentumok_torlese, collection_nev, torlendo)
+    logger.info(f"Inkrementális szinkron: {sikeres} upsert, {torolt}/{len(torlendo)} törölve"
+                + (f", {len(hibas_idk)} sikertelen (a következő futás újraküldi)" if hibas_idk else ''))
+    return hibas_idk
+
+
+async def sync_data(teljes: bool = False):
+    """
+    Fő szinkronizáló függvény.
+    Alapból inkrementális (a legutóbbi vízjel óta változott sorok); teljes újraépítés,
+    ha `teljes`, ha nincs vízjel, vagy ha az alias azóta másik collection-re mutat.
+    """
+    try:
+        kezdes = datetime.now(timezone.utc)
+        allapot = allapot_betoltese()
+        alias_nev = await asyncio.to_thread(elo_alias_nev)
+        elo = await asyncio.to_thread(alias_collection, alias_nev)
+        if not teljes and (not allapot.get('vizjel') or elo is None or allapot.get('collection') != elo):
+            logger.info('Nincs érvényes vízjel ehhez az indexhez, teljes újraépítés')
+            teljes = True
 
-            # Javított location formátum: [lat, lng]
-            location = None
-            try:
-                lat = float(kordi.get('szel_fok', 0))
-                lng = float(kordi.get('hossz_fok', 0))
-                if lat and lng:
-                    location = [lat, lng]
-            except (ValueError, TypeError):
-                pass
-
-            transformed.append({
-                'id': str(allas.get('id', '')),
-                'munka_neve': allas.get('munka_neve', ''),
-                'munkakor': allas.get('munkakor', ''),
-                'ceg_neve': allas.get('ceg_neve', ''),
-                'hely': allas.get('hely', ''),
-                'ceg': allas.get('ceg', ''),
-                'kepviselo_elerhetosegei': allas.get('kepviselo_elerhetosegei', ''),
-                'felajanlott_havi_brutto_kereset': allas.get('felajanlott_havi_brutto_kereset'),
-                'munkavegzes_helye': allas.get('munkavegzes_helye', ''),
-                'megjegyzes': allas.get('megjegyzes', ''),
-                'email': allas.get('email', ''),
-                'utoljara_frissitve': allas.get('utoljara_frissitve', ''),
-                'active': bool(allas.get('active', False)),
-                'munkarend': allas.get('munkarend', ''),
-                'speciális_követelmények': allas.get('speciális_követelmények', ''),
-                'speciális_körülmények': allas.get('speciális_körülmények', ''),
-                'a_munkakorhoz_kapcsolodo_juttatasok': allas.get('a_munkakorhoz_kapcsolodo_juttatasok', ''),
-                'allas_egyeztes_helye': allas.get('allas_egyeztes_helye', ''),
-                'location': location
-            })
-
-        logger.info(f'Átalakított adatok száma: {len(transformed)}')
-
-        try:
-            logger.info('Töröljük a régi collection-t, ha létezik...')
-            typesense.collections['allasok'].delete()
-            logger.info('Régi collection törölve.')
-        except Exception as e:
-            logger.info(f'Nincs régi collection, vagy nem tudtuk törölni: {str(e)}')
-
-        logger.info('Új collection létrehozása...')
-        typesense.collections.create({
-            'name': 'allasok',
-            'fields': [
-                {'name': 'id', 'type': 'string'},
-                {'name': 'munka_neve', 'type': 'string'},
-                {'name': 'munkakor', 'type': 'string'},
-                {'name': 'ceg_neve', 'type': 'string'},
-                {'name': 'hely', 'type': 'string'},
-                {'name': 'ceg', 'type': 'string'},
-                {'name': 'kepviselo_elerhetosegei', 'type': 'string', 'optional': True},
-                {'name': 'felajanlott_havi_brutto_kereset', 'type': 'string', 'optional': True},
-                {'name': 'munkavegzes_helye', 'type': 'string', 'optional': True},
-                {'name': 'megjegyzes', 'type': 'string', 'optional': True},
-                {'name': 'email', 'type': 'string', 'optional': True},
-                {'name': 'utoljara_frissitve', 'type': 'string', 'optional': True},
-                {'name': 'active', 'type': 'bool', 'optional': True},
-                {'name': 'munkarend', 'type': 'string', 'optional': True},
-                {'name': 'speciális_követelmények', 'type': 'string', 'optional': True},
-                {'name': 'speciális_körülmények', 'type': 'string', 'optional': True},
-                {'name': 'a_munkakorhoz_kapcsolodo_juttatasok', 'type': 'string', 'optional': True},
-                {'name': 'allas_egyeztes_helye', 'type': 'string', 'optional': True},
-                {'name': 'location', 'type': 'geopoint'},
-            ]
-        })
-        logger.info('Collection létrehozva.')
-
-        logger.info('Adatok feltöltése...')
-        # Batch-eljük a feltöltést 100-as csomagokban
-        batch_size = 100
-        for i in range(0, len(transformed), batch_size):
-            batch = transformed[i:i + batch_size]
-            import_results = typesense.collections['allasok'].documents.import_(batch, {'action': 'upsert'})
-            
-            success_count = sum(1 for result in import_results if not result.get('success'))
-            error_count = len(import_results) - success_count
-            
-            logger.info(f'Batch {i // batch_size + 1} importálva. Sikeres: {success_count}, Hibás: {error_count}')
-            
-            # Hibák logolása
-            for result in import_results:
-                if not result.get('success'):
-                    logger.error(f'Hibás dokumentum: {result}')
+        if teljes:
+            elo, hibas_idk = await teljes_ujraepites(alias_nev)
+        else:
+            hibas_idk = await inkrementalis_szinkron(elo, allapot['vizjel'], allapot.get('ujraprobalando', []))
+        # a vízjel előrelép, a sikertelen dokumentumok id-i az állapotban maradnak újraküldésre
+        allapot_mentese(elo, (kezdes - VIZJEL_RAHAGYAS).isoformat(), hibas_idk)
 
         logger.info('Sikeres szinkron')
-        return {'status': 'success', 'message': 'Sikeres szinkron'}
+        return {'status': 'success', 'message': f"Sikeres {'teljes' if teljes else 'inkrementális'} szinkron"}
 
     except Exception as e:
         logger.error(f'Hiba a szinkron során: {str(e)}', exc_info=True)
@@ -183,6 +558,14 @@ async def sync_data():
 
 
 if __name__ == '__main__':
-    import asyncio
-    result = asyncio.run(sync_data())
+    import argparse
+    parser = argparse.ArgumentParser(description='Supabase -> Typesense szinkron')
+    parser.add_argument('--teljes', action='store_true', help='teljes újraépítés (új collection + alias csere)')
+    parser.add_argument('--alias-atallas', action='store_true',
+                        help='egyszeri átállás: a régi allasok collection helyére az alias (lásd ATMENETI_ALIAS_NEV)')
+    args = parser.parse_args()
+    if args.alias_atallas:
+        alias_atallas()
+        raise SystemExit(0)
+    result = asyncio.run(sync_data(teljes=args.teljes))
     logger.info(f'Szinkronizálás eredménye: {result}')
@@ -0,0 +1,11 @@
+import os
+import sys
+
+# a scriptek a repo gyökeréből futnak, modulként onnan importáljuk őket
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# a scriptek importkor olvassák a kötelező ENV-eket; a tesztek nem csatlakoznak sehova
+for nev in ("SUPABASE_URL", "SUPABASE_KEY", "TABLE_NAME", "EMAIL_SENDER", "EMAIL_PASSWORD", "EMAIL_RECIPIENT"):
+    os.environ.setdefault(nev, "teszt")
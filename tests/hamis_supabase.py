@@ -0,0 +1,128 @@
+# Memóriabeli Supabase kliens a tesztekhez: a scriptek által használt PostgREST lánc részhalmaza
+# (select / upsert / update, eq / gt / gte / in_ szűrők, order, limit, count="exact").
+# Minden kérés a `keresek` listába kerül, a `hibak` függvénnyel kérésenként hiba injektálható.
+from types import SimpleNamespace
+
+
+class Lekerdezes:
+    def __init__(self, kliens, tabla):
+        self.kliens = kliens
+        self.tabla = tabla
+        self.muvelet = None
+        self.adat = None
+        self.oszlopok = None
+        self.on_conflict = None
+        self.count = None
+        self.returning = "representation"
+        self.szurok = []
+        self.rendezes = None
+        self.korlat = None
+
+    # ----- műveletek -----
+    def select(self, oszlopok="*", count=None):
+        self.muvelet, self.oszlopok, self.count = "select", oszlopok, count
+        return self
+
+    def upsert(self, sorok, on_conflict="id", returning="representation"):
+        if isinstance(on_conflict, (list, tuple)):
+            on_conflict = ",".join(on_conflict)
+        if isinstance(sorok, dict):
+            sorok = [sorok]
+        self.muvelet, self.adat, self.on_conflict, self.returning = "upsert", sorok, on_conflict, returning
+        return self
+
+    def update(self, mezok, count=None, returning="representation"):
+        self.muvelet, self.adat, self.count, self.returning = "update", mezok, count, returning
+        return self
+
+    # ----- szűrők -----
+    def eq(self, oszlop, ertek):
+        self.szurok.append(("eq", oszlop, ertek))
+        return self
+
+    def gt(self, oszlop, ertek):
+        self.szurok.append(("gt", oszlop, ertek))
+        return self
+
+    def gte(self, oszlop, ertek):
+        self.szurok.append(("gte", oszlop, ertek))
+        return self
+
+    def in_(self, oszlop, ertekek):
+        self.szurok.append(("in_", oszlop, list(ertekek)))
+        return self
+
+    def order(self, oszlop):
+        self.rendezes = oszlop
+        return self
+
+    def limit(self, n):
+        self.korlat = n
+        return self
+
+    # ----- végrehajtás -----
+    def _illeszkedik(self, sor):
+        for muvelet, oszlop, ertek in self.szurok:
+            sajat = sor.get(oszlop)
+            if muvelet == "eq" and sajat != ertek:
+                return False
+            if muvelet == "gt" and not (sajat is not None and sajat > ertek):
+                return False
+            if muvelet == "gte" and not (sajat is not None and sajat >= ertek):
+                return False
+            if muvelet == "in_" and sajat not in ertek:
+                return False
+        return True
+
+    def execute(self):
+        self.kliens.keresek.append(self)
+        if self.kliens.hibak:
+            self.kliens.hibak(self)
+        sorok = self.kliens.tablak.setdefault(self.tabla, [])
+
+        if self.muvelet == "select":
+            talalat = sorted((s for s in sorok if self._illeszkedik(s)),
+                             key=lambda s: s[self.rendezes] if self.rendezes else 0)
+            darab = len(talalat)
+            if self.korlat is not None:
+                talalat = talalat[:self.korlat]
+            if self.oszlopok != "*":
+                mezok = [m.strip() for m in self.oszlopok.split(",")]
+                talalat = [{m: s.get(m) for m in mezok} for s in talalat]
+            return SimpleNamespace(data=talalat, count=darab if self.count else None)
+
+        if self.muvelet == "upsert":
+            kulcsok = self.on_conflict.split(",")
+            visszajott = []
+            for uj in self.adat:
+                meglevo = next((s for s in sorok if all(s.get(k) == uj.get(k) for k in kulcsok)), None)
+                if meglevo is None:
+                    meglevo = {"id": self.kliens.kovetkezo_id()}
+                    sorok.append(meglevo)
+                meglevo.update(uj)
+                visszajott.append(dict(meglevo))
+            return SimpleNamespace(data=visszajott if self.returning != "minimal" else [], count=None)
+
+        if self.muvelet == "update":
+            talalat = [s for s in sorok if self._illeszkedik(s)]
+            for sor in talalat:
+                sor.update(self.adat)
+            data = [] if self.returning == "minimal" else [dict(s) for s in talalat]
+            return SimpleNamespace(data=data, count=len(talalat) if self.count else None)
+
+        raise AssertionError(f"ismeretlen művelet: {self.muvelet}")
+
+
+class HamisSupabase:
+    def __init__(self, tablak=None, hibak=None):
+        self.tablak = tablak if tablak is not None else {}
+        self.hibak = hibak
+        self.keresek = []
+        self._id = max((s.get("id", 0) for sorok in self.tablak.values() for s in sorok), default=0)
+
+    def kovetkezo_id(self):
+        self._id += 1
+        return self._id
+
+    def table(self, nev):
+        return Lekerdezes(self, nev)
@@ -0,0 +1,193 @@
+from urllib.parse import quote
+
+import pytest
+
+import db_muveletek
+from db_muveletek import (upsert_darabolva, link_chunkok, linkek_frissitese, hianyzok_inaktivalasa, sorok_lapozva,
+                          linkek_lapozva)
+from hamis_supabase import HamisSupabase
+
+
+@pytest.fixture(autouse=True)
+def nincs_varakozas(monkeypatch):
+    monkeypatch.setattr(db_muveletek.time, "sleep", lambda _: None)
+
+
+def rekordok(n):
+    return [{"link": f"https://x.hu/{i}", "munka_neve": f"Állás {i}"} for i in range(n)]
+
+
+def hibas_linkre_elbukik(*hibas_linkek):
+    """Az a upsert kérés bukik el, amelyben van hibás link (mint egy sor szintű constraint hiba)"""
+    def hibak(lekerdezes):
+        if lekerdezes.muvelet == "upsert" and any(r["link"] in hibas_linkek for r in lekerdezes.adat):
+            raise RuntimeError("violates check constraint")
+    return hibak
+
+
+# ----- upsert_darabolva -----
+def test_upsert_chunkonkent_egy_keres():
+    db = HamisSupabase()
+    mentett, hibak = upsert_darabolva(db, "allasok", rekordok(10), chunk_size=4)
+    assert (mentett, hibak) == (10, [])
+    assert [len(k.adat) for k in db.keresek] == [4, 4, 2]
+    assert len(db.tablak["allasok"]) == 10
+
+
+def test_hibas_chunk_felezve_csak_a_hibas_sor_marad_ki():
+    db = HamisSupabase(hibak=hibas_linkre_elbukik("https://x.hu/5"))
+    mentett, hibak = upsert_darabolva(db, "allasok", rekordok(8), chunk_size=8)
+    assert mentett == 7
+    assert [(r["link"], str(e)) for r, e in hibak] == [("https://x.hu/5", "violates check constraint")]
+    assert {s["link"] for s in db.tablak["allasok"]} == {f"https://x.hu/{i}" for i in range(8)} - {"https://x.hu/5"}
+    # 8 -> 4 + 4 -> 2 + 2 -> 1 + 1: log2(n) mélység, nem n kérés
+    assert len(db.keresek) == 7
+
+
+def test_vissza_nem_jott_sor_hibanak_szamit_kivetel_nelkul():
+    db = HamisSupabase()
+    eredeti = db.table
+
+    def table(nev):
+        lekerdezes = eredeti(nev)
+        execute = lekerdezes.execute
+
+        def csonka():
+            valasz = execute()
+            valasz.data = [s for s in valasz.data if s["link"] != "https://x.hu/1"]
+            return valasz
+        lekerdezes.execute = csonka
+        return lekerdezes
+    db.table = table
+
+    mentett, hibak = upsert_darabolva(db, "allasok", rekordok(3))
+    assert mentett == 2
+    assert [(r["link"], e) for r, e in hibak] == [("https://x.hu/1", None)]
+
+
+# ----- link_chunkok / linkek_frissitese -----
+def test_link_chunkok_az_url_keretben_maradnak():
+    linkek = [f"https://vmp.munka.hu/allas/{i}?kereses=Keresés" for i in range(500)]
+    chunkok = list(link_chunkok(linkek, url_keret=2000))
+    assert [l for c in chunkok for l in c] == linkek
+    assert len(chunkok) > 1
+    for chunk in chunkok:
+        assert sum(len(quote(l, safe="")) + 9 for l in chunk) <= 2000
+
+
+def test_link_chunkok_tul_hosszu_link_kulon_chunk():
+    hosszu = "https://x.hu/" + "a" * 300
+    assert list(link_chunkok(["https://x.hu/1", hosszu, "https://x.hu/2"], url_keret=100)) == \
+        [["https://x.hu/1"], [hosszu], ["https://x.hu/2"]]
+
+
+def test_linkek_frissitese_darabszamot_ker_sorokat_nem():
+    db = HamisSupabase({"allasok": [{"id": i, "link": f"https://x.hu/{i}", "active": False} for i in range(30)]})
+    linkek = [f"https://x.hu/{i}" for i in range(20)] + ["https://x.hu/nincs", "https://x.hu/1", None, ""]
+    assert linkek_frissitese(db, "allasok", linkek, {"active": True}, url_keret=200) == 20
+    assert len(db.keresek) > 1
+    assert all(k.count == "exact" and k.returning == "minimal" for k in db.keresek)
+    # duplikált / üres link nem kerül a szűrőbe
+    kuldott = [l for k in db.keresek for _, _, ertekek in k.szurok for l in ertekek]
+    assert sorted(kuldott) == sorted(set(l for l in linkek if l))
+    assert sum(s["active"] for s in db.tablak["allasok"]) == 20
+
+
+def test_linkek_frissitese_ujraprobal_es_a_vegleg_hibas_chunkot_kihagyja():
+    probak = {}
+
+    def hibak(lekerdezes):
+        elso = lekerdezes.szurok[0][2][0]
+        probak[elso] = probak.get(elso, 0) + 1
+        # az első chunk egyszer, a második mindig elbukik
+        if (elso == "https://x.hu/0" and probak[elso] == 1) or elso == "https://x.hu/5":
+            raise RuntimeError("502 Bad Gateway")
+
+    db = HamisSupabase({"allasok": [{"id": i, "link": f"https://x.hu/{i}"} for i in range(10)]}, hibak)
+    linkek = [f"https://x.hu/{i}" for i in range(10)]
+    keret = sum(len(quote(l, safe="")) + 9 for l in linkek[:5])
+    assert linkek_frissitese(db, "allasok", linkek, {"active": False}, url_keret=keret) == 5
+    assert probak == {"https://x.hu/0": 2, "https://x.hu/5": 3}
+
+
+def test_linkek_frissitese_ures_listara_nincs_keres():
+    db = HamisSupabase()
+    assert linkek_frissitese(db, "allasok", [None, ""], {"active": True}) == 0
+    assert db.keresek == []
+
+
+# ----- hianyzok_inaktivalasa -----
+def test_csak_a_most_nem_talalt_aktiv_sorok_inaktivalodnak():
+    db = HamisSupabase({"allasok": [
+        {"id": i, "link": f"https://x.hu/{i}", "active": True, "utoljara_frissitve": "regi", "modositva": "regi"}
+        for i in range(6)
+    ]})
+    db_linkek = {f"https://x.hu/{i}" for i in range(6)}
+    talalt = {"https://x.hu/0", "https://x.hu/2", "https://x.hu/uj"}
+    assert hianyzok_inaktivalasa(db, "allasok", db_linkek, talalt, "most") == (4, 4)
+    sorok = {s["link"]: s for s in db.tablak["allasok"]}
+    assert {l for l, s in sorok.items() if not s["active"]} == db_linkek - talalt
+    # a Typesense vízjel a modositva oszlopon megy: az inaktiválás tartalmi változás
+    assert all(s["modositva"] == s["utoljara_frissitve"] == "most" for s in sorok.values() if not s["active"])
+    assert sorok["https://x.hu/0"]["modositva"] == "regi"
+
+
+def test_nincs_hianyzo_nincs_keres():
+    db = HamisSupabase()
+    assert hianyzok_inaktivalasa(db, "allasok", {"a", "b"}, {"a", "b", "c"}, "most") == (0, 0)
+    assert db.keresek == []
+
+
+# ----- sorok_lapozva / linkek_lapozva -----
+def allas_tabla(n):
+    return {"allasok": [
+        {"id": i, "link": f"https://x.hu/{i}", "active": i % 3 != 0, "szarmazas": "jofogas2" if i % 2 else "vmp",
+         "modositva": f"2026-01-{i % 28 + 1:02d}"}
+        for i in range(1, n + 1)
+    ]}
+
+
+def test_keyset_lapozas_minden_sort_egyszer_ad_vissza():
+    db = HamisSupabase(allas_tabla(25))
+    sorok = list(sorok_lapozva(db, "allasok", "link", lap_meret=10))
+    assert [s["id"] for s in sorok] == list(range(1, 26))
+    # a kulcs oszlop automatikusan bekerül, a többi nem
+    assert set(sorok[0]) == {"link", "id"}
+    # 3 teli / részleges lap + egy üres lap a végén, a lapok az előző lap utolsó id-je után folytatódnak
+    assert len(db.keresek) == 4
+    assert [k.szurok for k in db.keresek[1:]] == [[("gt", "id", 10)], [("gt", "id", 20)], [("gt", "id", 25)]]
+
+
+def test_lapozas_szurokkel_es_operatorral():
+    db = HamisSupabase(allas_tabla(40))
+    szurok = {"szarmazas": "jofogas2", "active": True, "modositva": ("gte", "2026-01-20")}
+    vart = {s["link"] for s in db.tablak["allasok"]
+            if s["szarmazas"] == "jofogas2" and s["active"] and s["modositva"] >= "2026-01-20"}
+    assert linkek_lapozva(db, "allasok", szurok, lap_meret=3) == vart
+    assert vart
+
+
+def test_lapozas_nem_fugg_a_szerver_max_rows_limitjetol():
+    db = HamisSupabase(allas_tabla(12))
+    eredeti = db.table
+
+    def table(nev):
+        lekerdezes = eredeti(nev)
+        # a szerver legfeljebb 4 sort ad vissza, akármekkora a limit
+        lekerdezes.limit = lambda n: setattr(lekerdezes, "korlat", min(n, 4)) or lekerdezes
+        return lekerdezes
+    db.table = table
+    assert [s["id"] for s in sorok_lapozva(db, "allasok", "link", lap_meret=1000)] == list(range(1, 13))
+
+
+def test_lapozas_atmeneti_hibat_ujraprobal():
+    hibak_szama = [0]
+
+    def hibak(lekerdezes):
+        if lekerdezes.szurok == [("gt", "id", 5)] and hibak_szama[0] < 2:
+            hibak_szama[0] += 1
+            raise RuntimeError("timeout")
+
+    db = HamisSupabase(allas_tabla(8), hibak)
+    assert len(list(sorok_lapozva(db, "allasok", "link", lap_meret=5))) == 8
+    assert hibak_szama[0] == 2
@@ -0,0 +1,121 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from futasi_naplo import FutasiNaplo
+
+PARAMETEREK = {"varosok": ["Szeged", "Makó"], "inkrementalis": True}
+
+
+@pytest.fixture
+def mappa(tmp_path):
+    return str(tmp_path / "naplo")
+
+
+def test_ujrainditas_a_naplobol_folytat(mappa):
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    assert not naplo.folytatas
+    naplo.rogzit("oldal", "https://x.hu/?o=1", {"allasok": [1, 2], "van_kovetkezo": True})
+    kesz = naplo.iras_felvetele("uj_allasok", [{"Link": "https://x.hu/1"}])
+    naplo.iras_alkalmazva(kesz)
+    fuggo = naplo.iras_felvetele("uj_allasok", [{"Link": "https://x.hu/2"}])
+    naplo.close()
+
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    assert naplo.folytatas
+    assert naplo.lekeres("oldal", "https://x.hu/?o=1") == {"allasok": [1, 2], "van_kovetkezo": True}
+    assert naplo.lekeres("oldal", "https://x.hu/?o=2") is None
+    assert naplo.fuggo_irasok() == [(fuggo, "uj_allasok", [{"Link": "https://x.hu/2"}])]
+    naplo.close()
+
+
+def test_felbemaradt_utolso_sor_levagva(mappa):
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    naplo.rogzit("varos", "k1", {"talalt": 3})
+    naplo.close()
+    with open(naplo.path, "ab") as f:
+        f.write(b'{"t": "varos", "k": "k2", "a": {"tal')
+    meret = len(open(naplo.path, "rb").read().rsplit(b"\n", 1)[0]) + 1
+
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    assert naplo.folytatas
+    assert naplo.lekeres("varos", "k1") == {"talalt": 3}
+    assert naplo.lekeres("varos", "k2") is None
+    # a csonka sort levágja, így az új rekordok ép sorként kerülnek utána
+    naplo.rogzit("varos", "k2", {"talalt": 1})
+    naplo.close()
+    with open(naplo.path, "rb") as f:
+        sorok = f.read().splitlines()
+    assert sum(len(s) + 1 for s in sorok[:-1]) == meret
+    assert [json.loads(s)["k"] for s in sorok[1:]] == ["k1", "k2"]
+
+
+def test_mas_parameterekkel_elolrol_kezd(mappa):
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    naplo.rogzit("varos", "k1")
+    naplo.close()
+
+    masik = FutasiNaplo("allasok", {**PARAMETEREK, "varosok": ["Szeged"]}, mappa)
+    assert not masik.folytatas and masik.path != naplo.path
+    assert masik.lekeres("varos", "k1") is None
+    masik.close()
+
+
+def test_felulirt_fajl_fejlec_eltereskor_elolrol_kezd(mappa):
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    naplo.rogzit("varos", "k1", 1)
+    naplo.close()
+    # azonos fájlnév, de más paraméterek a fejlécben (pl. kézzel átmásolt napló)
+    with open(naplo.path, encoding="utf-8") as f:
+        sorok = f.readlines()
+    fejlec = json.loads(sorok[0])
+    fejlec["a"]["parameterek"] = {"varosok": ["Pécs"]}
+    with open(naplo.path, "w", encoding="utf-8") as f:
+        f.writelines([json.dumps(fejlec) + "\n"] + sorok[1:])
+
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    assert not naplo.folytatas
+    assert naplo.lekeres("varos", "k1") is None
+    naplo.close()
+
+
+def test_elavult_naplo_fuggo_irasai_atkerulnek(mappa):
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa)
+    naplo.rogzit("reszletes", "https://x.hu/1", {"ceg": "Kft."})
+    alkalmazott = naplo.iras_felvetele("uj_allasok", [{"Link": "https://x.hu/1"}])
+    naplo.iras_alkalmazva(alkalmazott)
+    fuggo = naplo.iras_felvetele("modosult_allasok", [{"Link": "https://x.hu/2"}])
+    naplo.close()
+    # a fejléc időbélyegét a max kornál régebbre írjuk
+    with open(naplo.path, encoding="utf-8") as f:
+        sorok = f.readlines()
+    fejlec = json.loads(sorok[0])
+    fejlec["a"]["letrehozva"] = (datetime.now(timezone.utc) - timedelta(hours=13)).isoformat()
+    with open(naplo.path, "w", encoding="utf-8") as f:
+        f.writelines([json.dumps(fejlec) + "\n"] + sorok[1:])
+
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa, max_kor_orak=12)
+    assert not naplo.folytatas
+    assert naplo.lekeres("reszletes", "https://x.hu/1") is None
+    assert naplo.fuggo_irasok() == [(fuggo, "modosult_allasok", [{"Link": "https://x.hu/2"}])]
+    naplo.close()
+
+    # az átvitt írás az új naplóban is megmarad, amíg nem alkalmazzák
+    naplo = FutasiNaplo("allasok", PARAMETEREK, mappa, max_kor_orak=12)
+    assert naplo.folytatas
+    assert [i for i, _, _ in naplo.fuggo_irasok()] == [fuggo]
+    naplo.iras_alkalmazva(fuggo)
+    assert naplo.fuggo_irasok() == []
+    naplo.close()
+
+
+def test_lezaras_torli_a_naplot(mappa):
+    naplo = FutasiNaplo("jofogas", {"kereses": "https://allas.jofogas.hu/?o={}"}, mappa)
+    naplo.rogzit("oldal", 1, ["https://allas.jofogas.hu/a.htm"])
+    naplo.lezaras()
+    naplo.lezaras()
+
+    naplo = FutasiNaplo("jofogas", {"kereses": "https://allas.jofogas.hu/?o={}"}, mappa)
+    assert not naplo.folytatas
+    naplo.close()
@@ -0,0 +1,29 @@
+import pytest
+
+from helysegnevtar import hely_kulcs
+
+
+@pytest.mark.parametrize("nev, vart", [
+    ("Budapest", "budapest"),
+    ("Budapest XIII. kerület", "budapest"),
+    ("1134 Budapest, Váci út 1.", "budapest"),
+    ("Bp. XI.", "budapest"),
+    ("bp", "budapest"),
+    ("XIII. kerület", "budapest"),
+    ("xiii kerület", "budapest"),
+    ("13. kerület", "budapest"),
+    ("8. ker.", "budapest"),
+    ("  Szeged ,  Csongrád-Csanád", "szeged"),
+    ("6720 Szeged", "szeged"),
+    ("Szentendre", "szentendre"),
+    # más település kerülete, városrésze nem Budapest
+    ("Miskolc-Diósgyőr kerület", "miskolc-diósgyőr kerület"),
+    ("Győr, Sziget kerület", "győr"),
+    ("Nyíregyháza Oros kerület", "nyíregyháza oros kerület"),
+    ("Budapesti úti telephely", "budapesti úti telephely"),
+    ("Bpk", "bpk"),
+    ("", ""),
+    (None, ""),
+])
+def test_hely_kulcs(nev, vart):
+    assert hely_kulcs(nev) == vart
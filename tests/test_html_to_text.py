@@ -0,0 +1,57 @@
+# A jofogas.html_to_text kimenete meg kell egyezzen a korábban használt
+# BeautifulSoup(body, "html.parser").get_text(" ", strip=True) kimenetével.
+import os
+import gzip
+import json
+
+import pytest
+
+from conftest import FIXTURES_DIR
+
+BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+for modul in ("curl_cffi", "playwright", "supabase"):
+    pytest.importorskip(modul)
+
+import jofogas  # noqa: E402
+
+JOFOGAS_DIR = os.path.join(FIXTURES_DIR, "jofogas")
+OLDALAK = sorted(f for f in os.listdir(JOFOGAS_DIR) if f.endswith(".html"))
+
+
+def bs4_szoveg(html):
+    return BeautifulSoup(html, "html.parser").get_text(" ", strip=True)
+
+
+def tarolt_oldal(tmp_path, nev):
+    """A fixture oldal úgy, ahogy az oldaltár tárolja (gzip)"""
+    with open(os.path.join(JOFOGAS_DIR, nev), "rb") as f:
+        tartalom = f.read()
+    path = tmp_path / (nev + ".gz")
+    with gzip.open(path, "wb") as f:
+        f.write(tartalom)
+    return str(path)
+
+
+@pytest.mark.parametrize("nev", OLDALAK)
+def test_leiras_egyezik_bs4_kimenetevel(tmp_path, nev):
+    path = tarolt_oldal(tmp_path, nev)
+    body = json.loads(jofogas.extract_next_data_bytes(path))["props"]["pageProps"]["product"]["body"]
+
+    row = jofogas.parse_job_file(path)
+
+    assert row["megjegyzes"] == bs4_szoveg(body)
+    assert row["megjegyzes"]
+
+
+@pytest.mark.parametrize("html", [
+    "&amp;amp; &unknown; &hellip; a&b <3 x < y",
+    "a&hellip b &copy x &#128; &#0; &#x1F600; &notit; &amp",
+    "<p>Nyitott <b>tag <i>nincs zárva</p> vége</span></div>",
+    "<![CDATA[adat]]> <?php echo 1; ?> <p>x</p>",
+    "<div><!-- megjegyzés --><p>a</p><script>var x = 1;</script><style>p {}</style>b<br>c</div>",
+    "<textarea>  x  </textarea><noscript>ns</noscript><template><p>t</p></template>",
+    "<p>  Szóköz   a   \n  sorban  </p><p></p><p>\t</p>",
+    "",
+])
+def test_szelso_esetek_egyeznek_bs4_kimenetevel(html):
+    assert jofogas.html_to_text(html) == bs4_szoveg(html)
@@ -0,0 +1,91 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+import http_gyorsitotar
+from http_gyorsitotar import HttpGyorsitotar
+
+
+class Ido:
+    def __init__(self):
+        self.most = 1_000_000.0
+
+    def __call__(self):
+        return self.most
+
+
+@pytest.fixture
+def ido(monkeypatch):
+    i = Ido()
+    monkeypatch.setattr(http_gyorsitotar.time, "time", i)
+    return i
+
+
+@pytest.fixture
+def tar(ido):
+    t = HttpGyorsitotar(":memory:")
+    yield t
+    t.close()
+
+
+def valasz(text, **headers):
+    return SimpleNamespace(text=text, headers=headers)
+
+
+def test_ttl_en_belul_keres_nelkul(tar, ido):
+    tar.tarol("https://vmp.munka.hu/allas/1", valasz("<html>Targoncás – Szeged</html>"))
+    ido.most += 3599
+    tarolt = tar.friss("https://vmp.munka.hu/allas/1", ttl=3600)
+    assert tarolt.text == "<html>Targoncás – Szeged</html>"
+    assert tarolt.ok and tarolt.status_code == 200 and tarolt.from_cache
+    ido.most += 2
+    assert tar.friss("https://vmp.munka.hu/allas/1", ttl=3600) is None
+    # ttl=0: mindig feltételes kérés
+    assert tar.friss("https://vmp.munka.hu/allas/1", ttl=0) is None
+    assert tar.friss("https://vmp.munka.hu/allas/2", ttl=3600) is None
+
+
+def test_feltetel_fejlecek_es_304(tar, ido):
+    assert tar.feltetel_fejlecek("https://x.hu/1") == {}
+    tar.tarol("https://x.hu/1", valasz("torzs", ETag='"abc"', **{"Last-Modified": "Wed, 01 Jan 2026 00:00:00 GMT"}))
+    assert tar.feltetel_fejlecek("https://x.hu/1") == {
+        "If-None-Match": '"abc"', "If-Modified-Since": "Wed, 01 Jan 2026 00:00:00 GMT"
+    }
+    ido.most += 10_000
+    assert tar.nem_valtozott("https://x.hu/1").text == "torzs"
+    # a 304 a letöltési időt is frissíti, így a TTL újraindul
+    assert tar.friss("https://x.hu/1", ttl=60) is not None
+    assert tar.nem_valtozott("https://x.hu/nincs") is None
+    assert tar.statisztika == {"friss": 1, "304": 1, "letoltve": 1}
+
+
+def test_meretkorlat_felett_a_legregebben_hasznalt_torlodik(ido):
+    tar = HttpGyorsitotar(":memory:", max_meret_mb=0.01)
+    rnd = random.Random(1)
+    # ~3 kB tömörítve is, így kb. 3 fér el a 10 kB-ba
+    oldal = lambda: "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(4000))
+    for i in range(3):
+        ido.most += 1
+        tar.tarol(f"https://x.hu/{i}", valasz(oldal()))
+    ido.most += 1
+    assert tar.friss("https://x.hu/0", ttl=3600) is not None
+    ido.most += 1
+    tar.tarol("https://x.hu/3", valasz(oldal()))
+    megmaradt = {url for (url,) in tar.conn.execute("SELECT url FROM oldalak")}
+    assert "https://x.hu/0" in megmaradt and "https://x.hu/3" in megmaradt
+    assert "https://x.hu/1" not in megmaradt
+    meret = tar.conn.execute("SELECT SUM(LENGTH(torzs)) FROM oldalak").fetchone()[0]
+    assert meret <= tar.max_meret
+    tar.close()
+
+
+def test_lemezen_megmarad(tmp_path, ido):
+    path = str(tmp_path / "cache.sqlite3")
+    tar = HttpGyorsitotar(path)
+    tar.tarol("https://x.hu/1", valasz("ékezetes tartalom", ETag="e1"))
+    tar.close()
+    tar = HttpGyorsitotar(path)
+    assert tar.friss("https://x.hu/1", ttl=60).text == "ékezetes tartalom"
+    assert tar.feltetel_fejlecek("https://x.hu/1") == {"If-None-Match": "e1"}
+    tar.close()
@@ -0,0 +1,97 @@
+import time
+
+import pytest
+
+pytest.importorskip("bs4")
+for modul in ("curl_cffi", "playwright", "supabase"):
+    pytest.importorskip(modul)
+
+import jofogas  # noqa: E402
+from futasi_naplo import FutasiNaplo  # noqa: E402
+from hamis_supabase import HamisSupabase  # noqa: E402
+
+
+class Tar:
+    """Az OldalTar ment() hívását elnyelő helyettes"""
+
+    def __init__(self):
+        self.mentett = []
+
+    def ment(self, url, fajta, html):
+        self.mentett.append((url, fajta))
+        return url
+
+
+def lapozo(*elemek):
+    return f"<html><body><div class='ad-list-pager'>{''.join(elemek)}</div></body></html>"
+
+
+@pytest.mark.parametrize("html, vart", [
+    (lapozo('<a class="ad-list-pager-item-last" href="/magyarorszag/allasajanlat?o=87">»</a>'), 87),
+    (lapozo('<a class="ad-list-pager-page-number">1</a>', '<a class="ad-list-pager-page-number">2</a>',
+            '<a class="ad-list-pager-page-number">3</a>'), 3),
+    ("<html><body><p>Ellenőrző oldal</p></body></html>", None),
+])
+def test_oldalszam_a_lapozobol(monkeypatch, html, vart):
+    monkeypatch.setattr(jofogas, "safe_request", lambda session, url: html)
+    tar = Tar()
+
+    total_pages, oldal = jofogas.get_total_pages(None, tar)
+
+    assert total_pages == vart
+    assert oldal == html
+    assert tar.mentett == [(jofogas.BASE_SEARCH_TEMPLATE.format(page=1), "kereses")]
+
+
+def test_letoltesi_hibanal_az_oldalszam_ismeretlen(monkeypatch):
+    monkeypatch.setattr(jofogas, "safe_request", lambda session, url: None)
+    assert jofogas.get_total_pages(None, Tar()) == (None, None)
+
+
+# ----- BatchWriter -----
+@pytest.fixture
+def naplo(tmp_path):
+    n = FutasiNaplo("jofogas", {"kereses": "teszt"}, str(tmp_path / "naplo"))
+    yield n
+    n.close()
+
+
+def sorok(n):
+    return [{"link": f"https://allas.jofogas.hu/{i}.htm", "munka_neve": f"Állás {i}"} for i in range(n)]
+
+
+def test_batchwriter_kotegenkent_ir_es_nyugtaz(naplo):
+    db = HamisSupabase()
+    writer = jofogas.BatchWriter(db, naplo, batch_size=4, flush_sec=60)
+    for sor in sorok(10):
+        writer.put(sor)
+    writer.close()
+    assert [len(k.adat) for k in db.keresek] == [4, 4, 2]
+    assert (writer.inserted, writer.failed, writer.batches, writer.unapplied) == (10, 0, 3, 0)
+    assert naplo.fuggo_irasok() == []
+
+
+def test_batchwriter_a_varakozasi_ido_utan_a_reszkoteget_is_kiirja():
+    db = HamisSupabase()
+    writer = jofogas.BatchWriter(db, batch_size=100, flush_sec=0.05)
+    writer.put(sorok(1)[0])
+    for _ in range(100):
+        if db.keresek:
+            break
+        time.sleep(0.01)
+    assert len(db.keresek) == 1
+    writer.close()
+    assert writer.inserted == 1
+
+
+def test_batchwriter_sikertelen_kotege_a_naploban_fuggo_marad(monkeypatch, naplo):
+    def write_rows(supabase, rows):
+        raise RuntimeError("connection reset")
+    monkeypatch.setattr(jofogas, "write_rows", write_rows)
+    writer = jofogas.BatchWriter(HamisSupabase(), naplo, batch_size=2, flush_sec=60)
+    for sor in sorok(3):
+        writer.put(sor)
+    # az író hiba után is fut tovább, a close nem dob
+    writer.close()
+    assert (writer.inserted, writer.failed, writer.unapplied) == (0, 3, 2)
+    assert [len(rows) for _, _, rows in naplo.fuggo_irasok()] == [2, 1]
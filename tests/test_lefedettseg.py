@@ -0,0 +1,46 @@
+import pytest
+
+pytest.importorskip("supabase")
+
+from helysegnevtar import hely_kulcs  # noqa: E402
+from lefedettseg import terv_keszitese, koltseg, korben, futasi_lista_beolvasasa, becsult_oldalak  # noqa: E402
+
+HELYEK = {
+    "Szeged": (46.253, 20.141),
+    "Makó": (46.219, 20.480),
+    "Hódmezővásárhely": (46.418, 20.330),
+    "Kiskundorozsma": (46.274, 20.075),
+    "Pécs": (46.073, 18.233),
+}
+KOORDINATAK = {hely_kulcs(nev): (nev, lat, lng) for nev, (lat, lng) in HELYEK.items()}
+ALLAS_SZAMOK = {hely_kulcs("Szeged"): 120, hely_kulcs("Makó"): 15, hely_kulcs("Hódmezővásárhely"): 30,
+                hely_kulcs("Pécs"): 80}
+PONTOK = {kulcs: (lat, lng) for kulcs, (_, lat, lng) in KOORDINATAK.items()}
+
+
+def becsult_talalat(varos, km):
+    return sum(ALLAS_SZAMOK.get(k, 0) for k in korben(HELYEK[varos], km, PONTOK))
+
+
+def test_a_terv_minden_celpontot_lefed_kevesebb_oldallal():
+    # egymást átfedő körök Szeged körül, plusz egy ismeretlen város
+    jelenlegi = [("Szeged", 50), ("Makó", 25), ("Hódmezővásárhely", 25), ("Kiskundorozsma", 10), ("Sehol", 10)]
+    terv, celpontok, nem_talalt = terv_keszitese(KOORDINATAK, ALLAS_SZAMOK, jelenlegi)
+
+    assert celpontok == {hely_kulcs(n) for n in ("Szeged", "Makó", "Hódmezővásárhely")}
+    assert nem_talalt == ["Sehol"]
+    lefedett = set().union(*(korben(HELYEK[nev], km, PONTOK) for nev, km, _ in terv))
+    assert celpontok <= lefedett
+    # a jelenlegi lista minden köre külön lapozza ugyanazokat az állásokat
+    jelenlegi_korok = [(v, km, becsult_talalat(v, km)) for v, km in jelenlegi[:-1]]
+    assert koltseg(terv) < koltseg(jelenlegi_korok)
+
+
+def test_becsult_oldalak():
+    assert [becsult_oldalak(n) for n in (0, 1, 40, 41)] == [1, 1, 1, 2]
+
+
+def test_futasi_lista_beolvasasa(tmp_path):
+    path = tmp_path / "lista.txt"
+    path.write_text("# reggeli futás\nSzeged 25\n\nmakó  # alapértelmezett távolság\n", encoding="utf-8")
+    assert futasi_lista_beolvasasa(str(path)) == [("Szeged", 25), ("makó", 50)]
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import link_tukor
+from link_tukor import LinkTukor
+from hamis_supabase import HamisSupabase
+
+
+def sor(i, **mezok):
+    alap = {"id": i, "link": f"https://x.hu/{i}", "active": True, "szarmazas": "vmp",
+            "keresesi_link": "k1", "utoljara_frissitve": "2026-01-01T00:00:00+00:00", "tartalom_hash": f"h{i}"}
+    alap.update(mezok)
+    return alap
+
+
+@pytest.fixture
+def tukor():
+    t = LinkTukor("allasok", ":memory:")
+    yield t
+    t.close()
+
+
+def test_elso_szinkron_teljes_utana_vizjeles(tukor):
+    db = HamisSupabase({"allasok": [sor(1), sor(2, active=False), sor(3, szarmazas="jofogas2")]})
+    assert tukor.szinkronizal(db) == 3
+    assert db.keresek[0].szurok == []
+    assert tukor.linkek() == {"https://x.hu/1", "https://x.hu/2", "https://x.hu/3"}
+
+    db.tablak["allasok"].append(sor(4, utoljara_frissitve="2999-01-01T00:00:00+00:00"))
+    db.keresek.clear()
+    assert tukor.szinkronizal(db) == 1
+    muvelet, oszlop, vizjel = db.keresek[0].szurok[0]
+    assert (muvelet, oszlop) == ("gte", "utoljara_frissitve")
+    # a vízjel a szinkron kezdete előtt VIZJEL_RAHAGYAS-sal
+    assert datetime.fromisoformat(vizjel) < datetime.now(timezone.utc) - link_tukor.VIZJEL_RAHAGYAS + timedelta(seconds=5)
+    assert "https://x.hu/4" in tukor.linkek()
+
+
+def test_regi_teljes_szinkron_utan_ujra_teljes(tukor):
+    db = HamisSupabase({"allasok": [sor(1), sor(2)]})
+    tukor.szinkronizal(db)
+    # a DB-ben törölt sor csak teljes szinkronnál tűnik el a tükörből
+    db.tablak["allasok"].pop()
+    regen = datetime.now(timezone.utc) - timedelta(days=link_tukor.TELJES_SZINKRON_NAPOK + 1)
+    tukor._meta_beallit("utolso_teljes", regen.isoformat())
+    db.keresek.clear()
+    tukor.szinkronizal(db)
+    assert db.keresek[0].szurok == []
+    assert tukor.linkek() == {"https://x.hu/1"}
+
+
+def test_linkek_szurese(tukor):
+    tukor.bejegyez([sor(1), sor(2, active=False), sor(3, szarmazas="jofogas2"), sor(4, active=False, szarmazas="jofogas2")])
+    assert tukor.linkek(active=True) == {"https://x.hu/1", "https://x.hu/3"}
+    assert tukor.linkek(active=True, szarmazas="jofogas2") == {"https://x.hu/3"}
+    assert tukor.linkek(szarmazas="vmp") == {"https://x.hu/1", "https://x.hu/2"}
+
+
+def test_bejegyzes_nem_irja_felul_ismert_mezot_hianyzoval(tukor):
+    tukor.bejegyez([sor(1)])
+    # pl. a módosult sorok visszaírásakor nincs keresesi_link, és nincs id
+    tukor.bejegyez([{"link": "https://x.hu/1", "active": True, "tartalom_hash": "uj"}])
+    id_, keresesi_link, tartalom_hash = tukor.conn.execute(
+        "SELECT id, keresesi_link, tartalom_hash FROM linkek WHERE link = ?", ("https://x.hu/1",)
+    ).fetchone()
+    assert (id_, keresesi_link, tartalom_hash) == ("1", "k1", "uj")
+
+
+def test_tartalom_hashek_es_lista_hashek_sok_linkre(tukor):
+    tukor.bejegyez([sor(i) for i in range(1, 1201)] + [sor(9999, tartalom_hash=None)])
+    linkek = [f"https://x.hu/{i}" for i in range(1, 1201)] + ["https://x.hu/9999", "https://x.hu/nincs"]
+    hashek = tukor.tartalom_hashek(linkek)
+    assert len(hashek) == 1200 and hashek["https://x.hu/7"] == "h7"
+
+    tukor.lista_hashek_mentese({"https://x.hu/1": "l1", "https://x.hu/2": "l2"})
+    tukor.lista_hashek_mentese({"https://x.hu/2": "l2b"})
+    assert tukor.lista_hashek(["https://x.hu/1", "https://x.hu/2", "https://x.hu/3"]) == \
+        {"https://x.hu/1": "l1", "https://x.hu/2": "l2b"}
+
+
+def test_teljes_lapozas_keresesenkent(tukor):
+    assert tukor.utolso_teljes_lapozas("k1") is None
+    ido = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+    tukor.teljes_lapozas_mentese("k1", ido)
+    assert tukor.utolso_teljes_lapozas("k1") == ido
+    assert tukor.utolso_teljes_lapozas("k2") is None
+
+
+def test_masik_tablahoz_tartozo_tukor_uritodik(tmp_path):
+    path = str(tmp_path / "tukor.sqlite3")
+    t = LinkTukor("allasok", path)
+    t.bejegyez([sor(1)])
+    t._meta_beallit("vizjel", "2026-01-01")
+    t.conn.commit()
+    t.close()
+
+    t = LinkTukor("masik_tabla", path)
+    assert t.linkek() == set()
+    assert t._meta("vizjel") is None
+    t.close()
+
+
+def test_forgo_minta_a_sosem_majd_a_legregebben_ellenorzottekkel_kezd(tukor):
+    linkek = [f"https://x.hu/{i}" for i in range(6)]
+    tukor.ellenorzes_mentese(linkek[:2], datetime(2026, 3, 2, tzinfo=timezone.utc))
+    tukor.ellenorzes_mentese(linkek[2:4], datetime(2026, 3, 1, tzinfo=timezone.utc))
+    minta = tukor.legregebben_ellenorzott(linkek, 4)
+    assert set(minta[:2]) == {"https://x.hu/4", "https://x.hu/5"}
+    assert set(minta[2:]) == {"https://x.hu/2", "https://x.hu/3"}
+    # a mostani minta ellenőrzése után a többiek kerülnek sorra
+    tukor.ellenorzes_mentese(minta, datetime(2026, 3, 3, tzinfo=timezone.utc))
+    assert set(tukor.legregebben_ellenorzott(linkek, 2)) == {"https://x.hu/0", "https://x.hu/1"}
+    assert tukor.legregebben_ellenorzott(linkek, 0) == []
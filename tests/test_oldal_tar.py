@@ -0,0 +1,115 @@
+import os
+import random
+
+import pytest
+
+import oldal_tar
+from oldal_tar import OldalTar, oldal_olvasasa
+
+TTL = {"kereses": 1800, "allas": 7 * 86400}
+
+
+class Ido:
+    def __init__(self):
+        self.most = 1_000_000.0
+
+    def __call__(self):
+        return self.most
+
+
+@pytest.fixture
+def ido(monkeypatch):
+    i = Ido()
+    monkeypatch.setattr(oldal_tar.time, "time", i)
+    return i
+
+
+@pytest.fixture
+def tar(tmp_path, ido):
+    t = OldalTar(str(tmp_path / "oldalak"), TTL)
+    yield t
+    t.close()
+
+
+def test_mentes_tomoritve_url_hash_utvonalon(tar):
+    url = "https://allas.jofogas.hu/csongrad/targoncas_123.htm"
+    path = tar.ment(url, "allas", "<html>Targoncás</html>")
+    kulcs = OldalTar.kulcs(url)
+    assert path == os.path.join(tar.mappa, "allas", kulcs[:2], f"{kulcs}.html.gz")
+    assert oldal_olvasasa(path) == "<html>Targoncás</html>".encode("utf-8")
+    # azonos végű, de más URL nem írja felül
+    masik = tar.ment("https://allas.jofogas.hu/pest/targoncas_123.htm", "allas", "<html>Más</html>")
+    assert masik != path and oldal_olvasasa(path) == "<html>Targoncás</html>".encode("utf-8")
+
+
+def test_friss_a_fajta_ttl_jeig(tar, ido):
+    tar.ment("https://x.hu/?o=1", "kereses", "k")
+    tar.ment("https://x.hu/a.htm", "allas", "a")
+    ido.most += 1799
+    assert tar.friss("https://x.hu/?o=1", "kereses")
+    ido.most += 2
+    assert tar.friss("https://x.hu/?o=1", "kereses") is None
+    assert tar.friss("https://x.hu/a.htm", "allas")
+    assert tar.friss("https://x.hu/nincs.htm", "allas") is None
+
+
+def test_hianyzo_fajl_nem_friss(tar):
+    path = tar.ment("https://x.hu/a.htm", "allas", "a")
+    os.remove(path)
+    assert tar.friss("https://x.hu/a.htm", "allas") is None
+
+
+def test_valtozatlan_tartalom_nem_irodik_ujra(tar, ido):
+    path = tar.ment("https://x.hu/a.htm", "allas", "ugyanaz")
+    mtime = os.stat(path).st_mtime_ns
+    ido.most += 100
+    tar.ment("https://x.hu/a.htm", "allas", "ugyanaz")
+    assert os.stat(path).st_mtime_ns == mtime
+    tar.ment("https://x.hu/a.htm", "allas", "más")
+    assert oldal_olvasasa(path) == b"m\xc3\xa1s"
+    assert (tar.statisztika["letoltve"], tar.statisztika["valtozatlan"]) == (2, 1)
+
+
+def test_takaritas_torli_a_lejartakat(tar, ido):
+    kereses = tar.ment("https://x.hu/?o=1", "kereses", "k")
+    allas = tar.ment("https://x.hu/a.htm", "allas", "a")
+    ido.most += 3600
+    tar.takaritas()
+    assert not os.path.exists(kereses) and os.path.exists(allas)
+    assert tar.conn.execute("SELECT COUNT(*) FROM oldalak").fetchone()[0] == 1
+
+
+def test_meretkorlat_felett_lru_urites(tmp_path, ido):
+    tar = OldalTar(str(tmp_path / "oldalak"), TTL, max_meret_mb=0.01)
+    rnd = random.Random(2)
+    oldal = lambda: "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(4000))
+    for i in range(4):
+        ido.most += 1
+        tar.ment(f"https://x.hu/{i}.htm", "allas", oldal())
+    ido.most += 1
+    assert tar.friss("https://x.hu/0.htm", "allas")
+    tar.takaritas()
+    megmaradt = {url for (url,) in tar.conn.execute("SELECT url FROM oldalak")}
+    assert "https://x.hu/0.htm" in megmaradt and "https://x.hu/3.htm" in megmaradt
+    assert "https://x.hu/1.htm" not in megmaradt
+    assert not os.path.exists(tar.utvonal("https://x.hu/1.htm", "allas"))
+    assert tar.conn.execute("SELECT SUM(meret) FROM oldalak").fetchone()[0] <= tar.max_meret
+    tar.close()
+
+
+def test_az_index_ujranyitas_utan_megmarad(tmp_path, ido):
+    mappa = str(tmp_path / "oldalak")
+    tar = OldalTar(mappa, TTL)
+    tar.ment("https://x.hu/a.htm", "allas", "a")
+    tar.close()
+    tar = OldalTar(mappa, TTL)
+    assert tar.friss("https://x.hu/a.htm", "allas")
+    tar.close()
+
+
+def test_letoltesi_idok(tar, ido):
+    tar.ment("https://x.hu/a.htm", "allas", "a")
+    ido.most += 50
+    tar.ment("https://x.hu/b.htm", "allas", "b")
+    urlek = [f"https://x.hu/{i}.htm" for i in range(700)] + ["https://x.hu/a.htm", "https://x.hu/b.htm"]
+    assert tar.letoltesi_idok(urlek) == {"https://x.hu/a.htm": 1_000_000.0, "https://x.hu/b.htm": 1_000_050.0}
@@ -0,0 +1,239 @@
+import json
+
+import pytest
+
+for modul in ("typesense", "dotenv"):
+    pytest.importorskip(modul)
+supabase_csomag = pytest.importorskip("supabase")
+from typesense.exceptions import ObjectNotFound  # noqa: E402
+
+# importkor a modul Supabase klienst hoz létre (a teszt ENV-ekkel érvénytelen URL-re);
+# a tesztek úgyis a modul globálisait cserélik hamisakra
+with pytest.MonkeyPatch.context() as mp:
+    mp.setattr(supabase_csomag, "create_client", lambda url, key: None)
+    import szinkron  # noqa: E402
+import db_muveletek  # noqa: E402
+from hamis_supabase import HamisSupabase  # noqa: E402
+
+
+class HamisTypesense:
+    """A szinkron által használt Typesense kliens részhalmaza: collection-ök, aliasok, JSONL import"""
+
+    def __init__(self, import_hiba=None):
+        self.collectionok = {}
+        self.aliasok = {}
+        self.importok = []
+        # import_hiba(sorok) -> None / kivétel, vagy {id: hibaüzenet} a dokumentum szintű hibákhoz
+        self.import_hiba = import_hiba
+        self.collections = _Collectionok(self)
+        self.aliases = _Aliasok(self)
+
+
+class _Collectionok:
+    def __init__(self, kliens):
+        self.kliens = kliens
+
+    def __getitem__(self, nev):
+        return _Collection(self.kliens, nev)
+
+    def create(self, sema):
+        self.kliens.collectionok[sema["name"]] = {}
+
+    def retrieve(self):
+        return [{"name": nev} for nev in self.kliens.collectionok]
+
+
+class _Collection:
+    def __init__(self, kliens, nev):
+        self.kliens = kliens
+        self.nev = nev
+        self.documents = self
+
+    def _dokumentumok(self):
+        if self.nev not in self.kliens.collectionok:
+            raise ObjectNotFound(self.nev)
+        return self.kliens.collectionok[self.nev]
+
+    def retrieve(self):
+        return {"name": self.nev, "num_documents": len(self._dokumentumok())}
+
+    def delete(self):
+        self._dokumentumok()
+        del self.kliens.collectionok[self.nev]
+
+    def import_(self, payload, parameterek):
+        sorok = payload.split("\n")
+        self.kliens.importok.append(len(sorok))
+        hibak = (self.kliens.import_hiba(sorok) if self.kliens.import_hiba else None) or {}
+        eredmenyek = []
+        for sor in sorok:
+            dokumentum = json.loads(sor)
+            if dokumentum["id"] in hibak:
+                eredmenyek.append({"success": False, "error": hibak[dokumentum["id"]]})
+            else:
+                self._dokumentumok()[dokumentum["id"]] = dokumentum
+                eredmenyek.append({"success": True})
+        return "\n".join(json.dumps(e) for e in eredmenyek)
+
+
+class _Alias:
+    def __init__(self, kliens, nev):
+        self.kliens = kliens
+        self.nev = nev
+
+    def retrieve(self):
+        if self.nev not in self.kliens.aliasok:
+            raise ObjectNotFound(self.nev)
+        return {"name": self.nev, "collection_name": self.kliens.aliasok[self.nev]}
+
+
+class _Aliasok:
+    def __init__(self, kliens):
+        self.kliens = kliens
+
+    def __getitem__(self, nev):
+        return _Alias(self.kliens, nev)
+
+    def upsert(self, nev, torzs):
+        self.kliens.aliasok[nev] = torzs["collection_name"]
+
+
+@pytest.fixture
+def ts(monkeypatch):
+    kliens = HamisTypesense()
+    kliens.collectionok["allasok_20260101_000000"] = {}
+    monkeypatch.setattr(szinkron, "typesense", kliens)
+    return kliens
+
+
+@pytest.fixture(autouse=True)
+def nincs_varakozas(monkeypatch):
+    monkeypatch.setattr(szinkron.time, "sleep", lambda _: None)
+    monkeypatch.setattr(db_muveletek.time, "sleep", lambda _: None)
+
+
+def sorok(n):
+    return [json.dumps({"id": str(i), "munka_neve": f"Állás {i}"}, ensure_ascii=False) for i in range(n)]
+
+
+# ----- JSONL import -----
+def test_import_dokumentum_szintu_hibak_szamolasa(ts):
+    ts.import_hiba = lambda _: {"2": "Field `location` has an invalid value"}
+    sikeres, hibak = szinkron.jsonl_importalasa("allasok_20260101_000000", sorok(5))
+    assert sikeres == 4
+    assert hibak == [(sorok(5)[2], "Field `location` has an invalid value")]
+    assert ts.importok == [5]
+
+
+def test_rovidebb_valasz_maradeka_hibasnak_szamit(ts, monkeypatch):
+    eredeti = _Collection.import_
+    monkeypatch.setattr(_Collection, "import_",
+                        lambda self, payload, p: "\n".join(eredeti(self, payload, p).splitlines()[:3]))
+    sikeres, hibak = szinkron.jsonl_importalasa("allasok_20260101_000000", sorok(5))
+    assert sikeres == 3
+    assert [(json.loads(s)["id"], h) for s, h in hibak] == [("3", "nincs válasz a dokumentumra"),
+                                                            ("4", "nincs válasz a dokumentumra")]
+
+
+def test_hibas_keres_felezve_ujrakuldve(ts):
+    def import_hiba(sorok_):
+        if len(sorok_) > 2:
+            raise RuntimeError("413 Request Entity Too Large")
+        if any(json.loads(s)["id"] == "5" for s in sorok_):
+            raise RuntimeError("timeout")
+    ts.import_hiba = import_hiba
+    sikeres, hibak = szinkron.jsonl_importalasa("allasok_20260101_000000", sorok(8))
+    assert sikeres == 7
+    assert hibak == [(sorok(8)[5], "timeout")]
+    # csak a hibás dokumentumot tartalmazó ág felezése megy le egy dokumentumig
+    assert ts.importok == [8, 4, 2, 2, 4, 2, 1, 1, 2]
+    assert len(ts.collectionok["allasok_20260101_000000"]) == 7
+
+
+def test_bajt_csomagok_a_cel_meret_es_a_darabkorlat_szerint(monkeypatch):
+    monkeypatch.setattr(szinkron, "IMPORT_CEL_BAJT", 100)
+    jsonl = ["x" * 39] * 7
+    # 40 bájt / sor (sortöréssel): a harmadik sor lépi át a 100 bájtot
+    assert [len(c) for c in szinkron.bajt_csomagok(jsonl)] == [3, 3, 1]
+    monkeypatch.setattr(szinkron, "IMPORT_MAX_DOKUMENTUM", 2)
+    assert [len(c) for c in szinkron.bajt_csomagok(jsonl)] == [2, 2, 2, 1]
+    assert list(szinkron.bajt_csomagok([])) == []
+
+
+def test_hibas_dokumentumok_ujraprobalasa(ts):
+    # az "1" a második újrapróbálásra bemegy, a "3" a harmadik után is hibás marad
+    valaszok = [{"1": "503", "3": "hibás mező"}, {"3": "hibás mező"}]
+    ts.import_hiba = lambda _: valaszok.pop(0) if len(valaszok) > 1 else valaszok[0]
+    hibak = [(sorok(4)[1], "503"), (sorok(4)[3], "hibás mező")]
+    sikeres, vegleges = szinkron.hibas_dokumentumok_ujraprobalasa("allasok_20260101_000000", hibak)
+    assert sikeres == 1
+    assert vegleges == [(sorok(4)[3], "hibás mező")]
+    assert ts.importok == [2, 2, 1]
+
+
+# ----- alias -----
+def test_elo_alias_nev(ts):
+    # friss telepítés: nincs se alias, se régi collection
+    assert szinkron.elo_alias_nev() == szinkron.ALIAS_NEV
+    # a nevet a régi, nem alias alapú collection foglalja
+    ts.collectionok[szinkron.ALIAS_NEV] = {}
+    assert szinkron.elo_alias_nev() == szinkron.ATMENETI_ALIAS_NEV
+    # az átállás után az alias a döntő
+    del ts.collectionok[szinkron.ALIAS_NEV]
+    ts.aliasok[szinkron.ALIAS_NEV] = "allasok_20260101_000000"
+    assert szinkron.elo_alias_nev() == szinkron.ALIAS_NEV
+
+
+def test_alias_atallitasa_az_ideiglenes_aliast_is_viszi(ts):
+    szinkron.alias_atallitasa(szinkron.ALIAS_NEV, "allasok_20260101_000000")
+    assert ts.aliasok == {szinkron.ALIAS_NEV: "allasok_20260101_000000"}
+
+    ts.aliasok[szinkron.ATMENETI_ALIAS_NEV] = "allasok_20260101_000000"
+    szinkron.alias_atallitasa(szinkron.ALIAS_NEV, "allasok_20260102_000000")
+    assert ts.aliasok == {szinkron.ALIAS_NEV: "allasok_20260102_000000",
+                          szinkron.ATMENETI_ALIAS_NEV: "allasok_20260102_000000"}
+    # az ideiglenes alias állítása csak önmagát érinti
+    szinkron.alias_atallitasa(szinkron.ATMENETI_ALIAS_NEV, "allasok_20260103_000000")
+    assert ts.aliasok[szinkron.ALIAS_NEV] == "allasok_20260102_000000"
+
+
+def test_alias_atallas_torli_a_regi_collectiont(ts):
+    ts.collectionok[szinkron.ALIAS_NEV] = {"1": {}}
+    with pytest.raises(RuntimeError):
+        szinkron.alias_atallas()
+    assert szinkron.ALIAS_NEV in ts.collectionok
+
+    ts.aliasok[szinkron.ATMENETI_ALIAS_NEV] = "allasok_20260101_000000"
+    szinkron.alias_atallas()
+    assert szinkron.ALIAS_NEV not in ts.collectionok
+    assert ts.aliasok[szinkron.ALIAS_NEV] == "allasok_20260101_000000"
+    assert szinkron.elo_alias_nev() == szinkron.ALIAS_NEV
+    # másodszor nincs teendő
+    szinkron.alias_atallas()
+
+
+def test_regi_collectionok_torlese(ts):
+    for nev in ("allasok_20260102_000000", "allasok_20260103_000000", "mas_collection"):
+        ts.collectionok[nev] = {}
+    szinkron.regi_collectionok_torlese("allasok_20260103_000000")
+    assert set(ts.collectionok) == {"allasok_20260103_000000", "allasok_20260102_000000", "mas_collection"}
+
+
+# ----- állapot -----
+def test_allapot_mentese_es_betoltese(monkeypatch):
+    db = HamisSupabase()
+    monkeypatch.setattr(szinkron, "supabase", db)
+    assert szinkron.allapot_betoltese() == {}
+    szinkron.allapot_mentese("allasok_20260101_000000", "2026-01-01T00:00:00+00:00", ["7"])
+    szinkron.allapot_mentese("allasok_20260101_000000", "2026-01-02T00:00:00+00:00", [])
+    assert len(db.tablak[szinkron.SZINKRON_ALLAPOT_TABLA]) == 1
+    assert szinkron.allapot_betoltese() == {
+        "collection": "allasok_20260101_000000", "vizjel": "2026-01-02T00:00:00+00:00", "ujraprobalando": []
+    }
+
+
+def test_olvashatatlan_allapot_teljes_ujraepiteshez_vezet(monkeypatch):
+    def hibak(lekerdezes):
+        raise RuntimeError('relation "szinkron_allapot" does not exist')
+    monkeypatch.setattr(szinkron, "supabase", HamisSupabase(hibak=hibak))
+    assert szinkron.allapot_betoltese() == {}
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+import utemezo
+from utemezo import retry_after_masodperc, AIMDUtemezo, FixUtemezo, utemezo_letrehozasa
+
+
+class Ora:
+    """time.monotonic / time.sleep helyettes: az alvás csak előre tekeri az órát"""
+
+    def __init__(self):
+        self.most = 1000.0
+        self.alvasok = []
+
+    def monotonic(self):
+        return self.most
+
+    def sleep(self, mp):
+        self.alvasok.append(mp)
+        self.most += mp
+
+
+@pytest.fixture
+def ora(monkeypatch):
+    o = Ora()
+    monkeypatch.setattr(utemezo.time, "monotonic", o.monotonic)
+    monkeypatch.setattr(utemezo.time, "sleep", o.sleep)
+    # szórás nélkül, hogy a késleltetések pontosan ellenőrizhetők legyenek
+    monkeypatch.setattr(utemezo.random, "uniform", lambda a, b: (a + b) / 2)
+    return o
+
+
+# ----- Retry-After -----
+def test_retry_after_masodpercben_es_datumkent():
+    assert retry_after_masodperc("120") == 120.0
+    assert retry_after_masodperc(" 7 ") == 7.0
+    kesobb = datetime.now(timezone.utc) + timedelta(seconds=90)
+    assert 85 <= retry_after_masodperc(format_datetime(kesobb, usegmt=True)) <= 90
+    korabban = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert retry_after_masodperc(format_datetime(korabban, usegmt=True)) == 0.0
+
+
+@pytest.mark.parametrize("ertek", [None, "", "holnap", "-5"])
+def test_ervenytelen_retry_after(ertek):
+    assert retry_after_masodperc(ertek) is None
+
+
+# ----- AIMD -----
+def test_egeszseges_valaszoknal_a_padloig_gyorsul(ora):
+    u = AIMDUtemezo(padlo=3, plafon=120, kezdo=10, lepes=2)
+    for _ in range(10):
+        u.visszajelzes(200, 1.0)
+    assert u.kesleltetes == 3
+
+
+def test_429_es_5xx_duplaz_a_plafonig(ora):
+    u = AIMDUtemezo(padlo=3, plafon=50, kezdo=10)
+    u.visszajelzes(429, 0.5)
+    assert u.kesleltetes == 20
+    u.visszajelzes(503, 0.5)
+    assert u.kesleltetes == 40
+    u.visszajelzes(None, 30.0)
+    assert u.kesleltetes == 50
+
+
+def test_lassu_valasz_lassit(ora):
+    u = AIMDUtemezo(padlo=3, plafon=120, kezdo=10, lepes=2, lassu_szorzo=2.5)
+    u.visszajelzes(200, 1.0)
+    assert u.kesleltetes == 8
+    u.visszajelzes(200, 3.0)
+    assert u.kesleltetes == 12
+
+
+def test_hibas_valasz_nem_rontja_az_atlag_valaszidot(ora):
+    u = AIMDUtemezo(padlo=3, plafon=120, kezdo=10, lepes=2)
+    u.visszajelzes(200, 1.0)
+    u.visszajelzes(503, 60.0)
+    u.visszajelzes(200, 1.2)
+    assert u.kesleltetes == 14
+
+
+def test_varakozas_betartja_a_kesleltetest_es_a_retry_aftert(ora):
+    u = AIMDUtemezo(padlo=3, plafon=120, kezdo=10, lepes=2)
+    u.varakozas()
+    assert ora.alvasok == []
+    u.visszajelzes(200, 0.0)
+    u.varakozas()
+    assert ora.alvasok == [8]
+    u.visszajelzes(429, 0.0, retry_after=100)
+    u.varakozas()
+    assert ora.alvasok[-1] == 100
+
+
+# ----- fix / gyár -----
+def test_fix_utemezo_a_regi_ritmus(ora):
+    u = FixUtemezo(25, 35)
+    u.varakozas()
+    u.visszajelzes(503, 0.0)
+    u.varakozas()
+    assert ora.alvasok == [30]
+
+
+def test_utemezo_letrehozasa():
+    assert isinstance(utemezo_letrehozasa("fix"), FixUtemezo)
+    aimd = utemezo_letrehozasa("aimd", padlo=5, plafon=60)
+    assert isinstance(aimd, AIMDUtemezo) and (aimd.padlo, aimd.plafon) == (5, 60)
+    with pytest.raises(ValueError):
+        utemezo_letrehozasa("turbo")
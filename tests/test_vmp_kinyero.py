@@ -0,0 +1,177 @@
+# A vmp_kinyero mindkét elemzője (html.parser és lxml) ugyanazt kell adja a tests/fixtures/vmp
+# oldalain, mint a táblázatos kinyerő előtti allasok.py kód (lent, változatlan logikával).
+# A hibás jelölésű oldalakon a régi kód az egymásba ágyazott cellák miatt rossz eredményt adott;
+# ezeknél a mellettük lévő .json a böngésző módra javított (elvárt) eredmény.
+import os
+import json
+import importlib
+
+import pytest
+
+from conftest import FIXTURES_DIR
+
+BeautifulSoup = pytest.importorskip("bs4").BeautifulSoup
+
+import vmp_kinyero  # noqa: E402
+
+VMP_DIR = os.path.join(FIXTURES_DIR, "vmp")
+HIBAS_JELOLES = {"talalatok_hibas_jeloles.html", "reszletes_hibas_jeloles.html"}
+
+
+def oldalak(elotag):
+    return sorted(f for f in os.listdir(VMP_DIR)
+                  if f.startswith(elotag) and f.endswith(".html") and f not in HIBAS_JELOLES) + ["ures.html"]
+
+
+TALALATI_OLDALAK = oldalak("talalatok_")
+RESZLETES_OLDALAK = oldalak("reszletes_")
+
+ELEMZOK = [
+    "html.parser",
+    pytest.param("lxml", marks=pytest.mark.skipif(not vmp_kinyero.lxml, reason="nincs lxml")),
+]
+
+
+def oldal(nev):
+    with open(os.path.join(VMP_DIR, nev), encoding="utf-8") as f:
+        return f.read()
+
+
+def elvart(nev):
+    with open(os.path.join(VMP_DIR, nev.replace(".html", ".json")), encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ----- a régi allasok.py kinyerés (get_allasok_egy_oldalrol / get_job_details), letöltés nélkül -----
+def regi_talalati_sorok(html):
+    soup = BeautifulSoup(html, "html.parser")
+    results = []
+    for row in soup.select("tbody tr"):
+        tds = row.find_all("td")
+        if len(tds) >= 4:
+            allas = {
+                "Munka neve": tds[0].get_text(strip=True),
+                "Munka típusa": tds[1].get_text(strip=True),
+                "Hely": tds[2].get_text(strip=True),
+                "Cég": tds[3].get_text(strip=True),
+                "Link": "",
+            }
+            link_elem = tds[0].find("a")
+            if link_elem and link_elem.has_attr("href"):
+                allas["Link"] = "https://vmp.munka.hu" + link_elem["href"]
+            results.append(allas)
+    return results
+
+
+REGI_TAB2_MEZOK = {
+    "Teljes/rész munkaidő (óra)": "teljes_resz_munkaido_ora",
+    "Munkaidő kezdete (óra:perc)": "munkaido_kezdete",
+    "Munkarend": "munkarend",
+    "EU-s állampolgár figyelmébe ajánlja?": "eu_allampolgar_javaslat",
+    "Speciális követelmények": "speciális_követelmények",
+    "Speciális körülmények": "speciális_körülmények",
+    "A munkakörhöz kapcsolódó juttatások": "a_munkakorhoz_kapcsolodo_juttatasok",
+    "Állásegyeztetés helye": "allas_egyeztes_helye",
+    "Állásegyeztetés ideje": "allas_egyeztetes_ideje",
+}
+
+
+def regi_reszletes_adatok(html):
+    soup = BeautifulSoup(html, "html.parser")
+    allas = {}
+    for table in soup.find_all("table", class_="standardTable"):
+        tbody = table.find("tbody")
+        if tbody:
+            for row in tbody.find_all("tr"):
+                tds = row.find_all("td")
+                if len(tds) >= 2:
+                    kulcs = " ".join(tds[0].get_text(strip=True).split())
+                    ertek = tds[1].get_text(strip=True)
+                    if kulcs == "Képviselő elérhetőségei":
+                        email_link = row.find("a", href=True)
+                        if email_link and email_link["href"].startswith("mailto:"):
+                            allas[kulcs] = email_link["href"].replace("mailto:", "")
+                        else:
+                            allas[kulcs] = ertek
+                    elif kulcs in ("Foglalkoztató neve", "Képviselő neve", "Felajánlott havi bruttó kereset (Ft)",
+                                   "Munkavégzés helye", "Elvárt iskolai végzettség", "Megjegyzés"):
+                        allas[kulcs] = ertek
+
+    email_tag = soup.select_one("#tabs-1 a[href^='mailto:']")
+    if email_tag:
+        allas["Email"] = email_tag["href"].replace("mailto:", "")
+
+    tab2_div = soup.find("div", id="tabs-2")
+    if tab2_div:
+        table = tab2_div.find("table", class_="standardTable")
+        if table:
+            tbody = table.find("tbody")
+            if tbody:
+                for row in tbody.find_all("tr"):
+                    tds = row.find_all("td")
+                    if len(tds) >= 2:
+                        kulcs = " ".join(tds[0].get_text(strip=True).split())
+                        ertek = tds[1].get_text(strip=True)
+                        if kulcs in REGI_TAB2_MEZOK:
+                            allas[REGI_TAB2_MEZOK[kulcs]] = ertek
+                        elif kulcs.startswith("Kéri-e az országon belüli áttelepülést"):
+                            allas["attelepules_kovetelmeny"] = ertek
+    return allas
+
+
+# ----- az új kinyerés, az allasok.py-beli összerakással -----
+def uj_talalati_sorok(html):
+    return [
+        {"Munka neve": nev, "Munka típusa": tipus, "Hely": hely, "Cég": ceg,
+         "Link": "https://vmp.munka.hu" + href if href is not None else ""}
+        for nev, tipus, hely, ceg, href in vmp_kinyero.talalati_sorok(html)
+    ]
+
+
+@pytest.fixture(params=ELEMZOK)
+def elemzo(request, monkeypatch):
+    monkeypatch.setattr(vmp_kinyero, "ELEMZO", request.param)
+    return request.param
+
+
+def test_alapertelmezett_elemzo_az_lxml_ha_telepitve_van(monkeypatch):
+    monkeypatch.delenv("VMP_ELEMZO", raising=False)
+    try:
+        assert importlib.reload(vmp_kinyero).ELEMZO == ("lxml" if vmp_kinyero.lxml else "html.parser")
+    finally:
+        importlib.reload(vmp_kinyero)
+
+
+@pytest.mark.parametrize("nev", TALALATI_OLDALAK)
+def test_talalati_oldal_egyezik_a_regi_koddal(elemzo, nev):
+    html = oldal(nev)
+    assert uj_talalati_sorok(html) == regi_talalati_sorok(html)
+
+
+@pytest.mark.parametrize("nev", RESZLETES_OLDALAK)
+def test_reszletes_oldal_egyezik_a_regi_koddal(elemzo, nev):
+    html = oldal(nev)
+    assert vmp_kinyero.reszletes_adatok(html) == regi_reszletes_adatok(html)
+
+
+def test_hibas_jelolesu_talalati_oldal(elemzo):
+    sorok = vmp_kinyero.talalati_sorok(oldal("talalatok_hibas_jeloles.html"))
+    assert [list(sor) for sor in sorok] == elvart("talalatok_hibas_jeloles.html")
+
+
+def test_hibas_jelolesu_reszletes_oldal(elemzo):
+    adatok = vmp_kinyero.reszletes_adatok(oldal("reszletes_hibas_jeloles.html"))
+    assert adatok == elvart("reszletes_hibas_jeloles.html")
+
+
+def test_tabla_javito_a_cellan_kivuli_zaro_taget_eldobja():
+    html = "<div><table><tr><td>a</div>b<td>c</table></div>"
+    assert vmp_kinyero.TablaJavito().javitott(html) == \
+        "<div><table><tr><td>ab</td><td>c</td></tr></table></div>"
+
+
+def test_a_fixture_oldalak_nem_uresek():
+    assert len(uj_talalati_sorok(oldal("talalatok_szeged.html"))) == 5
+    adatok = regi_reszletes_adatok(oldal("reszletes_targoncavezeto.html"))
+    assert adatok["Képviselő elérhetőségei"] == "nagy.peter@raktar.hu"
+    assert adatok["attelepules_kovetelmeny"] == "Nem"
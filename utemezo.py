@@ -0,0 +1,108 @@
+# utemezo.py
+# Kérés-ütemezők (rate controller) a VMP lekérésekhez.
+# Minden ütemező két dolgot csinál:
+#   varakozas()          - a következő kérés előtt annyit vár, amennyit a jelenlegi késleltetés előír
+#   visszajelzes(...)    - a válasz (státusz, késleltetés, Retry-After) alapján állít a késleltetésen
+import time
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def retry_after_masodperc(ertek):
+    """Retry-After fejléc (másodperc vagy HTTP dátum) -> másodperc, vagy None"""
+    if not ertek:
+        return None
+    ertek = ertek.strip()
+    if ertek.isdigit():
+        return float(ertek)
+    try:
+        return max(0.0, (parsedate_to_datetime(ertek) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class Utemezo:
+    """Alap ütemező: a legutóbbi kérés óta legalább `self.kesleltetes` másodpercet vár"""
+
+    def __init__(self, kesleltetes):
+        self.kesleltetes = kesleltetes
+        self._kovetkezo_legkorabban = 0.0
+        self._utolso_keres = None
+
+    def _kovetkezo_kesleltetes(self):
+        return self.kesleltetes
+
+    def varakozas(self):
+        if self._utolso_keres is not None:
+            hatra = max(self._utolso_keres + self._kovetkezo_kesleltetes(), self._kovetkezo_legkorabban) - time.monotonic()
+            if hatra > 0:
+                time.sleep(hatra)
+        self._utolso_keres = time.monotonic()
+
+    def visszajelzes(self, statusz, eltelt, retry_after=None):
+        if retry_after:
+            self._kovetkezo_legkorabban = time.monotonic() + retry_after
+
+
+class FixUtemezo(Utemezo):
+    """A régi viselkedés: minden kérés között véletlen min..max másodperc"""
+
+    def __init__(self, minimum=25.0, maximum=35.0):
+        super().__init__(minimum)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def _kovetkezo_kesleltetes(self):
+        return random.uniform(self.minimum, self.maximum)
+
+
+class AIMDUtemezo(Utemezo):
+    """
+    Additív csökkentés / multiplikatív növelés:
+    - egészséges, gyors válasz: késleltetés -= lepes (a padlóig)
+    - lassú válasz (a futó átlag `lassu_szorzo`-szorosa felett): késleltetés *= 1.5
+    - 429 / 5xx / hálózati hiba: késleltetés *= 2 (a plafonig), Retry-After-t betartjuk
+    """
+
+    def __init__(self, padlo=3.0, plafon=120.0, kezdo=25.0, lepes=2.0, lassu_szorzo=2.5):
+        super().__init__(min(max(kezdo, padlo), plafon))
+        self.padlo = padlo
+        self.plafon = plafon
+        self.lepes = lepes
+        self.lassu_szorzo = lassu_szorzo
+        self._atlag_valaszido = None
+
+    def _kovetkezo_kesleltetes(self):
+        # ±10% szórás, hogy ne legyen gépies a ritmus
+        return self.kesleltetes * random.uniform(0.9, 1.1)
+
+    def visszajelzes(self, statusz, eltelt, retry_after=None):
+        regi = self.kesleltetes
+        if statusz is None or statusz == 429 or statusz >= 500:
+            self.kesleltetes = min(self.plafon, self.kesleltetes * 2)
+            ok = f"{statusz or 'hálózati hiba'}"
+        elif self._atlag_valaszido is not None and eltelt > self._atlag_valaszido * self.lassu_szorzo:
+            self.kesleltetes = min(self.plafon, self.kesleltetes * 1.5)
+            ok = f"lassú válasz ({eltelt:.1f}s, átlag {self._atlag_valaszido:.1f}s)"
+        else:
+            self.kesleltetes = max(self.padlo, self.kesleltetes - self.lepes)
+            ok = f"rendben ({statusz}, {eltelt:.1f}s)"
+
+        if statusz is not None and statusz < 500 and statusz != 429:
+            self._atlag_valaszido = eltelt if self._atlag_valaszido is None else 0.8 * self._atlag_valaszido + 0.2 * eltelt
+
+        super().visszajelzes(statusz, eltelt, retry_after)
+        uzenet = f"⏱ Ütemező: {ok} -> késleltetés {regi:.1f}s → {self.kesleltetes:.1f}s"
+        if retry_after:
+            uzenet += f", Retry-After: {retry_after:.0f}s"
+        print(uzenet)
+
+
+def utemezo_letrehozasa(tipus="aimd", padlo=3.0, plafon=120.0):
+    """Ütemező név alapján: "aimd" (alapértelmezés) vagy "fix" (régi 25-35 mp)"""
+    if tipus == "fix":
+        return FixUtemezo()
+    if tipus == "aimd":
+        return AIMDUtemezo(padlo=padlo, plafon=plafon)
+    raise ValueError(f"Ismeretlen ütemező: {tipus}")
@@ -0,0 +1,300 @@
+# vmp_kinyero.py
+# Mezőkinyerés a VMP találati és részletes oldalaiból.
+# A címke -> mező hozzárendelés deklaratív (lent a táblázatokban), egyszer fordítjuk le;
+# új mező felvétele egy sor a megfelelő táblázatban.
+# Elemző: alapból lxml, ha telepítve van (gyorsabb, és a hibás jelölést böngésző módra javítja);
+# különben, vagy VMP_ELEMZO=html.parser esetén BeautifulSoup html.parser, előtte a táblázat
+# jelölését ugyanúgy javítjuk (TablaJavito), hogy a két elemző ugyanazt adja.
+# A két elemző egyezését a tests/test_vmp_kinyero.py ellenőrzi a tests/fixtures/vmp oldalain.
+import os
+from html import escape
+from html.parser import HTMLParser
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+# ---------------------------------------------------------
+# Címke -> mező táblázatok
+# ---------------------------------------------------------
+# A címkében a szóközöket összevonjuk; "*" végű címke előtag egyezést jelent.
+
+# Az oldal összes "standardTable" táblázatából
+RESZLETES_MEZOK = {
+    "Foglalkoztató neve": "Foglalkoztató neve",
+    "Képviselő neve": "Képviselő neve",
+    "Képviselő elérhetőségei": "Képviselő elérhetőségei",
+    "Felajánlott havi bruttó kereset (Ft)": "Felajánlott havi bruttó kereset (Ft)",
+    "Munkavégzés helye": "Munkavégzés helye",
+    "Elvárt iskolai végzettség": "Elvárt iskolai végzettség",
+    "Megjegyzés": "Megjegyzés",
+}
+
+# Csak a #tabs-2 fül első "standardTable" táblázatából
+TAB2_MEZOK = {
+    "Teljes/rész munkaidő (óra)": "teljes_resz_munkaido_ora",
+    "Munkaidő kezdete (óra:perc)": "munkaido_kezdete",
+    "Munkarend": "munkarend",
+    "EU-s állampolgár figyelmébe ajánlja?": "eu_allampolgar_javaslat",
+    "Kéri-e az országon belüli áttelepülést*": "attelepules_kovetelmeny",
+    "Speciális követelmények": "speciális_követelmények",
+    "Speciális körülmények": "speciális_körülmények",
+    "A munkakörhöz kapcsolódó juttatások": "a_munkakorhoz_kapcsolodo_juttatasok",
+    "Állásegyeztetés helye": "allas_egyeztes_helye",
+    "Állásegyeztetés ideje": "allas_egyeztetes_ideje",
+}
+
+# Ezeknél a sor első linkjének címe az érték, ha mailto: link
+MAILTO_MEZOK = {"Képviselő elérhetőségei"}
+
+
+class CimkeTabla:
+    """Lefordított címke táblázat: pontos egyezés dict-ből, előtagok sorban"""
+
+    def __init__(self, mezok):
+        self.pontos = {c: m for c, m in mezok.items() if not c.endswith("*")}
+        self.elotagok = tuple((c[:-1], m) for c, m in mezok.items() if c.endswith("*"))
+
+    def mezo(self, kulcs):
+        mezo = self.pontos.get(kulcs)
+        if mezo is None:
+            for elotag, m in self.elotagok:
+                if kulcs.startswith(elotag):
+                    return m
+        return mezo
+
+
+RESZLETES = CimkeTabla(RESZLETES_MEZOK)
+TAB2 = CimkeTabla(TAB2_MEZOK)
+
+# ---------------------------------------------------------
+# Táblázat javítás a html.parser elé
+# ---------------------------------------------------------
+# A html.parser a lezáratlan <td> / <tr> cellákat egymásba ágyazza, a kóbor záró tagokat
+# (pl. cellán kívül nyitott </div>) pedig a cellán kívülre is érvényesíti. A TablaJavito a
+# böngészőkhöz (és az lxml-hez) hasonlóan kiteszi a hiányzó záró tagokat, és eldobja azokat a
+# záró tagokat, amelyek eleme nem az aktuális cellán / táblázaton belül nyílt.
+URES_ELEMEK = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param",
+               "source", "track", "wbr"}
+CELLA = {"td", "th"}
+SOR_CSOPORT = {"thead", "tbody", "tfoot"}
+# Nyitó tag -> (ezeket zárja le, eddig a határig keresve)
+IMPLICIT_ZARAS = {
+    "td": (CELLA, {"tr", "table"}),
+    "th": (CELLA, {"tr", "table"}),
+    "tr": (CELLA | {"tr"}, SOR_CSOPORT | {"table"}),
+    "thead": (CELLA | {"tr"} | SOR_CSOPORT, {"table"}),
+    "tbody": (CELLA | {"tr"} | SOR_CSOPORT, {"table"}),
+    "tfoot": (CELLA | {"tr"} | SOR_CSOPORT, {"table"}),
+}
+
+
+class TablaJavito(HTMLParser):
+    """A HTML újraírása kiegyensúlyozott tagekkel; megjegyzés, script és style nélkül"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.kimenet = []
+        self.nyitott = []
+        self.kihagyott = 0
+
+    def _zaras(self, melyseg):
+        while len(self.nyitott) > melyseg:
+            self.kimenet.append(f"</{self.nyitott.pop()}>")
+
+    def _keres(self, nevek, hatar):
+        """A legbelső nyitott `nevek` elem indexe, a legközelebbi `hatar` elemen belül"""
+        for i in range(len(self.nyitott) - 1, -1, -1):
+            if self.nyitott[i] in nevek:
+                return i
+            if self.nyitott[i] in hatar:
+                return None
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ("script", "style"):
+            self.kihagyott += 1
+            return
+        if self.kihagyott:
+            return
+        if tag in IMPLICIT_ZARAS:
+            i = self._keres(*IMPLICIT_ZARAS[tag])
+            if i is not None:
+                self._zaras(i)
+        attr = "".join(f' {k}="{escape(v or "", quote=True)}"' for k, v in attrs)
+        self.kimenet.append(f"<{tag}{attr}>")
+        if tag not in URES_ELEMEK:
+            self.nyitott.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in URES_ELEMEK and self.nyitott and self.nyitott[-1] == tag:
+            self._zaras(len(self.nyitott) - 1)
+
+    def handle_endtag(self, tag):
+        if tag in ("script", "style"):
+            self.kihagyott = max(0, self.kihagyott - 1)
+            return
+        if self.kihagyott:
+            return
+        if tag == "table":
+            hatar = set()
+        elif tag in CELLA | {"tr"} | SOR_CSOPORT:
+            hatar = {"table"}
+        else:
+            hatar = CELLA | {"table"}
+        i = self._keres({tag}, hatar)
+        if i is not None:
+            self._zaras(i)
+
+    def handle_data(self, data):
+        if not self.kihagyott:
+            self.kimenet.append(escape(data, quote=False))
+
+    def javitott(self, html):
+        self.feed(html)
+        self.close()
+        self._zaras(0)
+        return "".join(self.kimenet)
+
+
+def _bs4_soup(html):
+    return BeautifulSoup(TablaJavito().javitott(html), "html.parser")
+
+
+# ---------------------------------------------------------
+# Elemzők: mindkettő ugyanazt a köztes alakot adja
+#   talalati sorok: [(4 cella szövege, első cella linkje vagy None)]
+#   részletes: (standardTable sorok, tabs-2 sorok, #tabs-1 mailto link vagy None),
+#              ahol egy sor: (címke, érték, a sor első linkje vagy None)
+# ---------------------------------------------------------
+def _bs4_talalati(html):
+    soup = _bs4_soup(html)
+    sorok = []
+    for row in soup.select("tbody tr"):
+        tds = row.find_all("td")
+        if len(tds) >= 4:
+            link_elem = tds[0].find("a")
+            href = link_elem["href"] if link_elem and link_elem.has_attr("href") else None
+            sorok.append(([td.get_text(strip=True) for td in tds[:4]], href))
+    return sorok
+
+
+def _bs4_tabla_sorai(table):
+    sorok = []
+    tbody = table.find("tbody") if table else None
+    if tbody:
+        for row in tbody.find_all("tr"):
+            tds = row.find_all("td")
+            if len(tds) >= 2:
+                link = row.find("a", href=True)
+                sorok.append((tds[0].get_text(strip=True), tds[1].get_text(strip=True), link["href"] if link else None))
+    return sorok
+
+
+def _bs4_reszletes(html):
+    soup = _bs4_soup(html)
+    sorok = [sor for table in soup.find_all("table", class_="standardTable") for sor in _bs4_tabla_sorai(table)]
+    tab2_div = soup.find("div", id="tabs-2")
+    tab2_sorok = _bs4_tabla_sorai(tab2_div.find("table", class_="standardTable")) if tab2_div else []
+    email_tag = soup.select_one("#tabs-1 a[href^='mailto:']")
+    return sorok, tab2_sorok, email_tag["href"] if email_tag else None
+
+
+if lxml:
+    _STANDARD_TABLE = "contains(concat(' ', normalize-space(@class), ' '), ' standardTable ')"
+    # get_text(strip=True) megfelelője: a szövegcsomópontok (script / style nélkül) levágva, összefűzve
+    _SZOVEGEK = etree.XPath(".//text()[not(ancestor::script) and not(ancestor::style)]")
+    _TALALATI_SOROK = etree.XPath("//tbody//tr")
+    _CELLAK = etree.XPath(".//td")
+    _ELSO_LINK = etree.XPath("(.//a)[1]")
+    _ELSO_HREF_LINK = etree.XPath("(.//a[@href])[1]")
+    _ELSO_TBODY = etree.XPath("(.//tbody)[1]")
+    _SOROK = etree.XPath(".//tr")
+    _STANDARD_TABLAK = etree.XPath(f"//table[{_STANDARD_TABLE}]")
+    _TAB2_TABLA = etree.XPath(f"((//div[@id='tabs-2'])[1]//table[{_STANDARD_TABLE}])[1]")
+    _TAB1_MAILTO = etree.XPath("(//*[@id='tabs-1']//a[starts-with(@href, 'mailto:')])[1]")
+
+
+def _lxml_szoveg(elem):
+    return "".join(t.strip() for t in _SZOVEGEK(elem))
+
+
+def _lxml_talalati(html):
+    doc = lxml.html.document_fromstring(html)
+    sorok = []
+    for row in _TALALATI_SOROK(doc):
+        tds = _CELLAK(row)
+        if len(tds) >= 4:
+            link_elem = _ELSO_LINK(tds[0])
+            sorok.append(([_lxml_szoveg(td) for td in tds[:4]], link_elem[0].get("href") if link_elem else None))
+    return sorok
+
+
+def _lxml_tabla_sorai(table):
+    sorok = []
+    tbody = _ELSO_TBODY(table)
+    if tbody:
+        for row in _SOROK(tbody[0]):
+            tds = _CELLAK(row)
+            if len(tds) >= 2:
+                link = _ELSO_HREF_LINK(row)
+                sorok.append((_lxml_szoveg(tds[0]), _lxml_szoveg(tds[1]), link[0].get("href") if link else None))
+    return sorok
+
+
+def _lxml_reszletes(html):
+    doc = lxml.html.document_fromstring(html)
+    sorok = [sor for table in _STANDARD_TABLAK(doc) for sor in _lxml_tabla_sorai(table)]
+    tab2_tabla = _TAB2_TABLA(doc)
+    tab2_sorok = _lxml_tabla_sorai(tab2_tabla[0]) if tab2_tabla else []
+    email_tag = _TAB1_MAILTO(doc)
+    return sorok, tab2_sorok, email_tag[0].get("href") if email_tag else None
+
+
+ELEMZO = os.getenv("VMP_ELEMZO", "lxml" if lxml else "html.parser")
+if ELEMZO == "lxml" and not lxml:
+    print("⚠ VMP_ELEMZO=lxml, de az lxml nincs telepítve: html.parser")
+    ELEMZO = "html.parser"
+
+
+def _elemez(lxml_fuggveny, bs4_fuggveny, html):
+    """A beállított elemzővel; ha az lxml nem tudja elemezni (pl. üres oldal), BeautifulSoup"""
+    if ELEMZO == "lxml":
+        try:
+            return lxml_fuggveny(html)
+        except (ValueError, etree.ParserError):
+            pass
+    return bs4_fuggveny(html)
+
+
+# ---------------------------------------------------------
+# Kinyerés
+# ---------------------------------------------------------
+def talalati_sorok(html):
+    """Találati oldal: [(munka neve, munka típusa, hely, cég, link href vagy None)]"""
+    return [(*cellak, href) for cellak, href in _elemez(_lxml_talalati, _bs4_talalati, html)]
+
+
+def _mezok_kitoltese(adatok, tabla, sorok):
+    for cimke, ertek, href in sorok:
+        mezo = tabla.mezo(" ".join(cimke.split()))
+        if mezo is None:
+            continue
+        if mezo in MAILTO_MEZOK and href and href.startswith("mailto:"):
+            ertek = href.replace("mailto:", "")
+        adatok[mezo] = ertek
+
+
+def reszletes_adatok(html):
+    """Részletes oldal: {mező: érték} a megtalált mezőkre"""
+    sorok, tab2_sorok, email_href = _elemez(_lxml_reszletes, _bs4_reszletes, html)
+    adatok = {}
+    _mezok_kitoltese(adatok, RESZLETES, sorok)
+    if email_href:
+        adatok["Email"] = email_href.replace("mailto:", "")
+    _mezok_kitoltese(adatok, TAB2, tab2_sorok)
+    return adatok